@@ -0,0 +1,172 @@
+import heapq
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+import redis
+from rest_framework.throttling import BaseThrottle
+from product_importer.redis_client import get_redis, mark_unavailable
+from product_importer.routing import IMPORT_QUEUE, FAST_IMPORT_QUEUE
+from .models import FileUpload
+
+ACTIVE_STATUSES = ('pending', 'processing')
+# Completed imports the observed throughput is measured over
+THROUGHPUT_SAMPLE = 50
+# Bounds of the Retry-After given to a rejected client, and the hint used before any import has completed
+MIN_RETRY_AFTER = 5
+MAX_RETRY_AFTER = 600
+DEFAULT_RETRY_AFTER = 30
+
+
+def get_max_active():
+    """
+    Imports pending or processing at once across all clients
+    """
+    return getattr(settings, 'IMPORT_MAX_ACTIVE', 20)
+
+
+def get_max_active_per_client():
+    return getattr(settings, 'IMPORT_MAX_ACTIVE_PER_CLIENT', 3)
+
+
+def get_max_queue_depth():
+    """
+    Messages waiting on the broker's import queues above which uploads are turned away
+    """
+    return getattr(settings, 'IMPORT_MAX_QUEUE_DEPTH', 500)
+
+
+def get_worker_slots():
+    """
+    Imports the workers run side by side, used to estimate start times
+    """
+    return max(getattr(settings, 'IMPORT_WORKER_SLOTS', 2), 1)
+
+
+def get_stale_hours():
+    return getattr(settings, 'IMPORT_ADMISSION_STALE_HOURS', 6)
+
+
+def client_ident(request):
+    """
+    Address a request came from, behind REST_FRAMEWORK NUM_PROXIES proxies like DRF throttles
+    X-Forwarded-For is ignored unless NUM_PROXIES is set, since a client can send any value there
+    """
+    return (BaseThrottle().get_ident(request) or '')[:64]
+
+
+def active_imports():
+    """
+    Pending and processing imports, oldest first
+    Ones created more than IMPORT_ADMISSION_STALE_HOURS ago are presumed lost and hold no slot
+    """
+    return FileUpload.objects.filter(  # type: ignore[reportAttributeAccessIssue]
+        status__in=ACTIVE_STATUSES,
+        created_at__gte=timezone.now() - timedelta(hours=get_stale_hours()),
+    ).order_by('id')
+
+
+def import_queue_depth():
+    """
+    Messages waiting on the import queues of the Redis broker, or None when it cannot be read
+    """
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        pipe = client.pipeline()
+        pipe.llen(IMPORT_QUEUE)
+        pipe.llen(FAST_IMPORT_QUEUE)
+        return sum(pipe.execute())
+    except redis.RedisError as e:
+        mark_unavailable(e)
+        return None
+
+
+def get_throughput():
+    """
+    Rows per second of one import and stored bytes per row, observed over the last
+    THROUGHPUT_SAMPLE completed imports, or None before any import has completed
+    """
+    recent = FileUpload.objects.filter(  # type: ignore[reportAttributeAccessIssue]
+        status='completed', upload_duration__gt=0, total_rows__gt=0,
+    ).order_by('-id').values_list('total_rows', 'file_size', 'upload_duration')[:THROUGHPUT_SAMPLE]
+    rows = file_bytes = seconds = 0
+    for total_rows, file_size, upload_duration in recent:
+        rows += total_rows
+        file_bytes += file_size
+        seconds += upload_duration
+    if not rows:
+        return None
+    return rows / seconds, file_bytes / rows
+
+
+def remaining_seconds(file_upload, throughput):
+    """
+    Time the import still needs, from the bytes it has left at the observed rows/s
+    """
+    rows_per_second, bytes_per_row = throughput
+    remaining_bytes = max(file_upload.file_size - file_upload.processed_bytes, 0)
+    return remaining_bytes / bytes_per_row / rows_per_second
+
+
+def slot_free_times(uploads, throughput):
+    """
+    Seconds from now until each worker slot is free once uploads, in queue order, have run
+    Processing imports hold a slot already; pending ones take the first slot to free up
+    """
+    slots = [0.0] * get_worker_slots()
+    for file_upload in sorted(uploads, key=lambda upload: (upload.status != 'processing', upload.id)):
+        heapq.heapreplace(slots, slots[0] + remaining_seconds(file_upload, throughput))
+    return slots
+
+
+def retry_after(seconds):
+    if seconds is None:
+        return DEFAULT_RETRY_AFTER
+    return int(min(max(seconds, MIN_RETRY_AFTER), MAX_RETRY_AFTER))
+
+
+def check_admission(client):
+    """
+    Reason to turn an upload from client away and the seconds to wait before retrying,
+    or None if the import can be queued
+    The limits are read without locking, so simultaneous uploads may overshoot them by a few
+    """
+    active = list(active_imports().only('id', 'status', 'client', 'file_size', 'processed_bytes'))
+    if len(active) >= get_max_active():
+        throughput = get_throughput()
+        seconds = min(slot_free_times(active, throughput)) if throughput else None
+        return 'Too many imports in progress, retry later', retry_after(seconds)
+
+    own = [upload for upload in active if upload.client == client]
+    if len(own) >= get_max_active_per_client():
+        throughput = get_throughput()
+        # A slot of this client frees when its quickest import finishes
+        seconds = min(remaining_seconds(upload, throughput) for upload in own) if throughput else None
+        return 'Too many imports in progress for this client, retry later', retry_after(seconds)
+
+    depth = import_queue_depth()
+    if depth is not None and depth >= get_max_queue_depth():
+        throughput = get_throughput()
+        seconds = max(slot_free_times(active, throughput)) if throughput else None
+        return 'Import queue is full, retry later', retry_after(seconds)
+    return None
+
+
+def estimated_start(file_upload):
+    """
+    When a pending import is expected to start, from the imports queued ahead of it and the
+    observed throughput; None once it has started or before any import has completed
+    The estimate treats the fast and bulk import lanes as one pool of IMPORT_WORKER_SLOTS
+    """
+    if file_upload.status != 'pending':
+        return None
+    throughput = get_throughput()
+    if throughput is None:
+        return None
+    ahead = active_imports().filter(Q(id__lt=file_upload.id) | Q(status='processing')).only(
+        'id', 'status', 'file_size', 'processed_bytes',
+    )
+    seconds = min(slot_free_times(ahead, throughput))
+    return timezone.now() + timedelta(seconds=seconds)
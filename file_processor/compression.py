@@ -0,0 +1,119 @@
+import os
+import bz2
+import gzip
+import lzma
+import zipfile
+from contextlib import contextmanager
+from django.conf import settings
+
+# Accepted upload suffixes and the module that decompresses them
+COMPRESSED_SUFFIXES = {
+    '.csv.gz': gzip.open,
+    '.csv.bz2': bz2.open,
+    '.csv.xz': lzma.open,
+}
+UPLOAD_SUFFIXES = ('.csv', '.zip') + tuple(COMPRESSED_SUFFIXES)
+
+
+class DecompressionBombError(ValueError):
+    """
+    Raised when a compressed upload expands beyond the configured limits
+    """
+
+
+def is_supported_upload(file_name):
+    return file_name.lower().endswith(UPLOAD_SUFFIXES)
+
+
+def is_compressed(file_name):
+    return file_name.lower().endswith(UPLOAD_SUFFIXES[1:])
+
+
+def zip_member(archive):
+    """
+    The single CSV member of a zip upload
+    """
+    members = [info for info in archive.infolist() if not info.is_dir()]
+    if len(members) != 1 or not members[0].filename.lower().endswith('.csv'):
+        raise ValueError('Zip uploads must contain exactly one CSV file')
+    return members[0]
+
+
+def validate_upload(full_file_path):
+    """
+    Check a stored upload can be opened before it is queued
+    Zip archives must hold one CSV whose declared size is within the decompression limits
+    """
+    if not full_file_path.lower().endswith('.zip'):
+        return
+    try:
+        with zipfile.ZipFile(full_file_path) as archive:
+            member = zip_member(archive)
+    except zipfile.BadZipFile:
+        raise ValueError('File is not a valid zip archive')
+    if member.file_size > decompressed_limit(os.path.getsize(full_file_path)):
+        raise DecompressionBombError('Zip member expands beyond the allowed decompressed size')
+
+
+def decompressed_limit(compressed_size):
+    """
+    Largest decompressed size accepted for an upload of compressed_size bytes
+    """
+    return min(
+        settings.MAX_DECOMPRESSED_UPLOAD_SIZE,
+        max(compressed_size, 1) * settings.MAX_COMPRESSION_RATIO,
+    )
+
+
+class GuardedStream:
+    """
+    Binary stream over decompressed data that aborts once the decompression limit is passed
+    """
+
+    def __init__(self, stream, limit):
+        self.stream = stream
+        self.limit = limit
+        self.total = 0
+
+    def count(self, data):
+        self.total += len(data)
+        if self.total > self.limit:
+            raise DecompressionBombError(f'Upload expands beyond {self.limit} bytes when decompressed')
+        return data
+
+    def read(self, size=-1):
+        return self.count(self.stream.read(size))
+
+    def readline(self, size=-1):
+        return self.count(self.stream.readline(size))
+
+    def seek(self, offset):
+        # Compressed streams seek forward by decompressing; count those bytes too
+        self.stream.seek(offset)
+        self.total = offset
+        return offset
+
+
+@contextmanager
+def open_csv_stream(full_file_path):
+    """
+    Open an upload for reading as plain CSV bytes
+    Yields (raw, stream): raw is the file on disk, whose position gives progress in stored
+    (compressed) bytes, and stream yields the decompressed CSV
+    """
+    name = full_file_path.lower()
+    with open(full_file_path, 'rb') as raw:
+        if not is_compressed(name):
+            yield raw, raw
+            return
+
+        limit = decompressed_limit(os.path.getsize(full_file_path))
+        if name.endswith('.zip'):
+            with zipfile.ZipFile(raw) as archive:
+                with archive.open(zip_member(archive)) as member:
+                    yield raw, GuardedStream(member, limit)
+            return
+
+        decompressor = next(opener for suffix, opener in COMPRESSED_SUFFIXES.items() if name.endswith(suffix))
+        with decompressor(raw) as stream:
+            yield raw, GuardedStream(stream, limit)
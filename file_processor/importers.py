@@ -0,0 +1,772 @@
+import os
+import csv
+import time
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
+from django.db import DataError, connection, transaction
+from django.db.models import F
+from django.db.models.functions import Least
+from products.models import Product, content_fingerprint
+from products.search import get_search_backend
+from products.stats import StatsDelta, delta_cte_sql
+from webhooks.outbox import product_data, record_product_events, product_events_cte_sql
+from .models import FileUpload, ImportSeenSku
+from . import validation
+from .validation import clean_row, RowRejected, RejectSink
+from .compression import open_csv_stream
+from .progress import publish_upload, add_progress
+from .sync import seen_sku, record_seen
+
+# Product columns written by an import, in the order the writers use them
+IMPORT_FIELDS = ['sku', 'name', 'description', 'price', 'active']
+
+
+def get_batch_size():
+    """
+    Number of rows written per upsert statement
+    """
+    return getattr(settings, 'PRODUCT_IMPORT_BATCH_SIZE', 1000)
+
+
+def get_chunk_bytes():
+    """
+    Size of the byte ranges a parallel import is split into (0 disables splitting)
+    """
+    return getattr(settings, 'PRODUCT_IMPORT_CHUNK_BYTES', 0)
+
+
+def get_progress_flush_seconds():
+    """
+    Minimum seconds between progress writes to the FileUpload row
+    In between, progress is only published to Redis; without Redis every batch is written
+    """
+    return getattr(settings, 'PRODUCT_IMPORT_PROGRESS_FLUSH_SECONDS', 5)
+
+
+def dedupe_by_sku(rows):
+    """
+    Keep the last occurrence of each SKU in a batch, ordered by SKU
+    A single ON CONFLICT statement cannot touch the same row twice, and a stable
+    SKU order keeps concurrent batches locking rows in the same order
+    """
+    unique = {}
+    for row in rows:
+        unique[row['sku']] = row
+    return [unique[sku] for sku in sorted(unique)]
+
+
+def add_fingerprints(rows):
+    """
+    Attach the content hash Product.save would compute to each row
+    """
+    for row in rows:
+        row['content_hash'] = content_fingerprint(row['name'], row['description'], row['price'], row['active'])
+    return rows
+
+
+def upsert_ctes_sql(upserted, old):
+    """
+    CTEs a PostgreSQL upsert statement runs alongside its INSERT: the stats delta and, when
+    anything subscribes to product changes, the webhook events
+    """
+    return ', '.join(filter(None, [delta_cte_sql(upserted, old), product_events_cte_sql(upserted)]))
+
+
+class UpsertWriter:
+    """
+    Writes a batch of normalized rows to the products table in one statement
+    Rows whose content hash matches the stored one are left untouched
+    Subclasses return an (inserted, updated, skipped) tuple from write()
+    """
+
+    def write(self, rows):
+        raise NotImplementedError
+
+
+class OrmUpsertWriter(UpsertWriter):
+    """
+    Portable writer built on bulk_create(update_conflicts=True)
+    Django emits INSERT ... ON CONFLICT (sku) DO UPDATE on both PostgreSQL and SQLite
+    Existing fingerprints are read in one query so unchanged rows are never sent
+    """
+
+    def write(self, rows):
+        rows = add_fingerprints(dedupe_by_sku(rows))
+        if not rows:
+            return 0, 0, 0
+
+        skus = [row['sku'] for row in rows]
+        existing = {
+            sku: (content_hash, price, active)
+            for sku, content_hash, price, active in Product.objects.filter(sku__in=skus).values_list(  # type: ignore[reportAttributeAccessIssue]
+                'sku', 'content_hash', 'price', 'active'
+            )
+        }
+        changed = [row for row in rows if existing.get(row['sku'], (None,))[0] != row['content_hash']]
+
+        if changed:
+            Product.objects.bulk_create(  # type: ignore[reportAttributeAccessIssue]
+                [Product(**row) for row in changed],
+                update_conflicts=True,
+                unique_fields=['sku'],
+                update_fields=['name', 'description', 'price', 'active', 'content_hash', 'updated_at'],
+            )
+            # bulk_create skips Product.save, so refresh the search index and stats for the batch
+            get_search_backend().index_skus([row['sku'] for row in changed])
+            stats = StatsDelta()
+            for row in changed:
+                if row['sku'] in existing:
+                    stats.remove(*existing[row['sku']][1:])
+                stats.add(row['price'], row['active'])
+            stats.apply()
+            record_product_events({
+                'product_created': [row for row in changed if row['sku'] not in existing],
+                'product_updated': [row for row in changed if row['sku'] in existing],
+            }, product_data)
+
+        updated = sum(1 for row in changed if row['sku'] in existing)
+        return len(changed) - updated, updated, len(rows) - len(changed)
+
+
+class PostgresUpsertWriter(UpsertWriter):
+    """
+    PostgreSQL writer that gets inserted/updated counts from the upsert itself
+    xmax is 0 only for freshly inserted tuples, so no extra SELECT is needed
+    The conflict WHERE clause skips rows whose content hash is unchanged
+    Catalog stats are moved to the new prices and webhook events appended in the same statement
+    """
+
+    def write(self, rows):
+        rows = add_fingerprints(dedupe_by_sku(rows))
+        if not rows:
+            return 0, 0, 0
+
+        table = connection.ops.quote_name(Product._meta.db_table)
+        fields = IMPORT_FIELDS + ['content_hash']
+        placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s, now(), now())'] * len(rows))
+        params = [[row['sku'] for row in rows]] + [row[field] for row in rows for field in fields]
+
+        sql = (
+            f"WITH old AS (SELECT sku, price, active FROM {table} WHERE sku = ANY(%s)), "
+            f"upserted AS ("
+            f"INSERT INTO {table} ({', '.join(fields)}, created_at, updated_at) VALUES {placeholders} "
+            f"ON CONFLICT (sku) DO UPDATE SET "
+            f"name = EXCLUDED.name, description = EXCLUDED.description, "
+            f"price = EXCLUDED.price, active = EXCLUDED.active, "
+            f"content_hash = EXCLUDED.content_hash, updated_at = EXCLUDED.updated_at "
+            f"WHERE {table}.content_hash IS DISTINCT FROM EXCLUDED.content_hash "
+            f"RETURNING sku, name, description, price, active, (xmax = 0) AS inserted"
+            f"), {upsert_ctes_sql('upserted', 'old')} "
+            f"SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM upserted"
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            inserted, updated = cursor.fetchone()
+        return inserted, updated, len(rows) - inserted - updated
+
+
+UPSERT_WRITERS = {
+    'orm': OrmUpsertWriter,
+    'postgresql': PostgresUpsertWriter,
+}
+
+
+def get_upsert_writer():
+    """
+    Pick the upsert writer from PRODUCT_IMPORT_UPSERT_BACKEND
+    'auto' uses the native writer for the database vendor and falls back to the ORM
+    """
+    backend = getattr(settings, 'PRODUCT_IMPORT_UPSERT_BACKEND', 'auto')
+    if backend == 'auto':
+        backend = connection.vendor if connection.vendor in UPSERT_WRITERS else 'orm'
+    return UPSERT_WRITERS[backend]()
+
+
+class CsvImporter:
+    """
+    Imports one uploaded CSV file into the products table
+    Subclasses implement run() and keep the FileUpload counters current
+    """
+
+    def __init__(self, file_upload, full_file_path, start_time):
+        self.file_upload = file_upload
+        self.full_file_path = full_file_path
+        self.start_time = start_time
+        self.flushed_at = time.time()
+        self.live = True
+
+    def run(self):
+        raise NotImplementedError
+
+    def flush_due(self):
+        """
+        True when progress should be written to the database rather than only to Redis
+        """
+        return not self.live or time.time() - self.flushed_at >= get_progress_flush_seconds()
+
+    def publish_progress(self, **fields):
+        """
+        Update the FileUpload in memory and publish it to Redis without touching the database
+        """
+        for name, value in fields.items():
+            setattr(self.file_upload, name, value)
+        self.file_upload.upload_duration = time.time() - self.start_time
+        self.live = publish_upload(self.file_upload)
+
+    def save_progress(self, **fields):
+        """
+        Store counters and elapsed time on the FileUpload and publish them
+        """
+        self.publish_progress(**fields)
+        self.file_upload.save()
+        self.flushed_at = time.time()
+
+
+class BatchImporter(CsvImporter):
+    """
+    Reads the CSV in Python and writes it with an UpsertWriter, one batch per statement
+    Works on every database vendor
+    Progress is published to Redis after every batch and written to the FileUpload, together with
+    a checkpoint (byte offset, row and line number), at most every PRODUCT_IMPORT_PROGRESS_FLUSH_SECONDS
+    The checkpoint commits in the same transaction as its batch, so a redelivered or resumed task
+    continues after it; batches written since then are imported again and count as skipped
+    A batch the database refuses is logged and its rows are rejected, so moving on loses none of them
+    Compressed uploads are decompressed as they are read; progress follows the stored bytes
+    while the checkpoint offset is a position in the decompressed CSV
+    """
+
+    def __init__(self, file_upload, full_file_path, start_time):
+        super().__init__(file_upload, full_file_path, start_time)
+        self.processed_rows = 0
+        self.inserted_rows = 0
+        self.updated_rows = 0
+        self.skipped_rows = 0
+        self.errors = []
+        # SKUs of the current batch, recorded with it when the upload is a sync
+        self.sync = file_upload.mode == 'sync'
+        self.seen = []
+
+    def run(self):
+        # Single pass: progress comes from the byte offset, so no row-counting pre-scan is needed
+        self.file_size = self.file_upload.file_size or os.path.getsize(self.full_file_path)
+        checkpoint_offset = self.file_upload.checkpoint_offset
+        lines_before = 0
+        
+        with open_csv_stream(self.full_file_path) as (raw, stream):
+            self.raw = raw
+            self.lines = OffsetLineReader(stream, 0, None)
+            reader = csv.DictReader(self.lines)
+            header = reader.fieldnames or []
+            
+            if checkpoint_offset:
+                # Resume after the last committed batch with the counters it recorded
+                print(f"Resuming upload {self.file_upload.id} at row {self.file_upload.checkpoint_row}")
+                self.lines.seek(checkpoint_offset)
+                lines_before = self.file_upload.checkpoint_line - 1
+                self.processed_rows = self.file_upload.checkpoint_row
+                self.inserted_rows = self.file_upload.inserted_rows
+                self.updated_rows = self.file_upload.updated_rows
+                self.skipped_rows = self.file_upload.skipped_rows
+            
+            self.rejects = RejectSink(self.file_upload.id, 0, header)
+            if checkpoint_offset:
+                self.rejects.resume(self.file_upload.checkpoint_line, self.file_upload.reject_reasons)
+            self.import_rows(reader, lines_before)
+        
+        # csv counts records rather than lines, so quoted newlines do not inflate the total
+        self.save_progress(
+            progress=100,
+            total_rows=self.processed_rows,
+            processed_bytes=self.file_size,
+        )
+
+    def import_rows(self, reader, lines_before=0):
+        """
+        Validate rows from a DictReader and write the valid ones in batches
+        Invalid rows go to the reject sink and never reach the database
+        lines_before is the number of file lines the reader's line_num does not count
+        """
+        batch_size = get_batch_size()
+        writer = get_upsert_writer()
+        batch = []
+        # (line, row) of each valid row in the batch, rejected as a whole if the batch fails to write
+        sources = []
+        rejected = 0
+        
+        try:
+            for row in reader:
+                self.processed_rows += 1
+                sku = seen_sku(row) if self.sync else None
+                if sku:
+                    self.seen.append(sku)
+                try:
+                    batch.append(clean_row(row))
+                    sources.append((lines_before + reader.line_num, row))
+                except RowRejected as e:
+                    self.rejects.write(lines_before + reader.line_num, e.reason, row)
+                    rejected += 1
+                
+                if len(batch) + rejected >= batch_size:
+                    self.flush(writer, batch, sources, rejected, lines_before + reader.line_num)
+                    batch = []
+                    sources = []
+                    rejected = 0
+            
+            if batch or rejected:
+                self.flush(writer, batch, sources, rejected, lines_before + reader.line_num)
+        finally:
+            self.rejects.close()
+
+    def flush(self, writer, batch, sources, rejected, line):
+        """
+        Write one batch of valid rows and record progress in the same transaction
+        sources holds the (line, row) each valid row was cleaned from
+        line is the file line number of the batch's last record
+        """
+        self.rejects.flush()
+        counters = (self.inserted_rows, self.updated_rows, self.skipped_rows)
+        try:
+            with transaction.atomic():  # type: ignore
+                inserted, updated, skipped = writer.write(batch)
+                if self.seen:
+                    record_seen(self.file_upload.id, self.seen)
+                self.record_batch(len(batch) + rejected, inserted, updated, skipped, rejected, line)
+        except SoftTimeLimitExceeded:
+            # The batch rolled back; the task continues from the stored checkpoint in a fresh run
+            raise
+        except Exception as e:
+            # Log the error but continue processing
+            self.inserted_rows, self.updated_rows, self.skipped_rows = counters
+            self.errors.append(str(e))
+            print(f"Error processing batch: {str(e)}")
+            # The checkpoint moves past the batch, so its rows go to the rejects file to be fixed and uploaded again
+            for source_line, row in sources:
+                self.rejects.write(source_line, validation.WRITE_FAILED, row)
+            self.rejects.flush()
+            try:
+                self.record_batch(len(batch) + rejected, 0, 0, 0, rejected + len(sources), line)
+            except Exception as e:
+                print(f"Error updating progress: {str(e)}")
+        self.seen = []
+        
+        # Close database connections roughly every 10,000 rows to prevent memory leaks
+        if self.processed_rows % 10000 < len(batch) + rejected:
+            connection.close()
+
+    def record_batch(self, rows, inserted, updated, skipped, rejected, line):
+        """
+        Publish counters and the checkpoint after a batch has been written or rejected
+        total_rows is extrapolated from the bytes read until the final count is known
+        """
+        self.inserted_rows += inserted
+        self.updated_rows += updated
+        self.skipped_rows += skipped
+        offset = self.raw.tell()
+        checkpoint = dict(checkpoint_offset=self.lines.offset, checkpoint_row=self.processed_rows, checkpoint_line=line)
+        record = self.save_progress if self.flush_due() else self.publish_progress
+        record(
+            progress=min(int((offset / self.file_size) * 100), 99) if self.file_size else 0,
+            processed_bytes=offset,
+            total_rows=int(self.processed_rows * self.file_size / offset) if offset else 0,
+            processed_rows=self.processed_rows,
+            inserted_rows=self.inserted_rows,
+            updated_rows=self.updated_rows,
+            skipped_rows=self.skipped_rows,
+            rejected_rows=self.rejects.rejected,
+            reject_reasons=dict(self.rejects.counts),
+            **checkpoint,
+        )
+
+
+class OffsetLineReader:
+    """
+    Iterates the decoded lines of the byte range [start, end) of a binary file
+    end may be None to read to the end of the stream
+    offset is the exact file position after the last line handed out; csv readers
+    pull no more lines than the record they return needs, so after each record
+    it is that record's end offset
+    """
+
+    def __init__(self, raw, start, end):
+        self.raw = raw
+        self.end = end
+        self.seek(start)
+
+    def seek(self, offset):
+        self.raw.seek(offset)
+        self.offset = offset
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.end is not None and self.offset >= self.end:
+            raise StopIteration
+        line = self.raw.readline(-1 if self.end is None else self.end - self.offset)
+        if not line:
+            raise StopIteration
+        # Excel exports start the file with a byte order mark, which must not reach the header
+        encoding = 'utf-8-sig' if self.offset == 0 else 'utf-8'
+        self.offset += len(line)
+        return line.decode(encoding)
+
+
+def csv_header(line):
+    """
+    Column names from the raw first line of a CSV file, without a leading byte order mark
+    """
+    return next(csv.reader([line.decode('utf-8-sig')]), [])
+
+
+def plan_chunks(full_file_path, chunk_bytes):
+    """
+    Split a CSV file into byte ranges of roughly chunk_bytes that start on row boundaries
+    A newline only ends a record when an even number of quotes precede it,
+    so quoted fields containing newlines are never cut in half
+    Returns the header columns and a list of (start, end, lines_before) tuples,
+    where lines_before is the number of file lines preceding the chunk
+    """
+    file_size = os.path.getsize(full_file_path)
+    block_size = 1024 * 1024
+
+    with open(full_file_path, 'rb') as csvfile:
+        header = csv_header(csvfile.readline())
+        boundaries = [csvfile.tell()]
+        lines_before = [1]
+        position = csvfile.tell()
+        target = position + chunk_bytes
+        quotes = 0
+        lines = 1
+
+        while target < file_size:
+            block = csvfile.read(block_size)
+            if not block:
+                break
+
+            search_from = max(0, target - position)
+            while (newline := block.find(b'\n', search_from)) != -1:
+                if (quotes + block.count(b'"', 0, newline)) % 2 == 0:
+                    boundaries.append(position + newline + 1)
+                    lines_before.append(lines + block.count(b'\n', 0, newline + 1))
+                    target = position + newline + 1 + chunk_bytes
+                    search_from = max(newline + 1, target - position)
+                else:
+                    search_from = newline + 1
+
+            quotes += block.count(b'"')
+            lines += block.count(b'\n')
+            position += len(block)
+
+    boundaries.append(file_size)
+    ranges = [
+        (start, end, preceding)
+        for start, end, preceding in zip(boundaries, boundaries[1:], lines_before)
+        if start < end
+    ]
+    return header, ranges
+
+
+class ChunkImporter(BatchImporter):
+    """
+    Imports one byte range of a file as part of a parallel import
+    Counters are added to the live progress in Redis after every batch and to the FileUpload
+    with F() expressions at coarse intervals, so concurrent chunks never overwrite each other
+    """
+
+    counter_fields = ('processed_bytes', 'processed_rows', 'inserted_rows', 'updated_rows', 'skipped_rows', 'rejected_rows')
+
+    def __init__(self, file_upload, full_file_path, start_time, header, start, end, lines_before):
+        super().__init__(file_upload, full_file_path, start_time)
+        self.header = header
+        self.start = start
+        self.end = end
+        self.lines_before = lines_before
+        self.total_bytes = max(os.path.getsize(full_file_path), 1)
+        self.reported_bytes = 0
+        self.pending = dict.fromkeys(self.counter_fields, 0)
+
+    def run(self):
+        with open(self.full_file_path, 'rb') as raw:
+            self.lines = OffsetLineReader(raw, self.start, self.end)
+            self.rejects = RejectSink(self.file_upload.id, self.start, self.header)
+            self.import_rows(csv.DictReader(self.lines, fieldnames=self.header), self.lines_before)
+        self.add_counters(processed_bytes=self.end - self.start - self.reported_bytes)
+        self.flush_counters()
+
+    def record_batch(self, rows, inserted, updated, skipped, rejected, line):
+        self.inserted_rows += inserted
+        self.updated_rows += updated
+        self.skipped_rows += skipped
+        self.add_counters(
+            processed_bytes=self.lines.offset - self.start - self.reported_bytes,
+            processed_rows=rows,
+            inserted_rows=inserted,
+            updated_rows=updated,
+            skipped_rows=skipped,
+            rejected_rows=rejected,
+        )
+        if self.flush_due():
+            self.flush_counters()
+
+    def add_counters(self, **deltas):
+        """
+        Publish counter deltas to Redis and hold them until the next database flush
+        """
+        self.reported_bytes += deltas['processed_bytes']
+        for name, value in deltas.items():
+            self.pending[name] += value
+        self.live = add_progress(self.file_upload.id, self.total_bytes, **deltas)
+
+    def flush_counters(self):
+        """
+        Atomically add the pending deltas to the FileUpload
+        """
+        pending, self.pending = self.pending, dict.fromkeys(self.counter_fields, 0)
+        FileUpload.objects.filter(id=self.file_upload.id).update(  # type: ignore[reportAttributeAccessIssue]
+            progress=Least((F('processed_bytes') + pending['processed_bytes']) * 100 / self.total_bytes, 100),
+            upload_duration=time.time() - self.start_time,
+            **{name: F(name) + value for name, value in pending.items()},
+        )
+        self.flushed_at = time.time()
+
+
+class ProgressReader:
+    """
+    File-like view of a CSV stream handed to COPY that reports the stored bytes read after each read
+    """
+
+    def __init__(self, stream, raw, report):
+        self.stream = stream
+        self.raw = raw
+        self.report = report
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.report(self.raw.tell())
+        return data
+
+
+class PostgresCopyImporter(CsvImporter):
+    """
+    Streams the file through COPY ... FROM STDIN into an unlogged staging table,
+    then merges it into products with a single INSERT ... SELECT ... ON CONFLICT
+    Rows are validated in SQL with the same rules as clean_row and invalid ones are
+    copied out to the reject file instead of being merged
+    Duplicate SKUs are resolved in SQL, keeping the last occurrence in the file,
+    and content hashes are computed in SQL so unchanged products are skipped
+    Catalog stats and webhook events are written by the merge statement itself
+    Progress is published to Redis as COPY reads the file. Nothing commits before the merge,
+    so there is no checkpoint: a redelivered or resumed import runs the COPY again from the start
+    COPY stops at the first line it cannot parse (a ragged row, a blank line, invalid UTF-8);
+    such a file is imported by BatchImporter instead, which rejects those rows one by one
+    """
+
+    copy_chunk_size = 1024 * 1024
+
+    def run(self):
+        self.file_size = self.file_upload.file_size or os.path.getsize(self.full_file_path)
+        try:
+            self.copy_import()
+        except (DataError, connection.Database.DataError) as e:
+            # The staging transaction rolled back, so the batch import starts from a clean slate
+            print(f"COPY could not parse upload {self.file_upload.id}, importing it in batches: {str(e).strip()}")
+            importer = BatchImporter(self.file_upload, self.full_file_path, self.start_time)
+            importer.run()
+            self.errors = importer.errors
+
+    def copy_import(self):
+        with open_csv_stream(self.full_file_path) as (_, stream):
+            header = csv_header(stream.readline())
+        source = {column.strip().lower(): f'c{index}' for index, column in enumerate(header)}
+        if 'sku' not in source:
+            raise ValueError("CSV file must have a 'sku' column")
+
+        staging = connection.ops.quote_name(f'import_staging_{self.file_upload.id}')
+        columns = [f'c{index}' for index in range(len(header))]
+        rejects = RejectSink(self.file_upload.id, 0, header)
+
+        with transaction.atomic():  # type: ignore
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+                cursor.execute(
+                    f"CREATE UNLOGGED TABLE {staging} "
+                    f"(line_no bigserial, {', '.join(f'{column} text' for column in columns)}, reason text)"
+                )
+
+                staged_rows = self.copy_in(
+                    cursor,
+                    f"COPY {staging} ({', '.join(columns)}) FROM STDIN "
+                    f"WITH (FORMAT csv, HEADER true, ENCODING 'UTF8')"
+                )
+
+                reason_sql, reason_params = self.reason_sql(source)
+                cursor.execute(f"UPDATE {staging} SET reason = {reason_sql}", reason_params)
+                cursor.execute(f"SELECT reason, count(*) FROM {staging} WHERE reason IS NOT NULL GROUP BY reason")
+                rejects.counts = dict(cursor.fetchall())
+                if rejects.counts:
+                    rejects.open()
+                    rejects.close()
+                    self.copy_out(
+                        cursor,
+                        f"COPY (SELECT line_no + 1, reason, {', '.join(columns)} FROM {staging} "
+                        f"WHERE reason IS NOT NULL ORDER BY line_no) TO STDOUT WITH (FORMAT csv)",
+                        rejects.path
+                    )
+
+                cursor.execute(self.merge_sql(staging, source))
+                inserted, updated, unique_rows = cursor.fetchone()
+                if self.file_upload.mode == 'sync':
+                    self.record_seen(cursor, staging, source)
+                cursor.execute(f"DROP TABLE {staging}")
+
+        self.save_progress(
+            progress=100,
+            total_rows=staged_rows,
+            processed_rows=staged_rows,
+            inserted_rows=inserted,
+            updated_rows=updated,
+            skipped_rows=unique_rows - inserted - updated,
+            rejected_rows=rejects.rejected,
+            reject_reasons=rejects.counts,
+        )
+
+    def record_seen(self, cursor, staging, source):
+        """
+        Record every SKU in the file for a sync import, including those of rejected rows
+        """
+        sku = self.column_sql(source)[0]
+        seen_table = connection.ops.quote_name(ImportSeenSku._meta.db_table)
+        cursor.execute(
+            f"INSERT INTO {seen_table} (file_upload_id, sku) "
+            f"SELECT DISTINCT %s, {sku} FROM {staging} WHERE {sku} <> '' AND length({sku}) <= %s "
+            f"ON CONFLICT DO NOTHING",
+            [self.file_upload.id, validation.SKU_MAX_LENGTH]
+        )
+
+    def copy_in(self, cursor, sql):
+        """
+        Feed the (decompressed) file to COPY without loading it into memory
+        Returns the number of rows staged
+        """
+        raw_cursor = cursor.cursor
+        with open_csv_stream(self.full_file_path) as (raw, stream):
+            csvfile = ProgressReader(stream, raw, self.copy_progress)
+            if hasattr(raw_cursor, 'copy_expert'):
+                # psycopg2
+                raw_cursor.copy_expert(sql, csvfile, size=self.copy_chunk_size)
+            else:
+                # psycopg 3
+                with raw_cursor.copy(sql) as copy:
+                    while data := csvfile.read(self.copy_chunk_size):
+                        copy.write(data)
+        return raw_cursor.rowcount
+
+    def copy_progress(self, offset):
+        """
+        Publish the stored bytes staged so far
+        The FileUpload row is not written, since COPY holds the import transaction open
+        """
+        self.publish_progress(
+            progress=min(int(offset * 100 / self.file_size), 99) if self.file_size else 0,
+            processed_bytes=offset,
+        )
+
+    def copy_out(self, cursor, sql, path):
+        """
+        Append the output of a COPY ... TO STDOUT to a file
+        """
+        raw_cursor = cursor.cursor
+        with open(path, 'ab') as output:
+            if hasattr(raw_cursor, 'copy_expert'):
+                # psycopg2
+                raw_cursor.copy_expert(sql, output, size=self.copy_chunk_size)
+            else:
+                # psycopg 3
+                with raw_cursor.copy(sql) as copy:
+                    for data in copy:
+                        output.write(data)
+
+    def column_sql(self, source):
+        """
+        SQL expressions for the normalized sku, name, description and raw price text
+        """
+        blank = "E' \\t\\r\\n'"
+        sku = f"upper(btrim(coalesce({source['sku']}, ''), {blank}))"
+        name = f"coalesce({source['name']}, '')" if 'name' in source else "''"
+        description = f"coalesce({source['description']}, '')" if 'description' in source else "''"
+        price = f"btrim(coalesce({source['price']}, ''), {blank})" if 'price' in source else "''"
+        return sku, name, description, price
+
+    def reason_sql(self, source):
+        """
+        CASE expression giving the clean_row reject reason for a staged row, or NULL if it is valid
+        """
+        sku, name, _, price = self.column_sql(source)
+        sql = (
+            f"CASE "
+            f"WHEN {sku} = '' THEN %s "
+            f"WHEN length({sku}) > %s THEN %s "
+            f"WHEN {name} = '' THEN %s "
+            f"WHEN length({name}) > %s THEN %s "
+            f"WHEN {price} !~ %s THEN %s "
+            f"WHEN abs(round({price}::numeric, %s)) >= %s THEN %s "
+            f"END"
+        )
+        params = [
+            validation.MISSING_SKU,
+            validation.SKU_MAX_LENGTH, validation.SKU_TOO_LONG,
+            validation.MISSING_NAME,
+            validation.NAME_MAX_LENGTH, validation.NAME_TOO_LONG,
+            validation.PRICE_PATTERN, validation.INVALID_PRICE,
+            validation.PRICE_FIELD.decimal_places, validation.PRICE_LIMIT, validation.PRICE_OUT_OF_RANGE,
+        ]
+        return sql, params
+
+    def merge_sql(self, staging, source):
+        """
+        Build the INSERT ... SELECT that merges valid staged rows into products
+        """
+        table = connection.ops.quote_name(Product._meta.db_table)
+        sku, name, description, price = self.column_sql(source)
+
+        return (
+            f"WITH source AS ("
+            f"SELECT DISTINCT ON (sku) sku, name, description, price FROM ("
+            f"SELECT {sku} AS sku, {name} AS name, {description} AS description, "
+            f"({price})::numeric(10, 2) AS price, line_no FROM {staging} WHERE reason IS NULL"
+            f") staged ORDER BY sku, line_no DESC"
+            f"), old AS ("
+            f"SELECT {table}.sku, {table}.price, {table}.active FROM {table} JOIN source ON source.sku = {table}.sku"
+            f"), upserted AS ("
+            f"INSERT INTO {table} ({', '.join(IMPORT_FIELDS)}, content_hash, created_at, updated_at) "
+            f"SELECT sku, name, description, price, true, "
+            f"md5(name || chr(31) || description || chr(31) || price::text || chr(31) || '1'), now(), now() "
+            f"FROM source "
+            f"ON CONFLICT (sku) DO UPDATE SET "
+            f"name = EXCLUDED.name, description = EXCLUDED.description, "
+            f"price = EXCLUDED.price, active = EXCLUDED.active, "
+            f"content_hash = EXCLUDED.content_hash, updated_at = EXCLUDED.updated_at "
+            f"WHERE {table}.content_hash IS DISTINCT FROM EXCLUDED.content_hash "
+            f"RETURNING sku, name, description, price, active, (xmax = 0) AS inserted"
+            f"), {upsert_ctes_sql('upserted', 'old')} "
+            f"SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted), "
+            f"(SELECT count(*) FROM source) FROM upserted"
+        )
+
+
+IMPORT_BACKENDS = {
+    'batch': BatchImporter,
+    'copy': PostgresCopyImporter,
+}
+
+
+def get_importer(file_upload, full_file_path, start_time):
+    """
+    Pick the import backend from PRODUCT_IMPORT_BACKEND
+    'auto' uses COPY on PostgreSQL and the batch importer everywhere else
+    """
+    backend = getattr(settings, 'PRODUCT_IMPORT_BACKEND', 'auto')
+    if backend == 'auto':
+        backend = 'copy' if connection.vendor == 'postgresql' else 'batch'
+    return IMPORT_BACKENDS[backend](file_upload, full_file_path, start_time)
@@ -0,0 +1,83 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from products.models import Product
+from product_importer.benchmark import throwaway_database
+from file_processor.importers import get_batch_size, get_upsert_writer
+from file_processor.validation import clean_row
+
+
+def generate_rows(prefix, count, revision):
+    """
+    Build synthetic CSV rows shaped like a catalog upload
+    """
+    for i in range(count):
+        yield {
+            'sku': f'{prefix}{i:08d}',
+            'name': f'Benchmark product {i} rev {revision}',
+            'description': f'Description for benchmark product {i}',
+            'price': f'{(i % 1000) + revision}.99',
+        }
+
+
+class Command(BaseCommand):
+    help = 'Compare per-row update_or_create against the bulk upsert writer (rows/s)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        batch_size = options['batch_size'] or get_batch_size()
+
+        with throwaway_database():
+            for revision, label in ((1, 'insert'), (2, 'update')):
+                elapsed = self.run_per_row(rows, revision)
+                self.report('update_or_create', label, rows, elapsed)
+
+            # A SKU range of its own, so the bulk writer also starts by inserting
+            writer = get_upsert_writer()
+            for revision, label in ((1, 'insert'), (2, 'update')):
+                elapsed = self.run_bulk(writer, rows, revision, batch_size)
+                self.report(type(writer).__name__, label, rows, elapsed)
+
+    def run_per_row(self, rows, revision):
+        """
+        The previous importer: one update_or_create per row, 100-row transactions
+        """
+        start = time.perf_counter()
+        batch = []
+        for row in generate_rows('ROW-', rows, revision):
+            batch.append(clean_row(row))
+            if len(batch) >= 100:
+                self.write_per_row(batch)
+                batch = []
+        if batch:
+            self.write_per_row(batch)
+        return time.perf_counter() - start
+
+    def write_per_row(self, batch):
+        with transaction.atomic():
+            for row in batch:
+                Product.objects.update_or_create(  # type: ignore[reportAttributeAccessIssue]
+                    sku=row['sku'],
+                    defaults={key: value for key, value in row.items() if key != 'sku'}
+                )
+
+    def run_bulk(self, writer, rows, revision, batch_size):
+        start = time.perf_counter()
+        batch = []
+        for row in generate_rows('BULK-', rows, revision):
+            batch.append(clean_row(row))
+            if len(batch) >= batch_size:
+                with transaction.atomic():
+                    writer.write(batch)
+                batch = []
+        if batch:
+            with transaction.atomic():
+                writer.write(batch)
+        return time.perf_counter() - start
+
+    def report(self, name, label, rows, elapsed):
+        self.stdout.write(f'{name:<22} {label:<7} {rows} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s)')
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_processor', '0002_fileupload_upload_duration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileupload',
+            name='inserted_rows',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='updated_rows',
+            field=models.IntegerField(default=0),
+        ),
+    ]
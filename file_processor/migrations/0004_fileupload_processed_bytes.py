@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_processor', '0003_fileupload_inserted_updated_rows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileupload',
+            name='processed_bytes',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
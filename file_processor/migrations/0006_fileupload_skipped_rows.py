@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_processor', '0005_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileupload',
+            name='skipped_rows',
+            field=models.IntegerField(default=0),
+        ),
+    ]
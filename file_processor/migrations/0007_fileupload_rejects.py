@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_processor', '0006_fileupload_skipped_rows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileupload',
+            name='reject_reasons',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='rejected_rows',
+            field=models.IntegerField(default=0),
+        ),
+    ]
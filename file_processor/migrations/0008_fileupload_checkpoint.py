@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_processor', '0007_fileupload_rejects'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileupload',
+            name='checkpoint_line',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='checkpoint_offset',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='checkpoint_row',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='file_path',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_processor', '0008_fileupload_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileupload',
+            name='deactivated_rows',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='mode',
+            field=models.CharField(choices=[('upsert', 'Upsert'), ('sync', 'Sync')], default='upsert', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='mode',
+            field=models.CharField(choices=[('upsert', 'Upsert'), ('sync', 'Sync')], default='upsert', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='ImportSeenSku',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sku', models.CharField(max_length=100)),
+                ('file_upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='file_processor.fileupload')),
+            ],
+            options={
+                'db_table': 'import_seen_skus',
+                'constraints': [models.UniqueConstraint(fields=('file_upload', 'sku'), name='import_seen_skus_upload_sku_uniq')],
+            },
+        ),
+    ]
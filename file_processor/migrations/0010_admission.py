@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_processor', '0009_sync_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileupload',
+            name='client',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='fileupload',
+            index=models.Index(fields=['status', 'client'], name='file_uploads_status_idx'),
+        ),
+    ]
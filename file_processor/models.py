@@ -1,3 +1,6 @@
+import os
+import uuid
+from django.conf import settings
 from django.db import models
 
 class FileUpload(models.Model):
@@ -7,13 +10,31 @@ class FileUpload(models.Model):
         ('completed', 'Completed'),
         ('failed', 'Failed'),
     ]
+    MODE_CHOICES = [
+        ('upsert', 'Upsert'),
+        ('sync', 'Sync'),  # Full catalog: products missing from the file are deactivated
+    ]
     
     file_name = models.CharField(max_length=255)
+    file_path = models.CharField(max_length=500, blank=True, default='')  # Storage name of the uploaded file
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES, default='upsert')
+    client = models.CharField(max_length=64, blank=True, default='')  # Address of the uploader, for per-client admission limits
     file_size = models.BigIntegerField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     progress = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
     processed_rows = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
     total_rows = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
+    inserted_rows = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
+    updated_rows = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
+    skipped_rows = models.IntegerField(default=0)  # type: ignore[reportArgumentType]  # Unchanged rows left untouched
+    processed_bytes = models.BigIntegerField(default=0)  # type: ignore[reportArgumentType]
+    rejected_rows = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
+    deactivated_rows = models.IntegerField(default=0)  # type: ignore[reportArgumentType]  # Products retired by a sync import
+    reject_reasons = models.JSONField(default=dict, blank=True)  # Rejected row count per reason
+    # Position after the last committed batch, where a redelivered or resumed import continues
+    checkpoint_offset = models.BigIntegerField(default=0)  # type: ignore[reportArgumentType]
+    checkpoint_row = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
+    checkpoint_line = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
     upload_duration = models.FloatField(default=0.0)  # type: ignore[reportArgumentType] # Duration in seconds
     error_message = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -22,6 +43,81 @@ class FileUpload(models.Model):
     class Meta:
         db_table = 'file_uploads'
         ordering = ['-created_at']
+        indexes = [
+            # Active imports counted by upload admission
+            models.Index(fields=['status', 'client'], name='file_uploads_status_idx'),
+        ]
+        
+    def __str__(self):
+        return f"{self.file_name} - {self.status} ({self.progress}%)"
+
+
+class UploadSession(models.Model):
+    """
+    A resumable upload sent as numbered chunks
+    Each chunk is written to its own part file so a failed chunk can be re-sent on its own
+    """
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('completed', 'Completed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file_name = models.CharField(max_length=255)
+    file_size = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    mode = models.CharField(max_length=20, choices=FileUpload.MODE_CHOICES, default='upsert')  # Import mode of the completed upload
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    file_upload = models.ForeignKey(FileUpload, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'upload_sessions'
+        ordering = ['-created_at']
+        
+    def __str__(self):
+        return f"{self.file_name} - {self.status} ({len(self.received_chunks())}/{self.total_chunks} chunks)"
+    
+    @property
+    def total_chunks(self):
+        return max(1, -(-self.file_size // self.chunk_size))
+    
+    def chunk_dir(self):
+        return os.path.join(settings.MEDIA_ROOT, 'upload_sessions', str(self.id))
+    
+    def chunk_path(self, index):
+        return os.path.join(self.chunk_dir(), f'{index}.part')
+    
+    def expected_chunk_size(self, index):
+        if index == self.total_chunks - 1:
+            return self.file_size - self.chunk_size * index
+        return self.chunk_size
+    
+    def received_chunks(self):
+        """
+        Indexes of chunks stored on disk with the expected size
+        """
+        return [
+            index for index in range(self.total_chunks)
+            if os.path.exists(self.chunk_path(index))
+            and os.path.getsize(self.chunk_path(index)) == self.expected_chunk_size(index)
+        ]
+
+
+class ImportSeenSku(models.Model):
+    """
+    SKUs present in the file of a sync import, recorded with each batch
+    Products missing from it are deactivated once the whole file has been imported
+    """
+    file_upload = models.ForeignKey(FileUpload, on_delete=models.CASCADE)
+    sku = models.CharField(max_length=100)
+    
+    class Meta:
+        db_table = 'import_seen_skus'
+        constraints = [
+            models.UniqueConstraint(fields=['file_upload', 'sku'], name='import_seen_skus_upload_sku_uniq'),
+        ]
         
     def __str__(self):
-        return f"{self.file_name} - {self.status} ({self.progress}%)"
\ No newline at end of file
+        return f"{self.sku} seen by upload {self.file_upload_id}"  # type: ignore[reportAttributeAccessIssue]
@@ -0,0 +1,127 @@
+import json
+import redis
+from product_importer.redis_client import get_redis, mark_unavailable
+
+# FileUpload fields mirrored to Redis while an import runs
+LIVE_FIELDS = (
+    'status', 'progress', 'processed_rows', 'total_rows', 'inserted_rows', 'updated_rows',
+    'skipped_rows', 'rejected_rows', 'processed_bytes', 'upload_duration', 'error_message',
+)
+# Live progress outlives any import; it is only a cache of the FileUpload row
+PROGRESS_TTL = 24 * 60 * 60
+
+
+def progress_key(upload_id):
+    return f'file_upload:{upload_id}:progress'
+
+
+def progress_channel(upload_id):
+    return f'file_upload:{upload_id}:events'
+
+
+def publish_progress(upload_id, **fields):
+    """
+    Store live FileUpload fields in Redis and notify stream listeners
+    Returns False when Redis is unavailable, so callers can write to the database instead
+    """
+    client = get_redis()
+    if client is None:
+        return False
+    try:
+        pipe = client.pipeline()
+        pipe.hset(progress_key(upload_id), mapping={name: json.dumps(value) for name, value in fields.items()})
+        pipe.expire(progress_key(upload_id), PROGRESS_TTL)
+        pipe.publish(progress_channel(upload_id), 'progress')
+        pipe.execute()
+        return True
+    except redis.RedisError as e:
+        mark_unavailable(e)
+        return False
+
+
+def publish_upload(file_upload):
+    """
+    Publish the in-memory state of a FileUpload
+    """
+    return publish_progress(file_upload.id, **{name: getattr(file_upload, name) for name in LIVE_FIELDS})
+
+
+def add_progress(upload_id, total_bytes, **deltas):
+    """
+    Atomically add counter deltas to the live progress of a parallel import
+    progress is derived from processed_bytes so concurrent chunks never overwrite each other
+    Returns False when Redis is unavailable
+    """
+    client = get_redis()
+    if client is None:
+        return False
+    key = progress_key(upload_id)
+    try:
+        pipe = client.pipeline()
+        for name, value in deltas.items():
+            pipe.hincrby(key, name, value)
+        processed_bytes = pipe.execute()[list(deltas).index('processed_bytes')]
+        pipe.hset(key, 'progress', json.dumps(min(int(processed_bytes * 100 / max(total_bytes, 1)), 100)))
+        pipe.expire(key, PROGRESS_TTL)
+        pipe.publish(progress_channel(upload_id), 'progress')
+        pipe.execute()
+        return True
+    except redis.RedisError as e:
+        mark_unavailable(e)
+        return False
+
+
+def reset_progress(file_upload):
+    """
+    Drop live progress left by an earlier run and publish the FileUpload as it is now
+    """
+    client = get_redis()
+    if client is None:
+        return False
+    try:
+        client.delete(progress_key(file_upload.id))
+    except redis.RedisError as e:
+        mark_unavailable(e)
+        return False
+    return publish_upload(file_upload)
+
+
+def read_progress(upload_id):
+    """
+    Live fields of an upload, or an empty dict if none are stored
+    """
+    client = get_redis()
+    if client is None:
+        return {}
+    try:
+        stored = client.hgetall(progress_key(upload_id))
+    except redis.RedisError as e:
+        mark_unavailable(e)
+        return {}
+    return {name.decode(): json.loads(value) for name, value in stored.items()}
+
+
+def live_status(file_upload, data):
+    """
+    Overlay live progress on serialized FileUpload data while the import is running
+    Pending and finished uploads are always reported from the database row
+    """
+    if file_upload.status == 'processing':
+        data.update(read_progress(file_upload.id))
+    return data
+
+
+def subscribe(upload_id):
+    """
+    PubSub subscribed to the progress notifications of one upload, or None without Redis
+    """
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(progress_channel(upload_id))
+        return pubsub
+    except redis.RedisError as e:
+        mark_unavailable(e)
+        return None
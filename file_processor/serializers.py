@@ -1,8 +1,21 @@
 from rest_framework import serializers
-from .models import FileUpload
+from .models import FileUpload, UploadSession
 
 class FileUploadSerializer(serializers.ModelSerializer):
     class Meta:
         model = FileUpload
+        # The status API is unauthenticated: the uploader's address and the storage path stay server-side
+        exclude = ('client', 'file_path')
+        read_only_fields = ('created_at', 'updated_at')
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    total_chunks = serializers.IntegerField(read_only=True)
+    received_chunks = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
         fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at')
\ No newline at end of file
+        read_only_fields = ('chunk_size', 'status', 'file_upload', 'created_at', 'updated_at')
+
+    def get_received_chunks(self, obj):
+        return obj.received_chunks()
\ No newline at end of file
@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Sum
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from products.models import Product
+from products.stats import StatsDelta, bucket_sql
+from products.cache import bump_catalog_version
+from webhooks.outbox import PRODUCT_EVENT_FIELDS, is_subscribed, product_data, record_product_events
+from .models import ImportSeenSku
+from .validation import SKU_MAX_LENGTH
+
+
+def get_sync_chunk_size():
+    """
+    Width of the product id ranges a sync deactivates per statement
+    """
+    return getattr(settings, 'PRODUCT_SYNC_CHUNK_SIZE', 10000)
+
+
+def seen_sku(row):
+    """
+    Normalized SKU of a CSV row for a sync import, or None if it cannot name a product
+    Rejected rows still count as seen, so an invalid line never retires its product
+    """
+    sku = (row.get('sku') or '').strip().upper()
+    return sku if sku and len(sku) <= SKU_MAX_LENGTH else None
+
+
+def record_seen(upload_id, skus):
+    """
+    Remember SKUs present in the file; runs in the transaction of the batch they came from
+    """
+    ImportSeenSku.objects.bulk_create(  # type: ignore[reportAttributeAccessIssue]
+        [ImportSeenSku(file_upload_id=upload_id, sku=sku) for sku in set(skus)],
+        ignore_conflicts=True,
+    )
+
+
+def deactivate_unseen(file_upload):
+    """
+    Set active=False on every active product the sync import did not see
+    Walks the products table in id ranges with one anti-join UPDATE per range, so neither
+    the catalog nor the seen SKUs are loaded into Python; returns the number deactivated
+    The content hash is cleared, so a product that reappears in a later file is rewritten
+    product_updated events are only read out of each range when a webhook subscribes to them
+    """
+    chunk_size = get_sync_chunk_size()
+    notify = is_subscribed('product_updated')
+    products = Product.objects.filter(active=True).exclude(  # type: ignore[reportAttributeAccessIssue]
+        Exists(ImportSeenSku.objects.filter(file_upload=file_upload, sku=OuterRef('sku')))  # type: ignore[reportAttributeAccessIssue]
+    )
+    ids = Product.objects.order_by('pk').values_list('pk', flat=True)  # type: ignore[reportAttributeAccessIssue]
+    first_id = ids.first() or 0
+    last_id = ids.reverse().first() or 0
+    deactivated = 0
+
+    for start in range(first_id, last_id + 1, chunk_size):
+        missing = products.filter(pk__gte=start, pk__lt=start + chunk_size)
+        with transaction.atomic():
+            moves = missing.annotate(
+                bucket=RawSQL(bucket_sql('"products"."price"'), [])
+            ).values('bucket').annotate(count=Count('pk'), total=Sum('price')).order_by()
+            stats = StatsDelta()
+            for move in moves:
+                stats.change(move['bucket'], True, -move['count'], -move['total'])
+                stats.change(move['bucket'], False, move['count'], move['total'])
+            changed = [product_data(dict(row, active=False)) for row in missing.values(*PRODUCT_EVENT_FIELDS)] if notify else []
+            count = missing.update(active=False, content_hash='', updated_at=timezone.now())
+            stats.apply()
+            record_product_events({'product_updated': changed})
+        deactivated += count
+
+    ImportSeenSku.objects.filter(file_upload=file_upload).delete()  # type: ignore[reportAttributeAccessIssue]
+    if deactivated:
+        bump_catalog_version()
+    return deactivated
+
+
+SYNC_SKIPPED = 'Products missing from the file were not deactivated because some batches failed'
+
+
+def finish_sync(file_upload, errors):
+    """
+    Deactivate the products a completed sync import did not see
+    A batch that failed took its seen SKUs with it, so nothing is deactivated then
+    """
+    if errors:
+        ImportSeenSku.objects.filter(file_upload=file_upload).delete()  # type: ignore[reportAttributeAccessIssue]
+        file_upload.error_message = '\n'.join(filter(None, [file_upload.error_message, SYNC_SKIPPED]))
+        print(f"Sync of upload {file_upload.id} skipped: {len(errors)} batch errors")
+        return
+    file_upload.deactivated_rows = deactivate_unseen(file_upload)
+    print(f"Sync of upload {file_upload.id} deactivated {file_upload.deactivated_rows} products")
@@ -1,113 +1,110 @@
 import os
-import csv
 import time
-from celery import shared_task
-from django.db import transaction, connection
+import shutil
+from celery import shared_task, chord
+from celery.exceptions import SoftTimeLimitExceeded
 from django.conf import settings
-from products.models import Product
+from django.db import transaction
 from .models import FileUpload
+from .importers import get_importer, get_chunk_bytes, plan_chunks, ChunkImporter
+from .validation import rejects_dir
+from .compression import is_compressed
+from .progress import LIVE_FIELDS, publish_upload, reset_progress
+from .sync import finish_sync
+from products.cache import bump_catalog_version
+from webhooks.outbox import record_event
+
+def save_upload(file_upload, event_type, **kwargs):
+    """
+    Save the FileUpload and append its bulk_import_* webhook event in the same transaction
+    """
+    with transaction.atomic():
+        file_upload.save(**kwargs)
+        record_event(event_type, lambda: dict(
+            {name: getattr(file_upload, name) for name in LIVE_FIELDS},
+            upload_id=file_upload.id,
+            file_name=file_upload.file_name,
+            mode=file_upload.mode,
+            deactivated_rows=file_upload.deactivated_rows,
+        ))
 
 @shared_task
 def process_csv_file(upload_id, file_path):
     """
     Process a CSV file and import products
     Uses batch processing with connection management for memory efficiency
+    Large files are split into chunks that run in parallel when PRODUCT_IMPORT_CHUNK_BYTES is set
+    A redelivered or resumed task continues from the FileUpload checkpoint
     """
     file_upload = None
     start_time = time.time()  # Track start time for upload duration
     
     try:
         file_upload = FileUpload.objects.get(id=upload_id)  # type: ignore
+        if file_upload.status == 'completed':
+            # Redelivered after the import already finished
+            return
+        if file_upload.checkpoint_offset:
+            # Keep counting the duration from where the interrupted run left off
+            start_time -= file_upload.upload_duration
         file_upload.status = 'processing'
-        file_upload.save()
+        if file_upload.checkpoint_offset:
+            # Subscribers heard about the start before the interruption
+            file_upload.save()
+        else:
+            save_upload(file_upload, 'bulk_import_started')
+        reset_progress(file_upload)
         
         full_file_path = os.path.join(settings.MEDIA_ROOT, file_path)
         
-        # Process file in batches to minimize memory usage and database connections
-        batch_size = 100  # Process 100 rows per batch
-        processed_rows = 0
+        # Fan large files out to chunk tasks; the finalizer marks the upload completed
+        # Compressed streams cannot be entered at a byte offset, so they are imported serially
+        chunk_bytes = get_chunk_bytes()
+        if chunk_bytes and not is_compressed(file_path) and os.path.getsize(full_file_path) > chunk_bytes:
+            header, ranges = plan_chunks(full_file_path, chunk_bytes)
+            if len(ranges) > 1:
+                # Chunks add to the counters, so a re-run starts them from zero; the header precedes every chunk
+                counters = dict(
+                    processed_rows=0, inserted_rows=0, updated_rows=0, skipped_rows=0,
+                    rejected_rows=0, processed_bytes=ranges[0][0], progress=0,
+                )
+                FileUpload.objects.filter(id=upload_id).update(reject_reasons={}, **counters)  # type: ignore
+                for name, value in counters.items():
+                    setattr(file_upload, name, value)
+                reset_progress(file_upload)
+                shutil.rmtree(rejects_dir(upload_id), ignore_errors=True)
+                chord(
+                    import_csv_chunk.s(upload_id, file_path, header, start, end, lines_before, start_time)  # pyright: ignore[reportFunctionMemberAccess]
+                    for start, end, lines_before in ranges
+                )(finalize_csv_import.s(upload_id, start_time))  # pyright: ignore[reportFunctionMemberAccess]
+                return
+
+        # Import with the backend suited to the database vendor
+        importer = get_importer(file_upload, full_file_path, start_time)
+        importer.run()
+        # Batches that failed to write are reported; the rest of the file was imported
+        errors = getattr(importer, 'errors', [])
+        file_upload.error_message = '\n'.join(errors) or None
+        if file_upload.mode == 'sync':
+            finish_sync(file_upload, errors)
         
-        # First pass: count total rows (memory efficient)
-        with open(full_file_path, 'r', encoding='utf-8') as csvfile:
-            total_rows = sum(1 for line in csvfile) - 1  # -1 for header
-            file_upload.total_rows = total_rows
-            file_upload.save()
+        file_upload.status = 'completed'
+        
+        # Store final upload duration
+        elapsed_time = time.time() - start_time
+        file_upload.upload_duration = elapsed_time
+        
+        save_upload(file_upload, 'bulk_import_completed')
+        publish_upload(file_upload)
+        bump_catalog_version()
         
-        # Second pass: process in batches
-        with open(full_file_path, 'r', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            batch = []
-            
-            for row in reader:
-                batch.append(row)
-                processed_rows += 1
-                
-                # Process batch when it reaches batch_size or at the end of file
-                if len(batch) >= batch_size or processed_rows == total_rows:
-                    # Process this batch
-                    try:
-                        with transaction.atomic():  # type: ignore
-                            for batch_row in batch:
-                                # Process each row in the batch
-                                sku = batch_row.get('sku', '').upper()
-                                name = batch_row.get('name', '')
-                                description = batch_row.get('description', '')
-                                price = batch_row.get('price', 0)
-                                
-                                # Create or update product
-                                product, created = Product.objects.update_or_create(  # type: ignore
-                                    sku=sku,
-                                    defaults={
-                                        'name': name,
-                                        'description': description,
-                                        'price': price,
-                                        'active': True
-                                    }
-                                )
-                    except Exception as e:
-                        # Log the error but continue processing
-                        print(f"Error processing batch: {str(e)}")
-                    
-                    # Clear batch for next batch
-                    batch = []
-                    
-                    # Close database connections periodically to prevent memory leaks
-                    if processed_rows % 1000 == 0:
-                        connection.close()
-                    
-                    # Update progress less frequently to reduce database writes
-                    # For better real-time feedback, update every 5 rows for small files, 
-                    # every 20 rows for medium files, and every 100 rows for large files
-                    if total_rows <= 100:
-                        update_frequency = 5
-                    elif total_rows <= 1000:
-                        update_frequency = 20
-                    else:
-                        update_frequency = 100
-                        
-                    if processed_rows % update_frequency == 0 or processed_rows == total_rows:
-                        try:
-                            progress = int((processed_rows / total_rows) * 100)
-                            file_upload.progress = progress
-                            file_upload.processed_rows = processed_rows
-                            
-                            # Calculate and store upload duration
-                            elapsed_time = time.time() - start_time
-                            file_upload.upload_duration = elapsed_time
-                            
-                            file_upload.save()
-                        except Exception as e:
-                            print(f"Error updating progress: {str(e)}")
-            
-            file_upload.status = 'completed'
-            
-            # Store final upload duration
-            elapsed_time = time.time() - start_time
-            file_upload.upload_duration = elapsed_time
-            
-            file_upload.save()
-            
     except Exception as e:
+        if isinstance(e, SoftTimeLimitExceeded) and file_upload and file_upload.checkpoint_offset:
+            # Continue from the checkpoint in a fresh task instead of hitting the hard time limit
+            print(f"Time limit reached, continuing upload {upload_id} from row {file_upload.checkpoint_row}")
+            process_csv_file.delay(upload_id, file_path)  # pyright: ignore[reportFunctionMemberAccess]
+            return
+        
         if file_upload:
             file_upload.status = 'failed'
             file_upload.error_message = str(e)
@@ -116,6 +113,72 @@ def process_csv_file(upload_id, file_path):
             elapsed_time = time.time() - start_time
             file_upload.upload_duration = elapsed_time
             
-            file_upload.save()
+            save_upload(file_upload, 'bulk_import_failed')
+            publish_upload(file_upload)
+            # Batches committed before the failure changed the catalog too
+            bump_catalog_version()
         print(f"Fatal error in process_csv_file: {str(e)}")
-        raise e
\ No newline at end of file
+        raise e
+
+@shared_task
+def import_csv_chunk(upload_id, file_path, header, start, end, lines_before, start_time):
+    """
+    Import one row-aligned byte range of a CSV file
+    Never raises, so a failing chunk cannot stop the chord; the result carries its own rows and errors
+    """
+    result = {
+        'start': start, 'end': end, 'rows': 0, 'inserted': 0, 'updated': 0, 'skipped': 0,
+        'rejected': 0, 'reject_reasons': {}, 'errors': [], 'failed': False,
+    }
+    try:
+        file_upload = FileUpload.objects.get(id=upload_id)  # type: ignore
+        full_file_path = os.path.join(settings.MEDIA_ROOT, file_path)
+        importer = ChunkImporter(file_upload, full_file_path, start_time, header, start, end, lines_before)
+        importer.run()
+        result.update(
+            rows=importer.processed_rows,
+            inserted=importer.inserted_rows,
+            updated=importer.updated_rows,
+            skipped=importer.skipped_rows,
+            rejected=importer.rejects.rejected,
+            reject_reasons=importer.rejects.counts,
+            errors=importer.errors,
+        )
+    except Exception as e:
+        print(f"Fatal error in import_csv_chunk {start}-{end}: {str(e)}")
+        result.update(failed=True, errors=[str(e)])
+    return result
+
+@shared_task
+def finalize_csv_import(results, upload_id, start_time):
+    """
+    Chord callback: settle the FileUpload once every chunk has finished
+    """
+    file_upload = FileUpload.objects.get(id=upload_id)  # type: ignore
+    failed_chunks = [result for result in results if result['failed']]
+    errors = [
+        f"bytes {result['start']}-{result['end']}: {error}"
+        for result in results
+        for error in result['errors']
+    ]
+    
+    reject_reasons = {}
+    for result in results:
+        for reason, count in result['reject_reasons'].items():
+            reject_reasons[reason] = reject_reasons.get(reason, 0) + count
+    
+    file_upload.total_rows = sum(result['rows'] for result in results)
+    file_upload.reject_reasons = reject_reasons
+    file_upload.status = 'failed' if failed_chunks else 'completed'
+    file_upload.error_message = '\n'.join(errors) or None
+    if not failed_chunks:
+        file_upload.progress = 100
+        if file_upload.mode == 'sync':
+            finish_sync(file_upload, errors)
+    file_upload.upload_duration = time.time() - start_time
+    save_upload(file_upload, f'bulk_import_{file_upload.status}', update_fields=[
+        'total_rows', 'reject_reasons', 'status', 'error_message', 'progress', 'deactivated_rows',
+        'upload_duration', 'updated_at',
+    ])
+    publish_upload(file_upload)
+    bump_catalog_version()
\ No newline at end of file
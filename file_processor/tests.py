@@ -1,3 +1,825 @@
-from django.test import TestCase
+import bz2
+import gzip
+import io
+import lzma
+import os
+import shutil
+import tempfile
+import zipfile
+from decimal import Decimal
+from unittest import mock, skipUnless
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DataError, connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from product_importer import redis_client
+from products.models import Product
+from webhooks import subscriptions
+from . import admission, validation
+from .compression import DecompressionBombError, GuardedStream
+from .importers import OrmUpsertWriter, PostgresCopyImporter, PostgresUpsertWriter, csv_header, get_upsert_writer, plan_chunks
+from .models import FileUpload, ImportSeenSku
+from .sync import SYNC_SKIPPED
+from .tasks import process_csv_file
+from .validation import clean_row, RowRejected
 
-# Create your tests here.
+
+@override_settings(CELERY_BROKER_URL='memory://', PRODUCT_IMPORT_BACKEND='batch', PRODUCT_IMPORT_CHUNK_BYTES=0)
+class ImportTestCase(TestCase):
+    """
+    Runs process_csv_file in-process on uploads stored under a temporary MEDIA_ROOT, without Redis
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = self.settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        # A client or subscription index left by an earlier test would outlive its settings and rows
+        redis_client._client = None
+        subscriptions._index.invalidate()
+
+    def store_csv(self, text, file_name='products.csv'):
+        file_path = f'uploads/{file_name}'
+        full_file_path = os.path.join(settings.MEDIA_ROOT, file_path)
+        os.makedirs(os.path.dirname(full_file_path), exist_ok=True)
+        with open(full_file_path, 'w', encoding='utf-8', newline='') as csvfile:
+            csvfile.write(text)
+        return FileUpload.objects.create(  # type: ignore[reportAttributeAccessIssue]
+            file_name=file_name,
+            file_path=file_path,
+            file_size=os.path.getsize(full_file_path),
+            mode='upsert',
+        )
+
+    def import_csv(self, text, **fields):
+        file_upload = self.store_csv(text)
+        FileUpload.objects.filter(id=file_upload.id).update(**fields)  # type: ignore[reportAttributeAccessIssue]
+        process_csv_file(file_upload.id, file_upload.file_path)
+        file_upload.refresh_from_db()
+        return file_upload
+
+    def skus(self, **filters):
+        return sorted(Product.objects.filter(**filters).values_list('sku', flat=True))  # type: ignore[reportAttributeAccessIssue]
+
+
+def catalog_csv(count, invalid=()):
+    """
+    CSV of count products SKU-000..., with an unparseable price on the rows numbered in invalid
+    """
+    rows = ['sku,name,price']
+    for i in range(count):
+        rows.append(f"sku-{i:03d},Product {i},{'n/a' if i in invalid else f'{i}.99'}")
+    return '\n'.join(rows) + '\n'
+
+
+class FailingWriter(OrmUpsertWriter):
+    """
+    Raises the given exception on the numbered write() calls and writes normally otherwise
+    """
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def write(self, rows):
+        self.calls += 1
+        if self.calls in self.failures:
+            raise self.failures[self.calls]
+        return super().write(rows)
+
+
+class CleanRowTests(TestCase):
+    def test_normalizes_sku_and_price(self):
+        row = clean_row({'sku': '  ab-1 ', 'name': 'Widget', 'description': None, 'price': ' 1.005 '})
+        self.assertEqual(row, {
+            'sku': 'AB-1', 'name': 'Widget', 'description': '', 'price': Decimal('1.01'), 'active': True,
+        })
+
+    def test_rejects_invalid_rows(self):
+        cases = [
+            ({'sku': ' ', 'name': 'Widget', 'price': '1'}, validation.MISSING_SKU),
+            ({'sku': 'A' * (validation.SKU_MAX_LENGTH + 1), 'name': 'Widget', 'price': '1'}, validation.SKU_TOO_LONG),
+            ({'sku': 'A1', 'name': '', 'price': '1'}, validation.MISSING_NAME),
+            ({'sku': 'A1', 'name': 'W' * (validation.NAME_MAX_LENGTH + 1), 'price': '1'}, validation.NAME_TOO_LONG),
+            ({'sku': 'A1', 'name': 'Widget', 'price': '1e3'}, validation.INVALID_PRICE),
+            ({'sku': 'A1', 'name': 'Widget', 'price': '$5'}, validation.INVALID_PRICE),
+            ({'sku': 'A1', 'name': 'Widget'}, validation.INVALID_PRICE),
+            ({'sku': 'A1', 'name': 'Widget', 'price': str(validation.PRICE_LIMIT)}, validation.PRICE_OUT_OF_RANGE),
+        ]
+        for row, reason in cases:
+            with self.subTest(reason=reason, row=row):
+                with self.assertRaises(RowRejected) as raised:
+                    clean_row(row)
+                self.assertEqual(raised.exception.reason, reason)
+
+
+class RejectTests(ImportTestCase):
+    def test_invalid_rows_are_rejected_not_fatal(self):
+        file_upload = self.import_csv(
+            'sku,name,price\n'
+            'a1,Alpha,1.50\n'
+            ',No sku,2.00\n'
+            'b2,Beta,abc\n'
+            'c3,Gamma,3\n'
+        )
+
+        self.assertEqual(file_upload.status, 'completed')
+        self.assertEqual(self.skus(), ['A1', 'C3'])
+        self.assertEqual(file_upload.processed_rows, 4)
+        self.assertEqual(file_upload.inserted_rows, 2)
+        self.assertEqual(file_upload.rejected_rows, 2)
+        self.assertEqual(file_upload.reject_reasons, {validation.MISSING_SKU: 1, validation.INVALID_PRICE: 1})
+
+    def test_rejects_download_lists_file_lines_and_reasons(self):
+        file_upload = self.import_csv(
+            'sku,name,price\n'
+            'a1,"Alpha\nwith a line break",1\n'
+            'b2,Beta,-\n'
+        )
+
+        response = self.client.get(f'/api/file-processor/status/{file_upload.id}/rejects/')
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual(lines, ['line,reason,sku,name,price', f'4,{validation.INVALID_PRICE},b2,Beta,-'])
+
+
+# Every written batch stores its checkpoint
+@override_settings(PRODUCT_IMPORT_BATCH_SIZE=100, PRODUCT_IMPORT_PROGRESS_FLUSH_SECONDS=0)
+class CheckpointTests(ImportTestCase):
+    def run_with_writer(self, writer, **delay):
+        with mock.patch('file_processor.importers.get_upsert_writer', return_value=writer), \
+                mock.patch.object(process_csv_file, 'delay', **delay) as queued:
+            file_upload = self.import_csv(catalog_csv(300))
+        return file_upload, queued
+
+    def test_soft_time_limit_continues_from_checkpoint(self):
+        writer = FailingWriter({3: SoftTimeLimitExceeded()})
+        file_upload, queued = self.run_with_writer(writer, side_effect=lambda *args: process_csv_file(*args))
+
+        self.assertEqual(queued.call_count, 1)
+        self.assertEqual(file_upload.status, 'completed')
+        self.assertIsNone(file_upload.error_message)
+        self.assertEqual(Product.objects.count(), 300)  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual((file_upload.processed_rows, file_upload.inserted_rows), (300, 300))
+
+    def test_failed_batch_is_rejected_before_an_interruption(self):
+        # Batch 2 fails and is rejected, then the time limit hits batch 3 after the checkpoint moved past batch 2
+        writer = FailingWriter({2: ValueError('batch failed'), 3: SoftTimeLimitExceeded()})
+        file_upload, _ = self.run_with_writer(writer, side_effect=lambda *args: process_csv_file(*args))
+
+        self.assertEqual(file_upload.status, 'completed')
+        self.assertEqual(Product.objects.count(), 200)  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual((file_upload.processed_rows, file_upload.inserted_rows), (300, 200))
+        self.assertEqual(file_upload.reject_reasons, {validation.WRITE_FAILED: 100})
+        rejects = self.client.get(f'/api/file-processor/status/{file_upload.id}/rejects/')
+        lines = b''.join(rejects.streaming_content).decode().splitlines()  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual([int(line.split(',')[0]) for line in lines[1:]], list(range(102, 202)))
+
+    def test_failed_batch_is_reported(self):
+        writer = FailingWriter({2: ValueError('batch failed')})
+        file_upload, _ = self.run_with_writer(writer)
+
+        self.assertEqual(file_upload.status, 'completed')
+        self.assertEqual(file_upload.error_message, 'batch failed')
+        self.assertEqual(Product.objects.count(), 200)  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual((file_upload.processed_rows, file_upload.rejected_rows), (300, 100))
+        self.assertEqual(file_upload.reject_reasons, {validation.WRITE_FAILED: 100})
+
+    def test_resume_continues_a_lost_import(self):
+        # The worker is lost after the time limit, so the continuation never runs
+        file_upload = self.store_csv(catalog_csv(300, invalid={50, 250}))
+        with mock.patch('file_processor.importers.get_upsert_writer', return_value=FailingWriter({3: SoftTimeLimitExceeded()})), \
+                mock.patch.object(process_csv_file, 'delay'):
+            process_csv_file(file_upload.id, file_upload.file_path)
+        file_upload.refresh_from_db()
+        self.assertEqual((file_upload.status, file_upload.checkpoint_row), ('processing', 200))
+        FileUpload.objects.filter(id=file_upload.id).update(status='failed')  # type: ignore[reportAttributeAccessIssue]
+
+        with mock.patch.object(process_csv_file, 'delay', side_effect=lambda *args: process_csv_file(*args)):
+            response = self.client.post(f'/api/file-processor/status/{file_upload.id}/resume/')
+        self.assertEqual(response.status_code, 202)
+
+        file_upload.refresh_from_db()
+        self.assertEqual(file_upload.status, 'completed')
+        self.assertEqual(Product.objects.count(), 298)  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual((file_upload.inserted_rows, file_upload.skipped_rows), (298, 0))
+        self.assertEqual(file_upload.reject_reasons, {validation.INVALID_PRICE: 2})
+        rejects = self.client.get(f'/api/file-processor/status/{file_upload.id}/rejects/')
+        self.assertEqual(len(b''.join(rejects.streaming_content).splitlines()), 3)  # type: ignore[reportAttributeAccessIssue]
+
+
+class ByteOrderMarkTests(ImportTestCase):
+    """
+    Excel exports start with a UTF-8 byte order mark that must not become part of the first column
+    """
+
+    def test_header_helper_strips_byte_order_mark(self):
+        self.assertEqual(csv_header('\ufeffsku,name,price\r\n'.encode()), ['sku', 'name', 'price'])
+
+    def test_batch_import(self):
+        file_upload = self.import_csv('\ufeffsku,name,price\na1,Alpha,1\n')
+
+        self.assertEqual((file_upload.status, file_upload.rejected_rows), ('completed', 0))
+        self.assertEqual(self.skus(), ['A1'])
+
+    def test_parallel_import_header(self):
+        file_upload = self.store_csv('\ufeffsku,name,price\n' + 'a1,Alpha,1\n' * 10)
+        header, ranges = plan_chunks(os.path.join(settings.MEDIA_ROOT, file_upload.file_path), 20)
+
+        self.assertEqual(header, ['sku', 'name', 'price'])
+        self.assertGreater(len(ranges), 1)
+
+
+class ProgressPubSub:
+    """
+    Stands in for a Redis subscription: the first message arrives after on_message has changed the upload
+    """
+
+    def __init__(self, on_message):
+        self.on_message = on_message
+        self.closed = False
+
+    def get_message(self, timeout=0):
+        if self.on_message is None:
+            return None
+        self.on_message()
+        self.on_message = None
+        return {'type': 'message', 'data': b'1'}
+
+    def close(self):
+        self.closed = True
+
+
+class StatusLongPollTests(ImportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.file_upload = self.store_csv(catalog_csv(10))
+        FileUpload.objects.filter(id=self.file_upload.id).update(status='processing')  # type: ignore[reportAttributeAccessIssue]
+        self.url = f'/api/file-processor/status/{self.file_upload.id}/'
+
+    def etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_unchanged_status_is_not_modified(self):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag())
+        self.assertEqual(response.status_code, 304)
+
+    def test_held_request_answers_when_progress_changes(self):
+        etag = self.etag()
+        pubsub = ProgressPubSub(lambda: FileUpload.objects.filter(id=self.file_upload.id).update(processed_rows=5))  # type: ignore[reportAttributeAccessIssue]
+        with mock.patch('file_processor.views.subscribe', return_value=pubsub):
+            response = self.client.get(f'{self.url}?wait=5', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['processed_rows'], 5)  # type: ignore[reportAttributeAccessIssue]
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertTrue(pubsub.closed)
+
+    def test_held_request_times_out_unchanged(self):
+        with mock.patch('file_processor.views.subscribe', return_value=ProgressPubSub(None)):
+            response = self.client.get(f'{self.url}?wait=0.1', HTTP_IF_NONE_MATCH=self.etag())
+
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(response.has_header('Retry-After'))
+
+    def test_request_is_not_held_without_redis(self):
+        response = self.client.get(f'{self.url}?wait=5', HTTP_IF_NONE_MATCH=self.etag())
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Retry-After'], '1')
+
+    @override_settings(PROGRESS_MAX_WAITERS=0)
+    def test_held_requests_are_bounded(self):
+        with mock.patch('file_processor.views.subscribe') as subscribe:
+            response = self.client.get(f'{self.url}?wait=5', HTTP_IF_NONE_MATCH=self.etag())
+
+        subscribe.assert_not_called()
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_status_hides_uploader_address_and_storage_path(self):
+        FileUpload.objects.filter(id=self.file_upload.id).update(client='203.0.113.7')  # type: ignore[reportAttributeAccessIssue]
+        data = self.client.get(self.url).json()  # type: ignore[reportAttributeAccessIssue]
+
+        self.assertNotIn('client', data)
+        self.assertNotIn('file_path', data)
+        self.assertEqual(data['file_name'], 'products.csv')
+
+
+
+class SyncTests(ImportTestCase):
+    def setUp(self):
+        super().setUp()
+        for sku in ('KEEP', 'GONE', 'BAD'):
+            Product.objects.create(sku=sku, name=sku.title(), price=Decimal('1.00'))  # type: ignore[reportAttributeAccessIssue]
+
+    def sync_csv(self):
+        # BAD is rejected for its price but still named by the file
+        return 'sku,name,price\nkeep,Keep,1\nnew,New,2\nbad,Bad,n/a\n'
+
+    def test_products_missing_from_the_file_are_deactivated(self):
+        file_upload = self.import_csv(self.sync_csv(), mode='sync')
+
+        self.assertEqual(file_upload.status, 'completed')
+        self.assertEqual(file_upload.rejected_rows, 1)
+        self.assertEqual(file_upload.deactivated_rows, 1)
+        self.assertEqual(self.skus(active=False), ['GONE'])
+        self.assertEqual(self.skus(active=True), ['BAD', 'KEEP', 'NEW'])
+        self.assertFalse(ImportSeenSku.objects.exists())  # type: ignore[reportAttributeAccessIssue]
+
+    def test_failed_batch_skips_deactivation(self):
+        with mock.patch('file_processor.importers.get_upsert_writer', return_value=FailingWriter({1: ValueError('batch failed')})):
+            file_upload = self.import_csv(self.sync_csv(), mode='sync')
+
+        self.assertEqual(file_upload.deactivated_rows, 0)
+        self.assertEqual(file_upload.error_message, f'batch failed\n{SYNC_SKIPPED}')
+        self.assertEqual(self.skus(active=False), [])
+        self.assertFalse(ImportSeenSku.objects.exists())  # type: ignore[reportAttributeAccessIssue]
+
+    def test_upsert_leaves_missing_products_active(self):
+        file_upload = self.import_csv(self.sync_csv())
+
+        self.assertEqual(file_upload.deactivated_rows, 0)
+        self.assertEqual(self.skus(active=False), [])
+        self.assertFalse(ImportSeenSku.objects.exists())  # type: ignore[reportAttributeAccessIssue]
+
+
+@override_settings(UPLOAD_CHUNK_SIZE=16)
+class UploadSessionTests(ImportTestCase):
+    """
+    Resumable uploads: create a session, PUT its chunks in any order, then complete it
+    """
+
+    def create_session(self, content, file_name='products.csv'):
+        response = self.client.post(
+            '/api/file-processor/uploads/', {'file_name': file_name, 'file_size': len(content)}, format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()  # type: ignore[reportAttributeAccessIssue]
+
+    def put_chunk(self, session, index, data):
+        return self.client.put(
+            f"/api/file-processor/uploads/{session['id']}/chunks/{index}/", data, content_type='application/octet-stream',
+        )
+
+    def put_chunks(self, session, content, indexes=None):
+        chunk_size = session['chunk_size']
+        for index in indexes if indexes is not None else range(session['total_chunks']):
+            response = self.put_chunk(session, index, content[index * chunk_size:(index + 1) * chunk_size])
+            self.assertEqual(response.status_code, 200)
+
+    def complete(self, session):
+        return self.client.post(f"/api/file-processor/uploads/{session['id']}/complete/")
+
+    def session_status(self, session):
+        return self.client.get(f"/api/file-processor/uploads/{session['id']}/").json()  # type: ignore[reportAttributeAccessIssue]
+
+    def test_chunks_are_joined_and_imported(self):
+        content = catalog_csv(3).encode()
+        session = self.create_session(content)
+        self.assertEqual(session['total_chunks'], 6)
+        self.put_chunks(session, content, [5, 2, 0, 3, 1, 4])
+        self.assertEqual(self.session_status(session)['received_chunks'], [0, 1, 2, 3, 4, 5])
+
+        with mock.patch.object(process_csv_file, 'delay', side_effect=lambda *args: process_csv_file(*args)) as queued:
+            response = self.complete(session)
+
+        self.assertEqual(response.status_code, 201)
+        file_upload = FileUpload.objects.get(id=response.json()['id'])  # type: ignore[reportAttributeAccessIssue]
+        queued.assert_called_once_with(file_upload.id, file_upload.file_path)
+        with open(os.path.join(settings.MEDIA_ROOT, file_upload.file_path), 'rb') as stored:
+            self.assertEqual(stored.read(), content)
+        self.assertEqual(file_upload.status, 'completed')
+        self.assertEqual(self.skus(), ['SKU-000', 'SKU-001', 'SKU-002'])
+        self.assertFalse(os.path.exists(os.path.join(settings.MEDIA_ROOT, 'upload_sessions', session['id'])))
+
+    def test_chunk_of_the_wrong_size_is_refused(self):
+        content = catalog_csv(3).encode()
+        session = self.create_session(content)
+
+        self.assertEqual(self.put_chunk(session, 0, content[:10]).status_code, 400)
+        self.assertEqual(self.put_chunk(session, 5, content[:16]).status_code, 400)
+        self.assertEqual(self.session_status(session)['received_chunks'], [])
+
+    def test_missing_chunks_are_listed_until_they_are_sent(self):
+        content = catalog_csv(3).encode()
+        session = self.create_session(content)
+        self.put_chunks(session, content, [0, 2, 4, 5])
+
+        with mock.patch.object(process_csv_file, 'delay') as queued:
+            response = self.complete(session)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['missing_chunks'], [1, 3])  # type: ignore[reportAttributeAccessIssue]
+            self.assertFalse(queued.called)
+
+            self.put_chunks(session, content, [1, 3])
+            self.assertEqual(self.complete(session).status_code, 201)
+
+    def test_second_complete_answers_with_the_same_upload(self):
+        content = catalog_csv(3).encode()
+        session = self.create_session(content)
+        self.put_chunks(session, content)
+
+        with mock.patch.object(process_csv_file, 'delay') as queued:
+            first = self.complete(session)
+            second = self.complete(session)
+
+        self.assertEqual((first.status_code, second.status_code), (201, 200))
+        self.assertEqual(first.json()['id'], second.json()['id'])  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual(queued.call_count, 1)
+        self.assertEqual(FileUpload.objects.count(), 1)  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual(self.put_chunk(session, 0, content[:16]).status_code, 409)
+
+    def test_rejected_archive_keeps_the_session_and_its_chunks(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zip_file:
+            zip_file.writestr('a.csv', catalog_csv(1))
+            zip_file.writestr('b.csv', catalog_csv(1))
+        content = archive.getvalue()
+        session = self.create_session(content, file_name='products.zip')
+        self.put_chunks(session, content)
+
+        with mock.patch.object(process_csv_file, 'delay') as queued:
+            response = self.complete(session)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(queued.called)
+        self.assertFalse(FileUpload.objects.exists())  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual(os.listdir(os.path.join(settings.MEDIA_ROOT, 'uploads')), [])
+        status = self.session_status(session)
+        self.assertEqual(status['status'], 'open')
+        self.assertEqual(len(status['received_chunks']), session['total_chunks'])
+
+
+def cleaned(sku, name, price):
+    return clean_row({'sku': sku, 'name': name, 'price': price})
+
+
+class OrmUpsertWriterTests(TestCase):
+    writer_class = OrmUpsertWriter
+
+    def write(self, *rows):
+        return self.writer_class().write([cleaned(*row) for row in rows])
+
+    def prices(self):
+        return dict(Product.objects.values_list('sku', 'price'))  # type: ignore[reportAttributeAccessIssue]
+
+    def test_counts_inserted_updated_and_unchanged_rows(self):
+        self.assertEqual(self.write(('a', 'Alpha', '1'), ('b', 'Beta', '2')), (2, 0, 0))
+        self.assertEqual(self.write(('a', 'Alpha', '1.5'), ('b', 'Beta', '2'), ('c', 'Gamma', '3')), (1, 1, 1))
+        self.assertEqual(self.prices(), {'A': Decimal('1.50'), 'B': Decimal('2.00'), 'C': Decimal('3.00')})
+
+    def test_last_occurrence_of_a_sku_wins(self):
+        self.assertEqual(self.write(('a', 'Alpha', '1'), ('A', 'Alpha', '2')), (1, 0, 0))
+        self.assertEqual(self.prices(), {'A': Decimal('2.00')})
+
+    def test_empty_batch(self):
+        self.assertEqual(self.writer_class().write([]), (0, 0, 0))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'the native upsert needs PostgreSQL')
+class PostgresUpsertWriterTests(OrmUpsertWriterTests):
+    writer_class = PostgresUpsertWriter
+
+
+class UpsertWriterSelectionTests(TestCase):
+    @override_settings(PRODUCT_IMPORT_UPSERT_BACKEND='auto')
+    def test_auto_uses_the_native_writer_of_the_vendor(self):
+        expected = PostgresUpsertWriter if connection.vendor == 'postgresql' else OrmUpsertWriter
+        self.assertIsInstance(get_upsert_writer(), expected)
+
+    @override_settings(PRODUCT_IMPORT_UPSERT_BACKEND='orm')
+    def test_backend_setting_picks_the_writer(self):
+        self.assertIsInstance(get_upsert_writer(), OrmUpsertWriter)
+
+
+@override_settings(PRODUCT_IMPORT_BACKEND='copy')
+class CopyFallbackTests(ImportTestCase):
+    """
+    COPY itself needs PostgreSQL; these cover what happens when it gives up on a file
+    """
+
+    def import_with_copy_error(self, error):
+        with mock.patch.object(PostgresCopyImporter, 'copy_import', side_effect=error) as copy_import:
+            file_upload = self.import_csv(catalog_csv(3, invalid={1}))
+        self.assertTrue(copy_import.called)
+        return file_upload
+
+    def test_unparseable_file_is_imported_in_batches(self):
+        for error in (DataError('extra data after last expected column'), connection.Database.DataError('invalid byte sequence')):
+            with self.subTest(error=type(error)):
+                Product.objects.all().delete()  # type: ignore[reportAttributeAccessIssue]
+                file_upload = self.import_with_copy_error(error)
+
+                self.assertEqual(file_upload.status, 'completed')
+                self.assertIsNone(file_upload.error_message)
+                self.assertEqual(self.skus(), ['SKU-000', 'SKU-002'])
+                self.assertEqual((file_upload.inserted_rows, file_upload.rejected_rows), (2, 1))
+
+    def test_other_errors_fail_the_import(self):
+        file_upload = self.store_csv(catalog_csv(3))
+        with mock.patch.object(PostgresCopyImporter, 'copy_import', side_effect=ValueError("CSV file must have a 'sku' column")), \
+                self.assertRaises(ValueError):
+            process_csv_file(file_upload.id, file_upload.file_path)
+
+        file_upload.refresh_from_db()
+        self.assertEqual(file_upload.status, 'failed')
+        self.assertEqual(file_upload.error_message, "CSV file must have a 'sku' column")
+        self.assertFalse(Product.objects.exists())  # type: ignore[reportAttributeAccessIssue]
+
+
+def run_chord(header):
+    """
+    Stand-in for celery.chord that runs the chunk tasks and then the callback in-process
+    """
+    results = [signature.apply().get() for signature in header]
+    return lambda callback: callback.apply((results,)).get()
+
+
+@override_settings(PRODUCT_IMPORT_CHUNK_BYTES=200, PRODUCT_IMPORT_BATCH_SIZE=5)
+class ParallelImportTests(ImportTestCase):
+    def import_in_chunks(self, text):
+        file_upload = self.store_csv(text)
+        full_file_path = os.path.join(settings.MEDIA_ROOT, file_upload.file_path)
+        self.assertGreater(len(plan_chunks(full_file_path, settings.PRODUCT_IMPORT_CHUNK_BYTES)[1]), 3)
+        with mock.patch('file_processor.tasks.chord', side_effect=run_chord):
+            process_csv_file(file_upload.id, file_upload.file_path)
+        file_upload.refresh_from_db()
+        return file_upload
+
+    def test_chunk_counters_add_up(self):
+        # 10 products are unchanged and 10 have a new price in the file
+        for i in range(20):
+            Product.objects.create(sku=f'SKU-{i:03d}', name=f'Product {i}', price=Decimal(f'{i}.99' if i < 10 else '0'))  # type: ignore[reportAttributeAccessIssue]
+
+        file_upload = self.import_in_chunks(catalog_csv(60, invalid={30, 45}))
+
+        self.assertEqual((file_upload.status, file_upload.progress), ('completed', 100))
+        self.assertEqual((file_upload.total_rows, file_upload.processed_rows), (60, 60))
+        self.assertEqual(
+            (file_upload.inserted_rows, file_upload.updated_rows, file_upload.skipped_rows, file_upload.rejected_rows),
+            (38, 10, 10, 2),
+        )
+        self.assertEqual(file_upload.processed_bytes, file_upload.file_size)
+        self.assertEqual(file_upload.reject_reasons, {validation.INVALID_PRICE: 2})
+        self.assertEqual(Product.objects.count(), 58)  # type: ignore[reportAttributeAccessIssue]
+        rejects = self.client.get(f'/api/file-processor/status/{file_upload.id}/rejects/')
+        lines = b''.join(rejects.streaming_content).decode().splitlines()  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual([line.split(',')[:2] for line in lines[1:]], [['32', validation.INVALID_PRICE], ['47', validation.INVALID_PRICE]])
+
+    def test_rerun_starts_the_counters_from_zero(self):
+        file_upload = self.import_in_chunks(catalog_csv(60))
+        FileUpload.objects.filter(id=file_upload.id).update(status='processing')  # type: ignore[reportAttributeAccessIssue]
+
+        with mock.patch('file_processor.tasks.chord', side_effect=run_chord):
+            process_csv_file(file_upload.id, file_upload.file_path)
+        file_upload.refresh_from_db()
+
+        self.assertEqual((file_upload.processed_rows, file_upload.inserted_rows, file_upload.skipped_rows), (60, 0, 60))
+        self.assertEqual(file_upload.processed_bytes, file_upload.file_size)
+
+
+def multiline_csv(count):
+    """
+    CSV whose descriptions span three lines inside quotes
+    """
+    rows = ['sku,name,description,price']
+    for i in range(count):
+        rows.append(f'sku-{i:03d},Product {i},"Line one\nline two, with a comma\nline ""three""",{i}.99')
+    return '\n'.join(rows) + '\n'
+
+
+class MultilineFieldTests(ImportTestCase):
+    def test_total_rows_counts_records_not_lines(self):
+        file_upload = self.import_csv(multiline_csv(4) + 'bad,Bad,"two\nlines",n/a\n')
+
+        self.assertEqual((file_upload.status, file_upload.progress), ('completed', 100))
+        self.assertEqual((file_upload.total_rows, file_upload.processed_rows, file_upload.rejected_rows), (5, 5, 1))
+        self.assertEqual(
+            Product.objects.get(sku='SKU-003').description,  # type: ignore[reportAttributeAccessIssue]
+            'Line one\nline two, with a comma\nline "three"',
+        )
+        # The reject names the file line its record ends on
+        rejects = self.client.get(f'/api/file-processor/status/{file_upload.id}/rejects/')
+        self.assertIn(b'\r\n15,invalid price,', b''.join(rejects.streaming_content))  # type: ignore[reportAttributeAccessIssue]
+
+    @override_settings(PRODUCT_IMPORT_CHUNK_BYTES=150)
+    def test_chunks_never_split_a_quoted_record(self):
+        file_upload = self.store_csv(multiline_csv(20))
+        with mock.patch('file_processor.tasks.chord', side_effect=run_chord):
+            process_csv_file(file_upload.id, file_upload.file_path)
+        file_upload.refresh_from_db()
+
+        self.assertEqual(file_upload.status, 'completed')
+        self.assertEqual((file_upload.total_rows, file_upload.inserted_rows, file_upload.rejected_rows), (20, 20, 0))
+        self.assertEqual(set(Product.objects.values_list('description', flat=True)), {  # type: ignore[reportAttributeAccessIssue]
+            'Line one\nline two, with a comma\nline "three"',
+        })
+
+
+class ContentHashTests(ImportTestCase):
+    def counts(self, file_upload):
+        return file_upload.inserted_rows, file_upload.updated_rows, file_upload.skipped_rows
+
+    def test_unchanged_rows_are_skipped_on_reimport(self):
+        self.import_csv(catalog_csv(5))
+        updated_at = dict(Product.objects.values_list('sku', 'updated_at'))  # type: ignore[reportAttributeAccessIssue]
+
+        file_upload = self.import_csv(catalog_csv(5).replace('Product 3', 'Product three'))
+
+        self.assertEqual(self.counts(file_upload), (0, 1, 4))
+        changed = {sku for sku, at in Product.objects.values_list('sku', 'updated_at') if at != updated_at[sku]}  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual(changed, {'SKU-003'})
+
+    def test_saved_product_matches_the_import_fingerprint(self):
+        # Equal prices in another notation are still unchanged
+        Product.objects.create(sku='A1', name='Alpha', description='First', price=Decimal('1.5'))  # type: ignore[reportAttributeAccessIssue]
+
+        file_upload = self.import_csv('sku,name,description,price\na1,Alpha,First,1.50\n')
+
+        self.assertEqual(self.counts(file_upload), (0, 0, 1))
+
+    def test_inactive_product_is_reactivated(self):
+        Product.objects.create(sku='A1', name='Alpha', price=Decimal('1'), active=False)  # type: ignore[reportAttributeAccessIssue]
+
+        file_upload = self.import_csv('sku,name,price\nA1,Alpha,1\n')
+
+        self.assertEqual(self.counts(file_upload), (0, 1, 0))
+        self.assertTrue(Product.objects.get(sku='A1').active)  # type: ignore[reportAttributeAccessIssue]
+
+
+class CompressedUploadTests(ImportTestCase):
+    def upload(self, file_name, content):
+        with mock.patch.object(process_csv_file, 'delay', side_effect=lambda *args: process_csv_file(*args)):
+            return self.client.post('/api/file-processor/upload/', {'file': SimpleUploadedFile(file_name, content)})
+
+    def zip_bytes(self, **members):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for name, text in members.items():
+                zip_file.writestr(name, text)
+        return archive.getvalue()
+
+    def test_compressed_uploads_are_imported(self):
+        text = catalog_csv(50, invalid={7})
+        uploads = {
+            'products.csv.gz': gzip.compress(text.encode()),
+            'products.csv.bz2': bz2.compress(text.encode()),
+            'products.csv.xz': lzma.compress(text.encode()),
+            'products.zip': self.zip_bytes(**{'products.csv': text}),
+        }
+        for file_name, content in uploads.items():
+            with self.subTest(file_name=file_name):
+                Product.objects.all().delete()  # type: ignore[reportAttributeAccessIssue]
+                response = self.upload(file_name, content)
+                self.assertEqual(response.status_code, 201)
+
+                file_upload = FileUpload.objects.get(id=response.json()['id'])  # type: ignore[reportAttributeAccessIssue]
+                self.assertEqual((file_upload.status, file_upload.progress), ('completed', 100))
+                self.assertEqual((file_upload.total_rows, file_upload.inserted_rows, file_upload.rejected_rows), (50, 49, 1))
+                # Progress follows the stored, compressed bytes
+                self.assertEqual(file_upload.processed_bytes, len(content))
+                self.assertEqual(Product.objects.count(), 49)  # type: ignore[reportAttributeAccessIssue]
+
+    def test_zip_with_several_members_is_refused(self):
+        response = self.upload('products.zip', self.zip_bytes(**{'a.csv': catalog_csv(1), 'b.csv': catalog_csv(1)}))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Zip uploads must contain exactly one CSV file')  # type: ignore[reportAttributeAccessIssue]
+        self.assertFalse(FileUpload.objects.exists())  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual(os.listdir(os.path.join(settings.MEDIA_ROOT, 'uploads')), [])
+
+    @override_settings(MAX_COMPRESSION_RATIO=2)
+    def test_zip_declaring_a_bomb_is_refused(self):
+        response = self.upload('products.zip', self.zip_bytes(**{'products.csv': catalog_csv(1) * 500}))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(FileUpload.objects.exists())  # type: ignore[reportAttributeAccessIssue]
+
+    @override_settings(MAX_COMPRESSION_RATIO=2)
+    def test_import_stops_at_the_decompression_limit(self):
+        file_upload = self.store_csv('', file_name='products.csv.gz')
+        full_file_path = os.path.join(settings.MEDIA_ROOT, file_upload.file_path)
+        with open(full_file_path, 'wb') as stored:
+            stored.write(gzip.compress(catalog_csv(1000).encode()))
+
+        with self.assertRaises(DecompressionBombError):
+            process_csv_file(file_upload.id, file_upload.file_path)
+
+        file_upload.refresh_from_db()
+        self.assertEqual(file_upload.status, 'failed')
+        self.assertIn('when decompressed', file_upload.error_message)
+
+    def test_guarded_stream_counts_lines_and_seeks(self):
+        stream = GuardedStream(io.BytesIO(b'ab\ncd\nef\n'), 6)
+
+        self.assertEqual(stream.readline(), b'ab\n')
+        self.assertEqual(stream.read(3), b'cd\n')
+        with self.assertRaises(DecompressionBombError):
+            stream.readline()
+        stream.seek(3)
+        self.assertEqual((stream.total, stream.read(3)), (3, b'cd\n'))
+
+
+class AdmissionTests(ImportTestCase):
+    def setUp(self):
+        super().setUp()
+        # Recent imports ran at 100 rows/s with 100 stored bytes per row
+        FileUpload.objects.create(  # type: ignore[reportAttributeAccessIssue]
+            file_name='done.csv', file_path='uploads/done.csv', file_size=100000,
+            status='completed', total_rows=1000, upload_duration=10,
+        )
+
+    def active_upload(self, status='processing', client='127.0.0.1', file_size=100000):
+        return FileUpload.objects.create(  # type: ignore[reportAttributeAccessIssue]
+            file_name='queued.csv', file_path='uploads/queued.csv', file_size=file_size, status=status, client=client,
+        )
+
+    def upload(self, **extra):
+        with mock.patch.object(process_csv_file, 'delay'):
+            return self.client.post(
+                '/api/file-processor/upload/', {'file': SimpleUploadedFile('products.csv', catalog_csv(1).encode())}, **extra,
+            )
+
+    def assertRejected(self, response, message, retry_after):
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], str(retry_after))
+        self.assertEqual(response.json(), {'error': message, 'retry_after': retry_after})  # type: ignore[reportAttributeAccessIssue]
+
+    @override_settings(IMPORT_MAX_ACTIVE=2)
+    def test_full_import_slots_turn_uploads_away(self):
+        self.active_upload(file_size=100000)
+        self.active_upload(file_size=200000, client='10.0.0.2')
+
+        # The quicker of the two imports needs another 10 seconds
+        self.assertRejected(self.upload(), 'Too many imports in progress, retry later', 10)
+        self.assertEqual(FileUpload.objects.filter(status='pending').count(), 0)  # type: ignore[reportAttributeAccessIssue]
+
+    @override_settings(IMPORT_MAX_ACTIVE_PER_CLIENT=2)
+    def test_per_client_limit(self):
+        self.active_upload()
+        self.active_upload(status='pending', file_size=50000)
+
+        self.assertRejected(self.upload(), 'Too many imports in progress for this client, retry later', 5)
+        self.assertEqual(self.upload(REMOTE_ADDR='10.0.0.2').status_code, 201)
+
+    @override_settings(IMPORT_MAX_ACTIVE_PER_CLIENT=1)
+    def test_forwarded_address_is_ignored_without_proxies(self):
+        self.active_upload()
+
+        response = self.upload(HTTP_X_FORWARDED_FOR='203.0.113.9')
+
+        self.assertEqual(response.status_code, 429)
+        with self.settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            response = self.upload(HTTP_X_FORWARDED_FOR='203.0.113.9')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(FileUpload.objects.get(id=response.json()['id']).client, '203.0.113.9')  # type: ignore[reportAttributeAccessIssue]
+
+    @override_settings(IMPORT_MAX_QUEUE_DEPTH=10)
+    def test_full_queue_turns_uploads_away(self):
+        with mock.patch('file_processor.admission.import_queue_depth', return_value=10):
+            # Nothing is running, so the wait is the shortest allowed
+            self.assertRejected(self.upload(), 'Import queue is full, retry later', admission.MIN_RETRY_AFTER)
+
+    @override_settings(IMPORT_MAX_ACTIVE=1)
+    def test_retry_after_has_a_default_before_any_import_completed(self):
+        FileUpload.objects.filter(status='completed').delete()  # type: ignore[reportAttributeAccessIssue]
+        self.active_upload()
+
+        self.assertRejected(self.upload(), 'Too many imports in progress, retry later', admission.DEFAULT_RETRY_AFTER)
+
+    @override_settings(IMPORT_WORKER_SLOTS=2)
+    def test_pending_upload_reports_its_estimated_start(self):
+        self.active_upload(file_size=100000)
+        self.active_upload(file_size=200000)
+        self.active_upload(status='pending', file_size=100000)
+        file_upload = self.active_upload(status='pending')
+
+        data = self.client.get(f'/api/file-processor/status/{file_upload.id}/').json()  # type: ignore[reportAttributeAccessIssue]
+
+        # Slots free after 10s and 20s; the pending upload ahead takes the first until 20s
+        seconds = (parse_datetime(data['estimated_start']) - timezone.now()).total_seconds()
+        self.assertAlmostEqual(seconds, 20, delta=2)
+        FileUpload.objects.filter(id=file_upload.id).update(status='processing')  # type: ignore[reportAttributeAccessIssue]
+        self.assertIsNone(self.client.get(f'/api/file-processor/status/{file_upload.id}/').json()['estimated_start'])  # type: ignore[reportAttributeAccessIssue]
+
+    @override_settings(IMPORT_MAX_ACTIVE=1, UPLOAD_CHUNK_SIZE=1024)
+    def test_rejected_complete_keeps_the_session_open(self):
+        content = catalog_csv(3).encode()
+        session = self.client.post(
+            '/api/file-processor/uploads/', {'file_name': 'products.csv', 'file_size': len(content)}, format='json',
+        ).json()  # type: ignore[reportAttributeAccessIssue]
+        self.client.put(f"/api/file-processor/uploads/{session['id']}/chunks/0/", content, content_type='application/octet-stream')
+        self.active_upload()
+
+        response = self.client.post(f"/api/file-processor/uploads/{session['id']}/complete/")
+
+        self.assertEqual(response.status_code, 429)
+        status = self.client.get(f"/api/file-processor/uploads/{session['id']}/").json()  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual((status['status'], status['received_chunks']), ('open', [0]))
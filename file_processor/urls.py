@@ -1,7 +1,16 @@
 from django.urls import path
-from .views import upload_file, file_upload_status
+from .views import (
+    upload_file, file_upload_status, resume_file_upload, file_upload_rejects,
+    create_upload_session, upload_session_status, upload_chunk, complete_upload_session,
+)
 
 urlpatterns = [
     path('upload/', upload_file, name='file-upload'),
     path('status/<int:upload_id>/', file_upload_status, name='file-upload-status'),
+    path('status/<int:upload_id>/resume/', resume_file_upload, name='file-upload-resume'),
+    path('status/<int:upload_id>/rejects/', file_upload_rejects, name='file-upload-rejects'),
+    path('uploads/', create_upload_session, name='upload-session-create'),
+    path('uploads/<uuid:session_id>/', upload_session_status, name='upload-session-status'),
+    path('uploads/<uuid:session_id>/chunks/<int:index>/', upload_chunk, name='upload-session-chunk'),
+    path('uploads/<uuid:session_id>/complete/', complete_upload_session, name='upload-session-complete'),
 ]
\ No newline at end of file
@@ -0,0 +1,154 @@
+import os
+import re
+import csv
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
+from products.models import Product
+
+# Plain decimal notation only; the COPY importer applies the same pattern in SQL
+PRICE_PATTERN = r'^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)$'
+
+SKU_MAX_LENGTH = Product._meta.get_field('sku').max_length
+NAME_MAX_LENGTH = Product._meta.get_field('name').max_length
+PRICE_FIELD = Product._meta.get_field('price')
+PRICE_LIMIT = Decimal(10) ** (PRICE_FIELD.max_digits - PRICE_FIELD.decimal_places)  # type: ignore[reportOptionalOperand]
+PRICE_QUANTUM = Decimal(1).scaleb(-PRICE_FIELD.decimal_places)  # type: ignore[reportArgumentType]
+
+# Reject reasons, shared with the SQL checks in PostgresCopyImporter
+MISSING_SKU = 'missing sku'
+SKU_TOO_LONG = f'sku longer than {SKU_MAX_LENGTH} characters'
+MISSING_NAME = 'missing name'
+NAME_TOO_LONG = f'name longer than {NAME_MAX_LENGTH} characters'
+INVALID_PRICE = 'invalid price'
+PRICE_OUT_OF_RANGE = f'price must be below {PRICE_LIMIT}'
+# Valid rows of a batch the database refused; the error itself is in the upload's error_message
+WRITE_FAILED = 'batch failed to write'
+
+
+class RowRejected(Exception):
+    """
+    Raised by clean_row for a row that cannot be imported
+    """
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def clean_row(row):
+    """
+    Parse and normalize a CSV row into Product fields before it reaches the database
+    SKUs are uppercased here because bulk writes bypass Product.save
+    """
+    sku = (row.get('sku') or '').strip().upper()
+    name = row.get('name') or ''
+    description = row.get('description') or ''
+    price = (row.get('price') or '').strip()
+
+    if not sku:
+        raise RowRejected(MISSING_SKU)
+    if len(sku) > SKU_MAX_LENGTH:
+        raise RowRejected(SKU_TOO_LONG)
+    if not name:
+        raise RowRejected(MISSING_NAME)
+    if len(name) > NAME_MAX_LENGTH:
+        raise RowRejected(NAME_TOO_LONG)
+    if not re.fullmatch(PRICE_PATTERN, price):
+        raise RowRejected(INVALID_PRICE)
+
+    price = Decimal(price).quantize(PRICE_QUANTUM, rounding=ROUND_HALF_UP)
+    if abs(price) >= PRICE_LIMIT:
+        raise RowRejected(PRICE_OUT_OF_RANGE)
+
+    return {
+        'sku': sku,
+        'name': name,
+        'description': description,
+        'price': price,
+        'active': True,
+    }
+
+
+def rejects_dir(upload_id):
+    """
+    Directory holding the reject files of one upload
+    Parallel chunks each write their own part, named after the chunk's start offset
+    """
+    return os.path.join(settings.MEDIA_ROOT, 'rejects', str(upload_id))
+
+
+def iter_rejects(upload_id):
+    """
+    Yield the reject parts of an upload as one CSV, keeping only the first header
+    """
+    directory = rejects_dir(upload_id)
+    if not os.path.isdir(directory):
+        return
+    parts = sorted(os.listdir(directory), key=lambda name: int(name.split('.')[0]))
+    for index, part in enumerate(parts):
+        with open(os.path.join(directory, part), 'r', encoding='utf-8', newline='') as part_file:
+            if index > 0:
+                part_file.readline()
+            for line in part_file:
+                yield line
+
+
+class RejectSink:
+    """
+    Streams rejected rows to a CSV part file with their line number and reason
+    The file is only created once the first row is rejected
+    """
+
+    def __init__(self, upload_id, part, header):
+        self.path = os.path.join(rejects_dir(upload_id), f'{part}.csv')
+        self.header = [column for column in header if column]
+        self.file = None
+        self.writer = None
+        self.counts = {}
+
+    def open(self):
+        """
+        Create the part file and write its header
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(['line', 'reason'] + self.header)
+
+    def resume(self, line, counts):
+        """
+        Continue an existing part file after a checkpoint
+        Rows past the checkpoint line were rejected by a batch that never committed and are dropped
+        """
+        self.counts = dict(counts)
+        if not os.path.exists(self.path):
+            return
+        kept_path = f'{self.path}.resume'
+        with open(self.path, 'r', encoding='utf-8', newline='') as existing, \
+                open(kept_path, 'w', encoding='utf-8', newline='') as kept:
+            writer = csv.writer(kept)
+            for index, record in enumerate(csv.reader(existing)):
+                if index == 0 or int(record[0]) <= line:
+                    writer.writerow(record)
+        os.replace(kept_path, self.path)
+        self.file = open(self.path, 'a', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file)
+
+    def write(self, line, reason, row):
+        if self.writer is None:
+            self.open()
+        self.writer.writerow([line, reason] + [row.get(column, '') for column in self.header])
+        self.counts[reason] = self.counts.get(reason, 0) + 1
+
+    @property
+    def rejected(self):
+        return sum(self.counts.values())
+
+    def flush(self):
+        if self.file:
+            self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+        self.file = None
@@ -1,17 +1,30 @@
 import os
 import csv
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
 import redis
 from django.shortcuts import render
+from django.http import StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 from django.conf import settings
-from .models import FileUpload
-from .serializers import FileUploadSerializer
+from django.db import transaction
+from .models import FileUpload, UploadSession
+from .serializers import FileUploadSerializer, UploadSessionSerializer
+from .validation import iter_rejects
+from .compression import is_supported_upload, validate_upload, UPLOAD_SUFFIXES
+from .progress import live_status, subscribe
+from .admission import check_admission, client_ident, estimated_start
+
+UNSUPPORTED_FILE_ERROR = f"Only CSV files are allowed ({', '.join(UPLOAD_SUFFIXES)})"
 
 def upload_page(request):
     """
@@ -40,6 +53,66 @@ def is_redis_available():
         pass
     return False
 
+def start_import(file_upload, file_name):
+    """
+    Queue the import task for a stored file
+    Returns an error Response if the task could not be queued
+    """
+    # Always use async processing with Celery, even if Redis check fails
+    # This prevents the web worker from being blocked during file processing
+    try:
+        from .tasks import process_csv_file
+        process_csv_file.delay(file_upload.id, file_name)  # pyright: ignore[reportFunctionMemberAccess]
+        print("Processing asynchronously with Celery")
+    except Exception as e:
+        print(f"Failed to start async task: {e}")
+        # If Celery fails, mark the upload as failed immediately
+        file_upload.status = 'failed'
+        file_upload.error_message = f'Failed to start processing: {str(e)}'
+        file_upload.save(update_fields=['status', 'error_message', 'updated_at'])
+        return Response(
+            {'error': f'Failed to start processing: {str(e)}'}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    return None
+
+def check_capacity(request):
+    """
+    Turn an import away while the import queue is saturated
+    Returns a 429 Response with Retry-After, or None if the import can be queued
+    """
+    rejection = check_admission(client_ident(request))
+    if rejection is None:
+        return None
+    message, retry_after = rejection
+    return Response(
+        {'error': message, 'retry_after': retry_after},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={'Retry-After': str(retry_after)}
+    )
+
+def check_archive(file_name):
+    """
+    Reject a stored zip upload that is not a single CSV within the decompression limits
+    The file is deleted and an error Response returned, or None if the upload is usable
+    """
+    try:
+        validate_upload(os.path.join(settings.MEDIA_ROOT, file_name))
+    except ValueError as e:
+        default_storage.delete(file_name)
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return None
+
+IMPORT_MODES = [mode for mode, _ in FileUpload.MODE_CHOICES]
+INVALID_MODE_ERROR = f"mode must be one of: {', '.join(IMPORT_MODES)}"
+
+def import_mode(request):
+    """
+    Import mode requested for an upload ('upsert' unless given), or None if it is not valid
+    """
+    mode = request.data.get('mode') or 'upsert'
+    return mode if mode in IMPORT_MODES else None
+
 @api_view(['POST'])
 @csrf_exempt
 def upload_file(request):
@@ -52,45 +125,46 @@ def upload_file(request):
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
         
         uploaded_file = request.FILES['file']
+        mode = import_mode(request)
+        if not mode:
+            return Response({'error': INVALID_MODE_ERROR}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Validate file type
-        if not uploaded_file.name.endswith('.csv'):
-            return Response({'error': 'Only CSV files are allowed'}, status=status.HTTP_400_BAD_REQUEST)
+        # Validate file type; compressed CSVs are stored as uploaded and decompressed by the import
+        if not is_supported_upload(uploaded_file.name):
+            return Response({'error': UNSUPPORTED_FILE_ERROR}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Validate file size (optional limit)
-        max_file_size = 100 * 1024 * 1024  # 100MB limit
+        # Validate file size (larger files go through the chunked upload endpoints)
+        max_file_size = settings.MAX_UPLOAD_SIZE
         if uploaded_file.size > max_file_size:
-            return Response({'error': 'File size exceeds 100MB limit'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(
+                {'error': f'File size exceeds {max_file_size // (1024 * 1024)}MB limit, use chunked upload'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Save file to media directory
-        file_name = default_storage.save(
-            f"uploads/{uploaded_file.name}", 
-            ContentFile(uploaded_file.read())
-        )
+        # Refuse before storing the file when no import slot is free
+        error_response = check_capacity(request)
+        if error_response:
+            return error_response
+        
+        # Save file to media directory, streaming the upload chunk by chunk
+        file_name = default_storage.save(f"uploads/{uploaded_file.name}", uploaded_file)
+        error_response = check_archive(file_name)
+        if error_response:
+            return error_response
         
         # Create file upload record
         file_upload = FileUpload.objects.create(  # pyright: ignore[reportAttributeAccessIssue]
             file_name=uploaded_file.name,
+            file_path=file_name,
             file_size=uploaded_file.size,
+            mode=mode,
+            client=client_ident(request),
             status='pending'
         )
         
-        # Always use async processing with Celery, even if Redis check fails
-        # This prevents the web worker from being blocked during file processing
-        try:
-            from .tasks import process_csv_file
-            process_csv_file.delay(file_upload.id, file_name)  # pyright: ignore[reportFunctionMemberAccess]
-            print("Processing asynchronously with Celery")
-        except Exception as e:
-            print(f"Failed to start async task: {e}")
-            # If Celery fails, mark the upload as failed immediately
-            file_upload.status = 'failed'
-            file_upload.error_message = f'Failed to start processing: {str(e)}'
-            file_upload.save()
-            return Response(
-                {'error': f'Failed to start processing: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        error_response = start_import(file_upload, file_name)
+        if error_response:
+            return error_response
         
         serializer = FileUploadSerializer(file_upload)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -107,14 +181,310 @@ def upload_file(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+# Shortest gap between two answers to one watcher while the progress moves
+PROGRESS_EVENT_INTERVAL = 0.25
+# Seconds a watcher is told to wait when its request could not be held open
+PROGRESS_POLL_RETRY = 1
+FINISHED_STATUSES = ('completed', 'failed')
+
+_waiters_lock = threading.Lock()
+_waiters = 0
+
+def claim_waiter():
+    """
+    Take one of the PROGRESS_MAX_WAITERS slots for a held status request in this process, or return False
+    """
+    global _waiters
+    with _waiters_lock:
+        if _waiters >= settings.PROGRESS_MAX_WAITERS:
+            return False
+        _waiters += 1
+        return True
+
+def release_waiter():
+    global _waiters
+    with _waiters_lock:
+        _waiters -= 1
+
+def upload_status(file_upload):
+    """
+    Status JSON of an upload and its ETag
+    """
+    data = live_status(file_upload, dict(FileUploadSerializer(file_upload).data))
+    digest = hashlib.md5(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+    return data, f'"{digest}"'
+
+def wait_for_change(file_upload, etag, seconds):
+    """
+    Hold the request until the upload's status no longer matches etag, or seconds pass, and
+    return the latest (data, etag); None if it cannot wait
+    Changes are pushed through Redis pub/sub, so a held request costs no queries until one arrives
+    At most PROGRESS_MAX_WAITERS requests wait at once per process, leaving the other web
+    threads free however many browsers watch
+    """
+    if not claim_waiter():
+        return None
+    try:
+        pubsub = subscribe(file_upload.id)
+        if pubsub is None:
+            return None
+        try:
+            # Re-read after subscribing, so a change published in between is not missed
+            file_upload.refresh_from_db()
+            data, current = upload_status(file_upload)
+            deadline = time.time() + seconds
+            while current == etag and data['status'] not in FINISHED_STATUSES and time.time() < deadline:
+                if pubsub.get_message(timeout=max(deadline - time.time(), 0)) is None:
+                    continue
+                # Coalesce the notifications of fast batches into one answer
+                time.sleep(PROGRESS_EVENT_INTERVAL)
+                while pubsub.get_message(timeout=0) is not None:
+                    pass
+                file_upload.refresh_from_db()
+                data, current = upload_status(file_upload)
+            return data, current
+        finally:
+            pubsub.close()
+    finally:
+        release_waiter()
+
 @api_view(['GET'])
 def file_upload_status(request, upload_id):
     """
     Get the status of a file upload
+    While the import runs, counters come from the live progress in Redis
+    A pending import also reports when it is expected to start, from the observed rows/s
+    Long-polling: with ?wait=<seconds> and the ETag of the last answer in If-None-Match, the
+    request is held until the status changes or PROGRESS_POLL_WAIT_SECONDS pass (304)
+    A 304 with Retry-After means the request could not be held and should be repeated after that delay
+    """
+    try:
+        file_upload = FileUpload.objects.get(id=upload_id)  # pyright: ignore[reportAttributeAccessIssue]
+    except FileUpload.DoesNotExist:  # pyright: ignore[reportAttributeAccessIssue]
+        return Response({'error': 'File upload not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    data, etag = upload_status(file_upload)
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    try:
+        wait = min(max(float(request.GET.get('wait', 0)), 0), settings.PROGRESS_POLL_WAIT_SECONDS)
+    except ValueError:
+        wait = 0
+    
+    if wait and request.headers.get('If-None-Match') == etag and data['status'] not in FINISHED_STATUSES:
+        waited = wait_for_change(file_upload, etag, wait)
+        if waited is None:
+            headers['Retry-After'] = str(PROGRESS_POLL_RETRY)
+        else:
+            data, etag = waited
+            headers['ETag'] = etag
+    
+    if request.headers.get('If-None-Match') == etag:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    # Left out of the ETag: the estimate moves on its own and would end every wait at once
+    data['estimated_start'] = estimated_start(file_upload)
+    return Response(data, headers=headers)
+
+@api_view(['POST'])
+@csrf_exempt
+def resume_file_upload(request, upload_id):
+    """
+    Restart a failed import; it continues from the last committed batch
     """
     try:
         file_upload = FileUpload.objects.get(id=upload_id)  # pyright: ignore[reportAttributeAccessIssue]
-        serializer = FileUploadSerializer(file_upload)
-        return Response(serializer.data)
     except FileUpload.DoesNotExist:  # pyright: ignore[reportAttributeAccessIssue]
-        return Response({'error': 'File upload not found'}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        return Response({'error': 'File upload not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    if file_upload.status != 'failed':
+        return Response({'error': 'Only failed uploads can be resumed'}, status=status.HTTP_409_CONFLICT)
+    if not file_upload.file_path or not default_storage.exists(file_upload.file_path):
+        return Response({'error': 'Uploaded file is no longer available'}, status=status.HTTP_400_BAD_REQUEST)
+    error_response = check_capacity(request)
+    if error_response:
+        return error_response
+    
+    file_upload.status = 'pending'
+    file_upload.error_message = None
+    file_upload.save()
+    
+    error_response = start_import(file_upload, file_upload.file_path)
+    if error_response:
+        return error_response
+    
+    file_upload.refresh_from_db()
+    serializer = FileUploadSerializer(file_upload)
+    return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+@api_view(['GET'])
+def file_upload_rejects(request, upload_id):
+    """
+    Download the rows rejected by validation as CSV, with their line number and reason
+    """
+    if not FileUpload.objects.filter(id=upload_id).exists():  # pyright: ignore[reportAttributeAccessIssue]
+        return Response({'error': 'File upload not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    response = StreamingHttpResponse(iter_rejects(upload_id), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="upload-{upload_id}-rejects.csv"'
+    return response
+
+@api_view(['POST'])
+@csrf_exempt
+def create_upload_session(request):
+    """
+    Start a resumable chunked upload
+    The response tells the client the chunk size and how many chunks to send
+    """
+    file_name = os.path.basename(str(request.data.get('file_name', '')))
+    try:
+        file_size = int(request.data.get('file_size', 0))
+    except (TypeError, ValueError):
+        file_size = 0
+    
+    mode = import_mode(request)
+    
+    if not is_supported_upload(file_name):
+        return Response({'error': UNSUPPORTED_FILE_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+    if not mode:
+        return Response({'error': INVALID_MODE_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+    if file_size <= 0:
+        return Response({'error': 'file_size must be a positive number of bytes'}, status=status.HTTP_400_BAD_REQUEST)
+    if file_size > settings.MAX_CHUNKED_UPLOAD_SIZE:
+        return Response(
+            {'error': f'File size exceeds {settings.MAX_CHUNKED_UPLOAD_SIZE // (1024 * 1024)}MB limit'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    # Tell the client to wait before it sends any chunks
+    error_response = check_capacity(request)
+    if error_response:
+        return error_response
+    
+    upload_session = UploadSession.objects.create(  # pyright: ignore[reportAttributeAccessIssue]
+        file_name=file_name,
+        file_size=file_size,
+        chunk_size=settings.UPLOAD_CHUNK_SIZE,
+        mode=mode,
+    )
+    serializer = UploadSessionSerializer(upload_session)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+@api_view(['GET'])
+def upload_session_status(request, session_id):
+    """
+    Get a chunked upload, including the chunks already received so a client can resume
+    """
+    try:
+        upload_session = UploadSession.objects.get(id=session_id)  # pyright: ignore[reportAttributeAccessIssue]
+    except UploadSession.DoesNotExist:  # pyright: ignore[reportAttributeAccessIssue]
+        return Response({'error': 'Upload session not found'}, status=status.HTTP_404_NOT_FOUND)
+    serializer = UploadSessionSerializer(upload_session)
+    return Response(serializer.data)
+
+@api_view(['PUT'])
+@csrf_exempt
+def upload_chunk(request, session_id, index):
+    """
+    Store one chunk from the raw request body
+    The body is streamed to a temporary part file and renamed into place once complete,
+    so re-sending a chunk simply replaces it
+    """
+    try:
+        upload_session = UploadSession.objects.get(id=session_id)  # pyright: ignore[reportAttributeAccessIssue]
+    except UploadSession.DoesNotExist:  # pyright: ignore[reportAttributeAccessIssue]
+        return Response({'error': 'Upload session not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    if upload_session.status != 'open':
+        return Response({'error': 'Upload session is already completed'}, status=status.HTTP_409_CONFLICT)
+    if index >= upload_session.total_chunks:
+        return Response({'error': 'Chunk index out of range'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    expected_size = upload_session.expected_chunk_size(index)
+    chunk_path = upload_session.chunk_path(index)
+    temp_path = f"{chunk_path}.{uuid.uuid4().hex}.tmp"
+    os.makedirs(upload_session.chunk_dir(), exist_ok=True)
+    
+    received = 0
+    stream = request.stream
+    try:
+        with open(temp_path, 'wb') as chunk_file:
+            while stream is not None and received <= expected_size:
+                data = stream.read(64 * 1024)
+                if not data:
+                    break
+                received += len(data)
+                chunk_file.write(data)
+        
+        if received != expected_size:
+            return Response(
+                {'error': f'Chunk {index} must be {expected_size} bytes, received {received}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        os.replace(temp_path, chunk_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    
+    return Response({'index': index, 'size': received})
+
+@api_view(['POST'])
+@csrf_exempt
+def complete_upload_session(request, session_id):
+    """
+    Join the received chunks into the final file and start the import
+    The session row stays locked until the FileUpload is committed, so a concurrent
+    complete waits and then answers with the same upload instead of importing it twice
+    """
+    with transaction.atomic():
+        try:
+            upload_session = UploadSession.objects.select_for_update().get(id=session_id)  # pyright: ignore[reportAttributeAccessIssue]
+        except UploadSession.DoesNotExist:  # pyright: ignore[reportAttributeAccessIssue]
+            return Response({'error': 'Upload session not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        if upload_session.status == 'completed':
+            serializer = FileUploadSerializer(upload_session.file_upload)
+            return Response(serializer.data)
+        
+        received_chunks = upload_session.received_chunks()
+        missing_chunks = sorted(set(range(upload_session.total_chunks)) - set(received_chunks))
+        if missing_chunks:
+            return Response(
+                {'error': 'Upload is missing chunks', 'missing_chunks': missing_chunks},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # The session stays open with its chunks, so the client completes it again after Retry-After
+        error_response = check_capacity(request)
+        if error_response:
+            return error_response
+        
+        # Concatenate the part files into the uploads directory without loading them into memory
+        file_name = default_storage.get_available_name(f"uploads/{upload_session.file_name}")
+        full_file_path = os.path.join(settings.MEDIA_ROOT, file_name)
+        os.makedirs(os.path.dirname(full_file_path), exist_ok=True)
+        with open(full_file_path, 'wb') as destination:
+            for index in range(upload_session.total_chunks):
+                with open(upload_session.chunk_path(index), 'rb') as chunk_file:
+                    shutil.copyfileobj(chunk_file, destination)
+        # A rejected archive leaves the session open with its chunks, so the client can re-send them
+        error_response = check_archive(file_name)
+        if error_response:
+            return error_response
+        
+        file_upload = FileUpload.objects.create(  # pyright: ignore[reportAttributeAccessIssue]
+            file_name=upload_session.file_name,
+            file_path=file_name,
+            file_size=upload_session.file_size,
+            mode=upload_session.mode,
+            client=client_ident(request),
+            status='pending'
+        )
+        upload_session.status = 'completed'
+        upload_session.file_upload = file_upload
+        upload_session.save()
+    
+    shutil.rmtree(upload_session.chunk_dir(), ignore_errors=True)
+    # Queued after the commit, so the worker always finds the FileUpload
+    error_response = start_import(file_upload, file_name)
+    if error_response:
+        return error_response
+    
+    serializer = FileUploadSerializer(file_upload)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
\ No newline at end of file
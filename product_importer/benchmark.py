@@ -0,0 +1,34 @@
+from contextlib import contextmanager
+from django.db import connection
+
+
+def benchmark_database_name():
+    """
+    Name of the throwaway benchmark database: a file next to a SQLite database, so timings are
+    never taken in memory, or benchmark_<name> on a database server
+    """
+    name = str(connection.settings_dict['NAME'])
+    if connection.vendor == 'sqlite':
+        return f'{name}.benchmark'
+    return f'benchmark_{name}'
+
+
+@contextmanager
+def throwaway_database():
+    """
+    Point the default connection at a freshly migrated database for the duration of a benchmark
+    Synthetic products never reach the live catalog, so they cannot show up in product lists,
+    cached responses or stats, and no webhook events are queued for them; the database is
+    dropped afterwards
+    """
+    test_settings = connection.settings_dict['TEST']
+    test_name = test_settings.get('NAME')
+    test_settings['NAME'] = benchmark_database_name()
+    try:
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        test_settings['NAME'] = test_name
@@ -0,0 +1,31 @@
+import time
+import redis
+from django.conf import settings
+
+# After a failed Redis call, callers take their fallback path for this long
+RETRY_AFTER = 30
+
+_client = None
+_unavailable_until = 0
+
+
+def get_redis():
+    """
+    Shared Redis client on the Celery broker, or None if the broker is not Redis
+    or was unreachable within the last RETRY_AFTER seconds
+    """
+    global _client
+    if time.time() < _unavailable_until:
+        return None
+    if _client is None:
+        url = settings.CELERY_BROKER_URL
+        if not url.startswith(('redis://', 'rediss://')):
+            return None
+        _client = redis.Redis.from_url(url, socket_connect_timeout=1, socket_timeout=5)
+    return _client
+
+
+def mark_unavailable(error):
+    global _unavailable_until
+    _unavailable_until = time.time() + RETRY_AFTER
+    print(f"Redis unavailable: {str(error)}")
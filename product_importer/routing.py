@@ -0,0 +1,55 @@
+import os
+from django.conf import settings
+
+# Celery queues; each worker profile in the Procfile consumes a subset
+IMPORT_QUEUE = 'imports'              # Large imports, import chunks and bulk API jobs (CPU-bound parsing)
+FAST_IMPORT_QUEUE = 'imports_fast'    # Small interactive imports and import finalizers
+WEBHOOK_QUEUE = 'webhooks'            # Outbox relay and webhook tests (I/O-bound delivery)
+MAINTENANCE_QUEUE = 'maintenance'     # Bulk deletes, pruning and anything not routed explicitly
+
+TASK_QUEUES = {
+    'file_processor.tasks.import_csv_chunk': IMPORT_QUEUE,
+    # Chord callbacks only settle counters, so they never wait behind queued chunks
+    'file_processor.tasks.finalize_csv_import': FAST_IMPORT_QUEUE,
+    'products.tasks.apply_bulk_job': IMPORT_QUEUE,
+    'products.tasks.delete_products': MAINTENANCE_QUEUE,
+    'webhooks.tasks.relay_webhook_events': WEBHOOK_QUEUE,
+    'webhooks.tasks.send_test_webhook': WEBHOOK_QUEUE,
+    'webhooks.tasks.prune_webhook_deliveries': MAINTENANCE_QUEUE,
+}
+
+# Compressed uploads are sized as if they decompressed at a typical CSV ratio
+COMPRESSED_SIZE_FACTOR = 8
+
+
+def get_fast_lane_bytes():
+    """
+    Uploads up to this size are imported on the fast lane
+    """
+    return getattr(settings, 'PRODUCT_IMPORT_FAST_LANE_BYTES', 10 * 1024 * 1024)
+
+
+def import_queue(file_path):
+    """
+    Lane for an import by the size of its stored file, so small uploads never wait behind long ones
+    """
+    from file_processor.compression import is_compressed
+
+    try:
+        size = os.path.getsize(os.path.join(settings.MEDIA_ROOT, file_path))
+    except (OSError, TypeError):
+        return IMPORT_QUEUE
+    if is_compressed(file_path):
+        size *= COMPRESSED_SIZE_FACTOR
+    return FAST_IMPORT_QUEUE if size <= get_fast_lane_bytes() else IMPORT_QUEUE
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """
+    Celery router: imports go to a lane by file size, other tasks to their queue in TASK_QUEUES
+    """
+    if name == 'file_processor.tasks.process_csv_file':
+        file_path = args[1] if len(args) > 1 else kwargs.get('file_path')
+        return {'queue': import_queue(file_path)}
+    queue = TASK_QUEUES.get(name)
+    return {'queue': queue} if queue else None
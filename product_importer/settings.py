@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 import os
 import dj_database_url
+from celery.schedules import crontab
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -159,6 +160,24 @@ CELERYD_MAX_TASKS_PER_CHILD = 5
 CELERY_TASK_SOFT_TIME_LIMIT = 3540  # 59 minutes
 CELERY_TASK_TIME_LIMIT = 3600  # 60 minutes
 
+# Queue topology: product_importer.routing sends each task to one of the queues below, imports by
+# file size; the Procfile runs a worker profile per queue group
+CELERY_TASK_ROUTES = ['product_importer.routing.route_task']
+CELERY_TASK_DEFAULT_QUEUE = 'maintenance'
+
+# Periodic tasks, run by `celery beat`
+CELERY_BEAT_SCHEDULE = {
+    'prune-webhook-deliveries': {
+        'task': 'webhooks.tasks.prune_webhook_deliveries',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    # Picks up outbox events whose relay could not be queued when they committed
+    'relay-webhook-events': {
+        'task': 'webhooks.tasks.relay_webhook_events',
+        'schedule': 60.0,
+    },
+}
+
 # Always use eager mode in development/testing
 if os.environ.get('DJANGO_ENV') == 'development' or 'DEBUG' in os.environ and os.environ.get('DEBUG') == 'True':
     CELERY_TASK_ALWAYS_EAGER = True
@@ -176,12 +195,90 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
     'DEFAULT_AUTHENTICATION_CLASSES': [],
     'DEFAULT_PERMISSION_CLASSES': [],
+    # Reverse proxies in front of the app; client addresses (throttles, upload admission) are read from
+    # X-Forwarded-For only behind this many proxies, so a client cannot pick its own address
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
 }
+# Default pagination of the product list: 'page' (page numbers with a count) or 'cursor' (keyset);
+# clients pick per request with ?pagination=page|cursor
+PRODUCT_LIST_PAGINATION = os.environ.get('PRODUCT_LIST_PAGINATION', 'page')
+# Per-process LRU of product API responses, invalidated by the catalog version in Redis
+PRODUCT_RESPONSE_CACHE_ENTRIES = int(os.environ.get('PRODUCT_RESPONSE_CACHE_ENTRIES', 1000))
+PRODUCT_RESPONSE_CACHE_BYTES = int(os.environ.get('PRODUCT_RESPONSE_CACHE_BYTES', 64 * 1024 * 1024))  # 64MB
 
 # File upload settings
 # Limit file upload size to prevent memory issues
 DATA_UPLOAD_MAX_MEMORY_SIZE = 52428800  # 50MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 52428800  # 50MB
+# Uploaded files above this size are spooled to a temporary file instead of held in memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5MB
+# Largest file accepted in a single upload request
+MAX_UPLOAD_SIZE = 100 * 1024 * 1024  # 100MB
+# Resumable chunked uploads: size of each chunk and largest file accepted
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))  # 8MB
+MAX_CHUNKED_UPLOAD_SIZE = int(os.environ.get('MAX_CHUNKED_UPLOAD_SIZE', 2 * 1024 * 1024 * 1024))  # 2GB
+# Compressed uploads (.csv.gz, .csv.bz2, .csv.xz, .zip) are size-checked on their stored bytes;
+# imports abort once the decompressed CSV passes either of these limits
+MAX_DECOMPRESSED_UPLOAD_SIZE = int(os.environ.get('MAX_DECOMPRESSED_UPLOAD_SIZE', 20 * 1024 * 1024 * 1024))  # 20GB
+MAX_COMPRESSION_RATIO = int(os.environ.get('MAX_COMPRESSION_RATIO', 100))
+
+# Product import settings
+# Import backend: 'copy' (PostgreSQL COPY into a staging table) or 'batch'; 'auto' picks by database vendor
+PRODUCT_IMPORT_BACKEND = os.environ.get('PRODUCT_IMPORT_BACKEND', 'auto')
+# Rows per upsert statement for the batch backend; 'auto' picks the native upsert writer for the database vendor
+PRODUCT_IMPORT_BATCH_SIZE = int(os.environ.get('PRODUCT_IMPORT_BATCH_SIZE', 1000))
+PRODUCT_IMPORT_UPSERT_BACKEND = os.environ.get('PRODUCT_IMPORT_UPSERT_BACKEND', 'auto')
+# Files larger than this many bytes are split into row-aligned chunks imported in parallel (0 disables)
+PRODUCT_IMPORT_CHUNK_BYTES = int(os.environ.get('PRODUCT_IMPORT_CHUNK_BYTES', 0))
+# Uploads up to this many bytes (compressed ones scaled by a typical ratio) import on the fast lane
+PRODUCT_IMPORT_FAST_LANE_BYTES = int(os.environ.get('PRODUCT_IMPORT_FAST_LANE_BYTES', 10 * 1024 * 1024))  # 10MB
+# Upload admission: pending or processing imports allowed at once, overall and per client address;
+# beyond these, or with this many messages waiting on the import queues, uploads get 429 with Retry-After
+IMPORT_MAX_ACTIVE = int(os.environ.get('IMPORT_MAX_ACTIVE', 20))
+IMPORT_MAX_ACTIVE_PER_CLIENT = int(os.environ.get('IMPORT_MAX_ACTIVE_PER_CLIENT', 3))
+IMPORT_MAX_QUEUE_DEPTH = int(os.environ.get('IMPORT_MAX_QUEUE_DEPTH', 500))
+# Imports the workers run side by side, for the estimated start time of queued uploads
+IMPORT_WORKER_SLOTS = int(os.environ.get('IMPORT_WORKER_SLOTS', 2))
+# Imports still pending or processing this long after upload are presumed lost and no longer hold a slot
+IMPORT_ADMISSION_STALE_HOURS = int(os.environ.get('IMPORT_ADMISSION_STALE_HOURS', 6))
+# Products per id range deactivated by one UPDATE at the end of a sync import
+PRODUCT_SYNC_CHUNK_SIZE = int(os.environ.get('PRODUCT_SYNC_CHUNK_SIZE', 10000))
+# Live progress is kept in Redis; the FileUpload row is only written this often while importing
+PRODUCT_IMPORT_PROGRESS_FLUSH_SECONDS = float(os.environ.get('PRODUCT_IMPORT_PROGRESS_FLUSH_SECONDS', 5))
+# Rows removed per transaction by background bulk deletes
+PRODUCT_DELETE_CHUNK_SIZE = int(os.environ.get('PRODUCT_DELETE_CHUNK_SIZE', 5000))
+# Bulk API bodies with more items than this are applied by a background job
+PRODUCT_BULK_SYNC_ITEMS = int(os.environ.get('PRODUCT_BULK_SYNC_ITEMS', 1000))
+
+# Long-polled status requests are held at most this long waiting for the progress to change
+PROGRESS_POLL_WAIT_SECONDS = int(os.environ.get('PROGRESS_POLL_WAIT_SECONDS', 20))
+# Status requests held at once per web process; keep it below the gunicorn --threads count,
+# the rest are answered straight away and the browser asks again a second later
+PROGRESS_MAX_WAITERS = int(os.environ.get('PROGRESS_MAX_WAITERS', 4))
+
+# Webhooks
+# Product changes are sent in batches of up to this many products per POST
+WEBHOOK_BATCH_SIZE = int(os.environ.get('WEBHOOK_BATCH_SIZE', 500))
+# Outbox rows the relay claims per transaction
+WEBHOOK_RELAY_BATCH = int(os.environ.get('WEBHOOK_RELAY_BATCH', 100))
+# Outbox rows whose delivery failed, or whose relay died, are claimed again after this long
+WEBHOOK_RELAY_CLAIM_SECONDS = int(os.environ.get('WEBHOOK_RELAY_CLAIM_SECONDS', 300))
+# Seconds a subscriber has to answer one delivery
+WEBHOOK_TIMEOUT = float(os.environ.get('WEBHOOK_TIMEOUT', 10))
+# Deliveries in flight per process (also keep-alive connections pooled per host)
+WEBHOOK_CONCURRENCY = int(os.environ.get('WEBHOOK_CONCURRENCY', 8))
+# Attempts per delivery; retries wait a random 0..min(cap, base * 2^n) seconds
+WEBHOOK_MAX_ATTEMPTS = int(os.environ.get('WEBHOOK_MAX_ATTEMPTS', 4))
+WEBHOOK_RETRY_BASE = float(os.environ.get('WEBHOOK_RETRY_BASE', 0.5))
+WEBHOOK_RETRY_CAP = float(os.environ.get('WEBHOOK_RETRY_CAP', 30))
+# A webhook URL failing this many times in a row is skipped for the cooldown, then tried once
+WEBHOOK_BREAKER_THRESHOLD = int(os.environ.get('WEBHOOK_BREAKER_THRESHOLD', 5))
+WEBHOOK_BREAKER_COOLDOWN = float(os.environ.get('WEBHOOK_BREAKER_COOLDOWN', 60))
+# Seconds before a process checks whether its cached webhook subscriptions are still current
+WEBHOOK_INDEX_TTL = float(os.environ.get('WEBHOOK_INDEX_TTL', 5))
+# Webhook page latency and success stats cover this many hours of the delivery log
+WEBHOOK_STATS_HOURS = int(os.environ.get('WEBHOOK_STATS_HOURS', 24))
+# Delivery log rows older than this are pruned daily
+WEBHOOK_DELIVERY_RETENTION_DAYS = int(os.environ.get('WEBHOOK_DELIVERY_RETENTION_DAYS', 7))
 
 # Database transaction settings
 DATABASES['default']['ATOMIC_REQUESTS'] = False  # Disable atomic requests to prevent transaction issues
@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from .celery import app
+from .routing import FAST_IMPORT_QUEUE, IMPORT_QUEUE, MAINTENANCE_QUEUE, WEBHOOK_QUEUE, import_queue, route_task
+
+
+@override_settings(PRODUCT_IMPORT_FAST_LANE_BYTES=1000)
+class ImportRoutingTests(SimpleTestCase):
+    """
+    Imports go to a lane by the size of their stored file
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = self.settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def store(self, file_name, content):
+        file_path = f'uploads/{file_name}'
+        full_file_path = os.path.join(settings.MEDIA_ROOT, file_path)
+        os.makedirs(os.path.dirname(full_file_path), exist_ok=True)
+        with open(full_file_path, 'wb') as stored:
+            stored.write(content)
+        return file_path
+
+    def queue(self, name, args=(), kwargs=None):
+        """
+        Queue the configured Celery router picks for a task
+        """
+        return app.amqp.router.route({}, name, args, kwargs or {})['queue'].name
+
+    def test_small_uploads_take_the_fast_lane(self):
+        small = self.store('small.csv', b'x' * 1000)
+        large = self.store('large.csv', b'x' * 1001)
+
+        self.assertEqual(import_queue(small), FAST_IMPORT_QUEUE)
+        self.assertEqual(import_queue(large), IMPORT_QUEUE)
+        self.assertEqual(self.queue('file_processor.tasks.process_csv_file', (1, small)), FAST_IMPORT_QUEUE)
+        self.assertEqual(self.queue('file_processor.tasks.process_csv_file', (1, large)), IMPORT_QUEUE)
+        self.assertEqual(
+            self.queue('file_processor.tasks.process_csv_file', kwargs={'upload_id': 1, 'file_path': large}),
+            IMPORT_QUEUE,
+        )
+
+    def test_compressed_uploads_are_sized_as_decompressed(self):
+        # Routing only reads the stored size: 200 bytes count as 1600
+        self.assertEqual(import_queue(self.store('products.csv.gz', b'x' * 200)), IMPORT_QUEUE)
+        self.assertEqual(import_queue(self.store('products.csv', b'x' * 200)), FAST_IMPORT_QUEUE)
+
+    def test_missing_file_takes_the_bulk_lane(self):
+        self.assertEqual(import_queue('uploads/missing.csv'), IMPORT_QUEUE)
+        self.assertEqual(import_queue(None), IMPORT_QUEUE)
+
+    def test_other_tasks_go_to_their_queue(self):
+        self.assertEqual(self.queue('file_processor.tasks.import_csv_chunk'), IMPORT_QUEUE)
+        self.assertEqual(self.queue('file_processor.tasks.finalize_csv_import'), FAST_IMPORT_QUEUE)
+        self.assertEqual(self.queue('webhooks.tasks.relay_webhook_events'), WEBHOOK_QUEUE)
+        self.assertEqual(self.queue('products.tasks.delete_products'), MAINTENANCE_QUEUE)
+        # Anything unrouted falls through to the default queue
+        self.assertIsNone(route_task('celery.backend_cleanup', (), {}, {}))
+        self.assertEqual(self.queue('celery.backend_cleanup'), MAINTENANCE_QUEUE)
@@ -0,0 +1,184 @@
+import os
+import json
+from django.conf import settings
+from django.db import transaction
+from file_processor.importers import IMPORT_FIELDS, get_batch_size, get_upsert_writer
+from file_processor.validation import clean_row, RowRejected, MISSING_SKU
+from .models import Product, content_fingerprint
+from .cache import bump_catalog_version
+
+# Item operations; items without an op are upserts
+#   upsert     create the product or replace its fields
+#   create     fail if the SKU already exists
+#   update     replace the fields of an existing product
+#   patch      change only the fields present in the item
+#   deactivate set active to false
+BULK_OPS = ('upsert', 'create', 'update', 'patch', 'deactivate')
+CONTENT_FIELDS = ['name', 'description', 'price']
+
+# Result statuses, also the names of the counters
+RESULT_STATUSES = ('created', 'updated', 'unchanged', 'failed')
+
+INVALID_ITEM = 'item must be a JSON object'
+INVALID_JSON = 'invalid JSON'
+UNKNOWN_OP = f"op must be one of: {', '.join(BULK_OPS)}"
+INVALID_ACTIVE = 'active must be true or false'
+INVALID_TEXT = '{} must be a string'
+ALREADY_EXISTS = 'product already exists'
+NOT_FOUND = 'product not found'
+
+
+def get_sync_limit():
+    """
+    Largest number of items applied within the request; bigger bodies become a background job
+    """
+    return getattr(settings, 'PRODUCT_BULK_SYNC_ITEMS', 1000)
+
+
+def job_dir(job_id):
+    """
+    Directory holding the spooled items and the results of one bulk job
+    """
+    return os.path.join(settings.MEDIA_ROOT, 'bulk_jobs', str(job_id))
+
+
+def items_path(job_id):
+    return os.path.join(job_dir(job_id), 'items.ndjson')
+
+
+def results_path(job_id):
+    return os.path.join(job_dir(job_id), 'results.ndjson')
+
+
+def parse_active(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ('true', 'false'):
+        return value.strip().lower() == 'true'
+    raise RowRejected(INVALID_ACTIVE)
+
+
+def parse_item(item):
+    """
+    Split an item into (op, sku, fields), with fields in the string form clean_row expects
+    """
+    if isinstance(item, (str, bytes)):
+        try:
+            item = json.loads(item)
+        except ValueError:
+            raise RowRejected(INVALID_JSON)
+    if not isinstance(item, dict):
+        raise RowRejected(INVALID_ITEM)
+
+    op = item.get('op') or 'upsert'
+    if op not in BULK_OPS:
+        raise RowRejected(UNKNOWN_OP)
+    sku = item.get('sku')
+    if not isinstance(sku, str) or not sku.strip():
+        raise RowRejected(MISSING_SKU)
+
+    fields = {}
+    for name in CONTENT_FIELDS:
+        if name not in item:
+            continue
+        value = item[name]
+        if name == 'price' and isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        if value is not None and not isinstance(value, str):
+            raise RowRejected(INVALID_TEXT.format(name))
+        fields[name] = value
+    if 'active' in item:
+        fields['active'] = parse_active(item['active'])
+    return op, sku.strip().upper(), fields
+
+
+class BulkApplier:
+    """
+    Applies create/update/patch/deactivate items in set-based batches
+    Each batch reads the current rows of its SKUs in one query and writes the results with
+    the import's upsert writer in one statement, so the cost per item is a fraction of a query
+    Items are resolved in order, so later items in a body see the effect of earlier ones
+    """
+
+    def __init__(self):
+        self.batch_size = get_batch_size()
+        self.writer = get_upsert_writer()
+        self.counts = {name: 0 for name in RESULT_STATUSES}
+
+    def apply(self, items):
+        """
+        Yield one result per item, in input order
+        """
+        batch = []
+        for index, item in enumerate(items):
+            batch.append((index, item))
+            if len(batch) >= self.batch_size:
+                yield from self.apply_batch(batch)
+                batch = []
+        if batch:
+            yield from self.apply_batch(batch)
+
+    def apply_batch(self, batch):
+        parsed = []
+        results = {}
+        for index, item in batch:
+            try:
+                parsed.append((index,) + parse_item(item))
+            except RowRejected as e:
+                results[index] = {'index': index, 'sku': item.get('sku') if isinstance(item, dict) else None,
+                                  'status': 'failed', 'error': e.reason}
+
+        with transaction.atomic():
+            skus = {sku for _, _, sku, _ in parsed}
+            state = {
+                row['sku']: row
+                for row in Product.objects.filter(sku__in=skus).values(*IMPORT_FIELDS)  # type: ignore[reportAttributeAccessIssue]
+            }
+            touched = set()
+            for index, op, sku, fields in parsed:
+                try:
+                    row = self.resolve(op, sku, fields, state.get(sku))
+                except RowRejected as e:
+                    results[index] = {'index': index, 'sku': sku, 'op': op, 'status': 'failed', 'error': e.reason}
+                    continue
+                results[index] = {'index': index, 'sku': sku, 'op': op, 'status': self.outcome(state.get(sku), row)}
+                state[sku] = row
+                touched.add(sku)
+
+            if touched:
+                self.writer.write([dict(state[sku]) for sku in touched])
+                bump_catalog_version()
+
+        for index, _ in batch:
+            self.counts[results[index]['status']] += 1
+            yield results[index]
+
+    def resolve(self, op, sku, fields, current):
+        """
+        Full product row after applying one item to the current row (None if the SKU is new)
+        """
+        if op == 'create' and current:
+            raise RowRejected(ALREADY_EXISTS)
+        if op in ('update', 'patch', 'deactivate') and not current:
+            raise RowRejected(NOT_FOUND)
+
+        if op == 'deactivate':
+            return dict(current, active=False)
+        if op == 'patch':
+            merged = {name: current[name] for name in CONTENT_FIELDS}
+            merged['price'] = str(merged['price'])
+            merged.update(fields)
+            row = clean_row(dict(merged, sku=sku))
+            row['active'] = fields.get('active', current['active'])
+            return row
+        row = clean_row(dict(fields, sku=sku))
+        row['active'] = fields.get('active', True)
+        return row
+
+    def outcome(self, current, row):
+        if current is None:
+            return 'created'
+        fingerprint = content_fingerprint(row['name'], row['description'], row['price'], row['active'])
+        if content_fingerprint(current['name'], current['description'], current['price'], current['active']) == fingerprint:
+            return 'unchanged'
+        return 'updated'
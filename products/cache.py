@@ -0,0 +1,168 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+import redis
+from product_importer.redis_client import get_redis, mark_unavailable
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def get_catalog_version():
+    """
+    Current catalog version shared by every process, or None when Redis is unavailable
+    A missing key (new or flushed Redis) starts from the clock so it never repeats an older version
+    """
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        version = client.get(CATALOG_VERSION_KEY)
+        if version is None:
+            client.set(CATALOG_VERSION_KEY, int(time.time() * 1000), nx=True)
+            version = client.get(CATALOG_VERSION_KEY)
+        return int(version)
+    except redis.RedisError as e:
+        mark_unavailable(e)
+        return None
+
+
+def bump_catalog_version():
+    """
+    Invalidate every cached product response once the current transaction commits
+    """
+    transaction.on_commit(increment_catalog_version)
+
+
+def increment_catalog_version():
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline()
+        pipe.set(CATALOG_VERSION_KEY, int(time.time() * 1000), nx=True)
+        pipe.incr(CATALOG_VERSION_KEY)
+        pipe.execute()
+    except redis.RedisError as e:
+        mark_unavailable(e)
+
+
+class ResponseCache:
+    """
+    In-process LRU of rendered responses, bounded by entry count and total body size
+    Keys include the catalog version, so entries of older versions simply age out
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, content, content_type):
+        if len(content) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key)[0])
+            self.entries[key] = (content, content_type)
+            self.size += len(content)
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, (evicted, _) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def record_not_modified(self):
+        with self.lock:
+            self.not_modified += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+response_cache = ResponseCache(
+    getattr(settings, 'PRODUCT_RESPONSE_CACHE_ENTRIES', 1000),
+    getattr(settings, 'PRODUCT_RESPONSE_CACHE_BYTES', 64 * 1024 * 1024),
+)
+
+
+def request_cache_key(request):
+    """
+    Host (pagination links are absolute), path, query string with its parameters sorted,
+    and Accept header, which selects the renderer
+    """
+    query = sorted((name, value) for name in request.GET for value in request.GET.getlist(name))
+    accept = request.META.get('HTTP_ACCEPT', '')
+    return hashlib.md5(repr((request.get_host(), request.path, query, accept)).encode('utf-8')).hexdigest()
+
+
+class CatalogCacheMixin:
+    """
+    Serves GET requests from the response cache, keyed by request and catalog version
+    Responses carry a strong ETag derived from the same key, so a matching If-None-Match
+    gets a 304 without touching the database or the cache
+    Anything that changes products must call bump_catalog_version()
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        version = get_catalog_version() if request.method == 'GET' else None
+        if version is None:
+            return super().dispatch(request, *args, **kwargs)  # type: ignore[reportAttributeAccessIssue]
+
+        key = request_cache_key(request)
+        etag = f'"{version}-{key}"'
+        if etag in [tag.strip() for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+            response_cache.record_not_modified()
+            return self.tag(HttpResponseNotModified(), etag, 'HIT')
+
+        cached = response_cache.get((version, key))
+        if cached is not None:
+            content, content_type = cached
+            return self.tag(HttpResponse(content, content_type=content_type), etag, 'HIT')
+
+        response = super().dispatch(request, *args, **kwargs)  # type: ignore[reportAttributeAccessIssue]
+        if response.status_code != 200 or response.streaming:
+            return response
+        response.render()
+        # Only JSON is cached; the browsable API embeds per-user CSRF tokens
+        if 'json' not in response.get('Content-Type', ''):
+            return response
+        response_cache.set((version, key), response.content, response['Content-Type'])
+        return self.tag(response, etag, 'MISS')
+
+    def tag(self, response, etag, outcome):
+        response['ETag'] = etag
+        response['X-Cache'] = outcome
+        patch_vary_headers(response, ['Accept'])
+        return response
@@ -0,0 +1,98 @@
+import io
+import csv
+import json
+import zlib
+
+# Columns of a CSV export, in the layout the importer accepts
+CSV_FIELDS = ['sku', 'name', 'description', 'price']
+# Fields of a JSONL export, matching ProductSerializer output
+JSONL_FIELDS = ['id', 'sku', 'name', 'description', 'price', 'active', 'created_at', 'updated_at']
+
+# Rows fetched per round trip of the server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+# Encoded bytes collected before a chunk is sent to the client
+FLUSH_BYTES = 64 * 1024
+
+
+def iter_values(queryset, fields):
+    """
+    Stream tuples of fields in primary key order without instantiating models
+    iterator() uses a server-side cursor on PostgreSQL, so memory stays flat
+    """
+    return queryset.order_by('pk').values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def buffered(lines):
+    """
+    Join encoded lines into chunks of roughly FLUSH_BYTES
+    """
+    buffer = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= FLUSH_BYTES:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def csv_lines(queryset):
+    output = io.StringIO()
+    writer = csv.writer(output)
+
+    def line(values):
+        output.seek(0)
+        output.truncate()
+        writer.writerow(values)
+        return output.getvalue()
+
+    yield line(CSV_FIELDS)
+    for sku, name, description, price in iter_values(queryset, CSV_FIELDS):
+        yield line([sku, name, description or '', price])
+
+
+def json_value(value):
+    if hasattr(value, 'isoformat'):
+        # Same representation as DRF's DateTimeField
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    return str(value)
+
+
+def jsonl_lines(queryset):
+    for values in iter_values(queryset, JSONL_FIELDS):
+        record = {field: json_value(value) for field, value in zip(JSONL_FIELDS, values)}
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def gzipped(chunks):
+    """
+    Compress a byte stream into a gzip file on the fly
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_lines, 'text/csv'),
+    'jsonl': (jsonl_lines, 'application/x-ndjson'),
+}
+
+
+def export_stream(queryset, export_format, compress=False):
+    """
+    Byte chunks of the queryset exported as CSV or JSONL, optionally gzipped
+    """
+    lines, _ = EXPORT_FORMATS[export_format]
+    chunks = buffered(lines(queryset))
+    return gzipped(chunks) if compress else chunks
@@ -1,5 +1,7 @@
 import django_filters
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
 from .models import Product
+from .search import get_search_backend
 
 class ProductFilter(django_filters.FilterSet):
     sku = django_filters.CharFilter(lookup_expr='icontains')  # Case-insensitive contains
@@ -8,4 +10,30 @@ class ProductFilter(django_filters.FilterSet):
     
     class Meta:
         model = Product
-        fields = ['sku', 'active']
\ No newline at end of file
+        fields = ['sku', 'active']
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+    ?search= through the indexed search backend of the database vendor
+    Matches are annotated with search_rank
+    """
+    search_param = 'search'
+
+    def get_search_query(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if not query:
+            return queryset
+        return get_search_backend().search(queryset, query)
+
+class ProductOrderingFilter(OrderingFilter):
+    """
+    Searches are ordered by rank unless the client asks for another ordering
+    """
+
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param) and ProductSearchFilter().get_search_query(request):
+            return ['-search_rank', '-id']
+        return super().get_ordering(request, queryset, view)
@@ -0,0 +1,57 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from products.models import Product
+from products.serializers import ProductSerializer, ProductValuesSerializer
+from file_processor.importers import get_upsert_writer
+from file_processor.validation import clean_row
+from product_importer.benchmark import throwaway_database
+
+
+class Command(BaseCommand):
+    help = 'Compare ProductSerializer against the .values() fast path (pages/s per page size)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-sizes', type=int, nargs='+', default=[20, 100, 1000])
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        page_sizes = options['page_sizes']
+        repeat = options['repeat']
+
+        with throwaway_database():
+            self.create_rows(max(page_sizes))
+            queryset = Product.objects.order_by('-created_at', 'id')  # type: ignore[reportAttributeAccessIssue]
+            for page_size in page_sizes:
+                model_output = self.render_models(queryset, page_size)
+                if self.render_values(queryset, page_size) != model_output:
+                    raise CommandError(f'Fast path output differs from ProductSerializer at {page_size} rows')
+
+                for name, render in (('ProductSerializer', self.render_models), ('ProductValuesSerializer', self.render_values)):
+                    start = time.perf_counter()
+                    for _ in range(repeat):
+                        render(queryset, page_size)
+                    self.report(name, page_size, repeat, time.perf_counter() - start)
+
+    def create_rows(self, count):
+        rows = [
+            clean_row({
+                'sku': f'BENCH-{i:06d}',
+                'name': f'Serializer benchmark product {i}',
+                'description': f'Description for serializer benchmark product {i}',
+                'price': f'{i % 1000}.99',
+            })
+            for i in range(count)
+        ]
+        get_upsert_writer().write(rows)
+
+    def render_models(self, queryset, page_size):
+        return JSONRenderer().render(ProductSerializer(list(queryset[:page_size]), many=True).data)
+
+    def render_values(self, queryset, page_size):
+        serializer = ProductValuesSerializer()
+        return JSONRenderer().render(serializer.many(serializer.values(queryset)[:page_size]))
+
+    def report(self, name, page_size, repeat, elapsed):
+        per_page = elapsed / repeat * 1000
+        self.stdout.write(f'{name:<24} {page_size:>5} rows/page {per_page:8.2f} ms/page ({repeat / elapsed:,.0f} pages/s)')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from products.stats import rebuild_stats, get_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the catalog stats summary from the products table'
+
+    def handle(self, *args, **options):
+        rebuild_stats()
+        stats = get_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt product stats: {stats['total']} products, {stats['active']} active"
+        ))
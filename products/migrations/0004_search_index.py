@@ -0,0 +1,67 @@
+from django.db import migrations
+
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "ALTER TABLE products ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(sku, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')) STORED",
+    "CREATE INDEX products_search_vector_idx ON products USING gin (search_vector)",
+    # Same expressions as Django's icontains lookups, so sku/name filters use them too
+    "CREATE INDEX products_sku_trgm_idx ON products USING gin (upper(sku) gin_trgm_ops)",
+    "CREATE INDEX products_name_trgm_idx ON products USING gin (upper(name) gin_trgm_ops)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS products_name_trgm_idx",
+    "DROP INDEX IF EXISTS products_sku_trgm_idx",
+    "DROP INDEX IF EXISTS products_search_vector_idx",
+    "ALTER TABLE products DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE products_fts USING fts5(sku, name, description, prefix='2 3')",
+    "INSERT INTO products_fts (rowid, sku, name, description) "
+    "SELECT id, sku, name, coalesce(description, '') FROM products",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS products_fts",
+]
+
+
+def has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return 'ENABLE_FTS5' in {row[0] for row in cursor.fetchall()}
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        statements = POSTGRES_FORWARD
+    elif connection.vendor == 'sqlite' and has_fts5(connection):
+        statements = SQLITE_FORWARD
+    else:
+        # Search falls back to unindexed matching
+        statements = []
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    statements = {'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
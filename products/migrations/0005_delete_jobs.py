@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDeleteJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filters', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('method', models.CharField(blank=True, choices=[('chunked', 'Chunked'), ('truncate', 'Truncate')], default='', max_length=20)),
+                ('progress', models.IntegerField(default=0)),
+                ('total_rows', models.IntegerField(default=0)),
+                ('deleted_rows', models.IntegerField(default=0)),
+                ('duration', models.FloatField(default=0.0)),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'product_delete_jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_delete_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductBulkJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('progress', models.IntegerField(default=0)),
+                ('total_items', models.IntegerField(default=0)),
+                ('processed_items', models.IntegerField(default=0)),
+                ('created', models.IntegerField(default=0)),
+                ('updated', models.IntegerField(default=0)),
+                ('unchanged', models.IntegerField(default=0)),
+                ('failed', models.IntegerField(default=0)),
+                ('duration', models.FloatField(default=0.0)),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'product_bulk_jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
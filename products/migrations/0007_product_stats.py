@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:29
+
+from django.db import migrations, models
+
+
+# Histogram edges as of this migration; later changes to products.stats must not alter it
+PRICE_BUCKET_EDGES = [
+    0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000, 1000000,
+]
+
+
+def populate_stats(apps, schema_editor):
+    # Seed the summary from the products already in the table
+    cases = ' '.join(f"WHEN price < {edge} THEN {index - 1}" for index, edge in enumerate(PRICE_BUCKET_EDGES))
+    bucket = f"(CASE {cases} ELSE {len(PRICE_BUCKET_EDGES) - 1} END)"
+    schema_editor.execute(
+        f"INSERT INTO product_stats (bucket, active, product_count, price_total) "
+        f"SELECT {bucket}, active, count(*), sum(price) FROM products GROUP BY {bucket}, active"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_bulk_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.IntegerField()),
+                ('active', models.BooleanField()),
+                ('product_count', models.BigIntegerField(default=0)),
+                ('price_total', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+            ],
+            options={
+                'db_table': 'product_stats',
+                'constraints': [models.UniqueConstraint(fields=('bucket', 'active'), name='product_stats_bucket_active_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
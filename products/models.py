@@ -1,4 +1,15 @@
-from django.db import models
+import hashlib
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import models, transaction
+
+def content_fingerprint(name, description, price, active):
+    """
+    Hash of the fields an import writes, used to skip rows whose content has not changed
+    Must stay in sync with the md5() expression in PostgresCopyImporter.merge_sql
+    """
+    price = Decimal(str(price)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    content = '\x1f'.join([name or '', description or '', str(price), '1' if active else '0'])
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
 
 class Product(models.Model):
     sku = models.CharField(max_length=100, unique=True, db_index=True)
@@ -6,6 +17,7 @@ class Product(models.Model):
     description = models.TextField(blank=True, null=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     active = models.BooleanField(default=True)  # type: ignore[reportArgumentType]
+    content_hash = models.CharField(max_length=32, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -14,6 +26,11 @@ class Product(models.Model):
         indexes = [
             models.Index(fields=['sku']),
             models.Index(fields=['active']),
+            # Keyset pagination seeks on each ordering field with id as the tie-breaker;
+            # sku is unique, so its own index already serves that ordering
+            models.Index(fields=['created_at', 'id'], name='products_created_id_idx'),
+            models.Index(fields=['name', 'id'], name='products_name_id_idx'),
+            models.Index(fields=['price', 'id'], name='products_price_id_idx'),
         ]
 
     def __str__(self):
@@ -22,4 +39,119 @@ class Product(models.Model):
     def save(self, *args, **kwargs):
         # Make SKU case-insensitive by converting to uppercase
         self.sku = self.sku.upper()  # type: ignore[reportAttributeAccessIssue]
-        super().save(*args, **kwargs)
\ No newline at end of file
+        self.content_hash = content_fingerprint(self.name, self.description, self.price, self.active)
+        from .search import get_search_backend
+        from .cache import bump_catalog_version
+        from .stats import record_written
+        from webhooks.outbox import product_data, record_product_events
+        with transaction.atomic():
+            old = None
+            if self.pk:
+                old = Product.objects.filter(pk=self.pk).values_list('price', 'active').first()  # type: ignore[reportAttributeAccessIssue]
+            super().save(*args, **kwargs)
+            get_search_backend().index_skus([self.sku])
+            record_written(old, (self.price, self.active))
+            record_product_events({'product_updated' if old else 'product_created': [self]}, product_data)
+        bump_catalog_version()
+
+    def delete(self, *args, **kwargs):
+        from .search import get_search_backend
+        from .cache import bump_catalog_version
+        from .stats import record_deleted
+        from webhooks.outbox import record_product_events
+        product_id = self.pk
+        with transaction.atomic():
+            old = Product.objects.filter(pk=product_id).values_list('price', 'active').first()  # type: ignore[reportAttributeAccessIssue]
+            result = super().delete(*args, **kwargs)
+            get_search_backend().remove_ids([product_id])
+            if old:
+                record_deleted([old])
+                record_product_events({'product_deleted': [{'id': product_id, 'sku': self.sku}]})
+        bump_catalog_version()
+        return result
+
+class ProductDeleteJob(models.Model):
+    """
+    A bulk delete running in the background, optionally limited by ProductFilter parameters
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    METHOD_CHOICES = [
+        ('chunked', 'Chunked'),
+        ('truncate', 'Truncate'),
+    ]
+
+    filters = models.JSONField(default=dict, blank=True)  # ProductFilter parameters; empty deletes everything
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    method = models.CharField(max_length=20, choices=METHOD_CHOICES, blank=True, default='')
+    progress = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
+    total_rows = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
+    deleted_rows = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
+    duration = models.FloatField(default=0.0)  # type: ignore[reportArgumentType] # Duration in seconds
+    error_message = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'product_delete_jobs'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Delete {self.filters or 'all'} - {self.status} ({self.progress}%)"
+
+
+class ProductBulkJob(models.Model):
+    """
+    A bulk product change too large to apply within its request
+    Items are spooled to an NDJSON file and results written to another, one line per item
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    progress = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
+    total_items = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
+    processed_items = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
+    created = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
+    updated = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
+    unchanged = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
+    failed = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
+    duration = models.FloatField(default=0.0)  # type: ignore[reportArgumentType] # Duration in seconds
+    error_message = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'product_bulk_jobs'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Bulk job {self.pk} - {self.status} ({self.processed_items}/{self.total_items})"
+
+
+class ProductStats(models.Model):
+    """
+    Product count and price total per price histogram bucket and active flag
+    Kept current by every product write path; rebuild_product_stats repairs drift
+    """
+    bucket = models.IntegerField()  # Index into products.stats.PRICE_BUCKET_EDGES, -1 below the first edge
+    active = models.BooleanField()
+    product_count = models.BigIntegerField(default=0)  # type: ignore[reportArgumentType]
+    price_total = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'product_stats'
+        constraints = [
+            models.UniqueConstraint(fields=['bucket', 'active'], name='product_stats_bucket_active_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Bucket {self.bucket} ({'active' if self.active else 'inactive'}): {self.product_count}"
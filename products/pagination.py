@@ -0,0 +1,160 @@
+import json
+import base64
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on the requested ordering plus id as a tie-breaker
+    Each page is one indexed range scan of page_size + 1 rows, with no COUNT and no OFFSET,
+    so fetching page N costs the same as fetching page 1
+    The cursor holds the sort key of the first or last row on the current page
+    """
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(queryset, view)
+        cursor = self.decode_cursor(request)
+        self.reverse = bool(cursor and cursor['reverse'])
+
+        # A previous-page cursor walks backwards, so flip every direction and the results
+        ordering = [self.flip(field) for field in self.ordering] if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self.seek_filter(ordering, cursor['position']))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        self.has_next = has_more if not self.reverse else bool(cursor)
+        self.has_previous = bool(cursor) if not self.reverse else has_more
+        self.first_position = self.position(rows[0]) if rows else None
+        self.last_position = self.position(rows[-1]) if rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_ordering(self, queryset, view):
+        """
+        Ordering applied by OrderingFilter (or the view default), made total by appending id
+        """
+        ordering = list(queryset.query.order_by) or list(getattr(view, 'ordering', None) or [])
+        ordering = [field for field in ordering if field.lstrip('-') not in ('id', 'pk')]
+        last_descending = bool(ordering) and ordering[-1].startswith('-')
+        return ordering + ['-id' if last_descending else 'id']
+
+    def flip(self, field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def seek_filter(self, ordering, position):
+        """
+        Rows strictly after position in ordering
+        The leading range on the first field lets the database use the composite index
+        """
+        fields = [field.lstrip('-') for field in ordering]
+        lookups = ['lt' if field.startswith('-') else 'gt' for field in ordering]
+
+        after = Q()
+        for index, (field, lookup) in enumerate(zip(fields, lookups)):
+            branch = Q(**{f'{field}__{lookup}': position[index]})
+            for previous, value in zip(fields[:index], position[:index]):
+                branch &= Q(**{previous: value})
+            after |= branch
+
+        leading = Q(**{f'{fields[0]}__{lookups[0]}e': position[0]})
+        return leading & after
+
+    def position(self, row):
+        # Numbers such as search_rank stay numeric so they compare exactly; other values travel as text
+        fields = [field.lstrip('-') for field in self.ordering]
+        values = [row[field] for field in fields] if isinstance(row, dict) else [getattr(row, field) for field in fields]
+        return [value if isinstance(value, (int, float)) else str(value) for value in values]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if len(cursor['position']) != len(self.ordering):
+                raise ValueError('Cursor does not match the ordering')
+            return {'position': cursor['position'], 'reverse': bool(cursor.get('reverse'))}
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        cursor = json.dumps({'position': position, 'reverse': reverse}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(cursor.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or self.last_position is None:
+            return None
+        return self.encode_cursor(self.last_position, False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first_position is None:
+            # Walked past the last row; the first page is the only safe way back
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.first_position, True)
+
+
+class ProductPagination(BasePagination):
+    """
+    Page-number or keyset pagination, chosen per request with ?pagination=page|cursor
+    PRODUCT_LIST_PAGINATION sets the default; a cursor parameter always means keyset
+    """
+
+    query_param = 'pagination'
+    styles = {
+        'page': PageNumberPagination,
+        'cursor': KeysetPagination,
+    }
+
+    def get_style(self, request):
+        if request.query_params.get(KeysetPagination.cursor_query_param):
+            return 'cursor'
+        style = request.query_params.get(self.query_param, getattr(settings, 'PRODUCT_LIST_PAGINATION', 'page'))
+        return style if style in self.styles else 'page'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.styles[self.get_style(request)]()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return PageNumberPagination().get_paginated_response_schema(schema)
@@ -0,0 +1,193 @@
+import re
+from functools import lru_cache, reduce
+from operator import and_, or_
+from django.db import connection
+from django.db.models import Q, Value, FloatField, BooleanField
+from django.db.models.expressions import RawSQL
+
+# Name of the SQLite FTS5 table that shadows products
+FTS_TABLE = 'products_fts'
+# Values bound per statement on SQLite, under its bound parameter limit
+SQLITE_CHUNK_SIZE = 500
+
+
+def search_terms(query):
+    """
+    Words of a search string, as matched by the full-text indexes
+    """
+    return re.findall(r'\w+', query)
+
+
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class SearchBackend:
+    """
+    Filters products by a search string and annotates each match with search_rank (higher is better)
+    Subclasses also keep their index in sync for writes that bypass the database's own maintenance
+    """
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def index_skus(self, skus):
+        """
+        Refresh the index entries of the products with these SKUs after a write
+        """
+
+    def remove_ids(self, ids):
+        """
+        Drop the index entries of deleted products
+        """
+
+    def clear(self):
+        """
+        Empty the index after every product was deleted
+        """
+
+    def rebuild(self):
+        """
+        Rebuild the whole index from the products table
+        """
+
+    def no_matches(self, queryset):
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).none()
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Matches the generated search_vector column (GIN index) for words and prefixes, and
+    pg_trgm indexes on upper(sku) and upper(name) for substrings
+    Ranked by ts_rank, boosted for exact and prefix SKU matches and trigram similarity of the name
+    The tsvector is a stored generated column, so every write path, including COPY merges,
+    keeps it current without triggers
+    """
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        tsquery = ' & '.join(f"{term.lower()}:*" for term in terms)
+        sku = query.strip().upper()
+        pattern = f'%{escape_like(sku)}%'
+
+        conditions = ['upper("products"."sku") LIKE %s', 'upper("products"."name") LIKE %s']
+        params = [pattern, pattern]
+        rank = '0'
+        rank_params = []
+        if tsquery:
+            conditions.insert(0, "\"products\".\"search_vector\" @@ to_tsquery('simple', %s)")
+            params.insert(0, tsquery)
+            rank = "ts_rank(\"products\".\"search_vector\", to_tsquery('simple', %s))"
+            rank_params.append(tsquery)
+
+        rank_sql = (
+            f"({rank} + CASE WHEN \"products\".\"sku\" = %s THEN 2 "
+            f"WHEN \"products\".\"sku\" LIKE %s THEN 1 ELSE 0 END "
+            f"+ similarity(upper(\"products\".\"name\"), %s))::float8"
+        )
+        rank_params += [sku, f'{escape_like(sku)}%', sku]
+
+        return queryset.filter(
+            RawSQL(f"({' OR '.join(conditions)})", params, output_field=BooleanField())
+        ).annotate(search_rank=RawSQL(rank_sql, rank_params, output_field=FloatField()))
+
+
+class SqliteSearchBackend(SearchBackend):
+    """
+    FTS5 shadow table keyed by product id, ranked by bm25 with SKU weighted above name and description
+    Writers refresh it for each batch they touch instead of using per-row triggers
+    """
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return self.no_matches(queryset)
+        # Every word must match, as a prefix of an indexed token
+        match = ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+        return queryset.filter(
+            RawSQL(f'"products"."id" IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)', [match], output_field=BooleanField())
+        ).annotate(search_rank=RawSQL(
+            f'(SELECT -bm25({FTS_TABLE}, 10.0, 5.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = "products"."id")',
+            [match],
+            output_field=FloatField(),
+        ))
+
+    def index_skus(self, skus):
+        skus = list(skus)
+        with connection.cursor() as cursor:
+            # Stay under SQLite's bound parameter limit
+            for start in range(0, len(skus), SQLITE_CHUNK_SIZE):
+                chunk = skus[start:start + SQLITE_CHUNK_SIZE]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(
+                    f"DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT id FROM products WHERE sku IN ({placeholders}))",
+                    chunk
+                )
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, sku, name, description) "
+                    f"SELECT id, sku, name, coalesce(description, '') FROM products WHERE sku IN ({placeholders})",
+                    chunk
+                )
+
+    def remove_ids(self, ids):
+        ids = list(ids)
+        with connection.cursor() as cursor:
+            # Stay under SQLite's bound parameter limit
+            for start in range(0, len(ids), SQLITE_CHUNK_SIZE):
+                chunk = ids[start:start + SQLITE_CHUNK_SIZE]
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(chunk))})", chunk)
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, sku, name, description) "
+                f"SELECT id, sku, name, coalesce(description, '') FROM products"
+            )
+
+
+class ContainsSearchBackend(SearchBackend):
+    """
+    Unindexed fallback: every word must appear in the sku, name or description
+    """
+
+    def search(self, queryset, query):
+        terms = query.split()
+        if not terms:
+            return self.no_matches(queryset)
+        matches = [
+            reduce(or_, [Q(**{f'{field}__icontains': term}) for field in ('sku', 'name', 'description')])
+            for term in terms
+        ]
+        return queryset.filter(reduce(and_, matches)).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+SEARCH_BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SqliteSearchBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def has_fts_table(alias, database_name):
+    """
+    Whether the SQLite database has the FTS5 index, looked up once per connection alias
+    Keyed on the database name too, so a test or benchmark database gets its own answer
+    """
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def get_search_backend():
+    """
+    Search backend for the database vendor
+    The unindexed fallback serves other vendors and SQLite builds without FTS5
+    """
+    if connection.vendor == 'sqlite' and not has_fts_table(connection.alias, connection.settings_dict['NAME']):
+        return ContainsSearchBackend()
+    return SEARCH_BACKENDS.get(connection.vendor, ContainsSearchBackend)()
@@ -1,8 +1,98 @@
+from datetime import timezone as dt_timezone
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Product
+from rest_framework.settings import api_settings
+from rest_framework import ISO_8601
+from .models import Product, ProductDeleteJob, ProductBulkJob
 
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
+        exclude = ('content_hash',)
+        read_only_fields = ('created_at', 'updated_at')
+
+class ProductDeleteJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductDeleteJob
+        fields = '__all__'
+        read_only_fields = ('created_at', 'updated_at')
+
+
+class ProductBulkJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductBulkJob
         fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at')
\ No newline at end of file
+        read_only_fields = ('created_at', 'updated_at')
+
+
+def decimal_encoder(field):
+    """
+    Same string DecimalField renders for database values, which already have decimal_places digits
+    """
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.normalize_output:
+        return field.to_representation
+    return lambda value: f'{value:f}'
+
+
+def datetime_encoder(field):
+    """
+    ISO 8601 with a Z suffix, as DateTimeField renders when the active timezone is UTC
+    Other timezones or formats go through the field itself
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601 or not settings.USE_TZ \
+            or timezone.get_current_timezone_name() != 'UTC':
+        return field.to_representation
+
+    def encode(value):
+        value = value.astimezone(dt_timezone.utc).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return encode
+
+
+# Encoders for fields whose database value is not already its JSON representation
+FIELD_ENCODERS = {
+    serializers.DecimalField: decimal_encoder,
+    serializers.DateTimeField: datetime_encoder,
+}
+PLAIN_FIELDS = (serializers.IntegerField, serializers.CharField, serializers.BooleanField)
+
+
+class ProductValuesSerializer:
+    """
+    Read-only fast path for ProductSerializer that works on .values() dicts
+    Skips model instantiation and DRF's per-field dispatch; the field list and encoders are
+    compiled once per request from ProductSerializer, so the JSON output is identical
+    """
+
+    def __init__(self):
+        self.encoders = []
+        for name, field in ProductSerializer().fields.items():
+            factory = next((factory for kind, factory in FIELD_ENCODERS.items() if isinstance(field, kind)), None)
+            if factory:
+                encoder = factory(field)
+            elif isinstance(field, PLAIN_FIELDS):
+                encoder = None
+            else:
+                encoder = field.to_representation
+            self.encoders.append((name, field.source, encoder))
+
+    def values(self, queryset):
+        """
+        The queryset as dicts of the serialized fields, plus any annotations ordering may rely on
+        """
+        sources = [source for _, source, _ in self.encoders]
+        extra = [name for name in queryset.query.annotations if name not in sources]
+        return queryset.values(*sources, *extra)
+
+    def to_representation(self, row):
+        data = {}
+        for name, source, encoder in self.encoders:
+            value = row[source]
+            data[name] = value if encoder is None or value is None else encoder(value)
+        return data
+
+    def many(self, rows):
+        return [self.to_representation(row) for row in rows]
@@ -0,0 +1,184 @@
+from bisect import bisect_right
+from decimal import Decimal
+from django.db import connection, transaction
+
+# Lower edges of the price histogram buckets; prices below the first edge fall in bucket -1
+PRICE_BUCKET_EDGES = [
+    0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000, 1000000,
+]
+
+STATS_TABLE = 'product_stats'
+
+
+def price_bucket(price):
+    return bisect_right(PRICE_BUCKET_EDGES, price) - 1
+
+
+def bucket_sql(expression):
+    """
+    SQL for price_bucket(), shared by the rebuild and the PostgreSQL upsert statements
+    """
+    cases = ' '.join(f"WHEN {expression} < {edge} THEN {index - 1}" for index, edge in enumerate(PRICE_BUCKET_EDGES))
+    return f"(CASE {cases} ELSE {len(PRICE_BUCKET_EDGES) - 1} END)"
+
+
+def increment_sql(values):
+    """
+    Add product_count and price_total deltas to their (bucket, active) rows, creating missing ones
+    values is a VALUES list or SELECT yielding (bucket, active, product_count, price_total)
+    """
+    return (
+        f"INSERT INTO {STATS_TABLE} (bucket, active, product_count, price_total) {values} "
+        f"ON CONFLICT (bucket, active) DO UPDATE SET "
+        f"product_count = {STATS_TABLE}.product_count + excluded.product_count, "
+        f"price_total = {STATS_TABLE}.price_total + excluded.price_total"
+    )
+
+
+def delta_cte_sql(upserted, old):
+    """
+    PostgreSQL CTE that moves the rows returned by an upsert out of their old buckets and into
+    their new ones, in the same statement
+    upserted must return sku, price and active; old holds the pre-statement sku, price and active
+    of the same SKUs, which every CTE of a statement sees from one snapshot
+    """
+    return (
+        "stats AS ("
+        + increment_sql(
+            f"SELECT bucket, active, sum(n), sum(total) FROM ("
+            f"SELECT {bucket_sql('u.price')} AS bucket, u.active, 1 AS n, u.price AS total FROM {upserted} u "
+            f"UNION ALL "
+            f"SELECT {bucket_sql('o.price')}, o.active, -1, -o.price FROM {upserted} u JOIN {old} o ON o.sku = u.sku"
+            # A fixed order keeps concurrent imports locking stats rows in the same order
+            f") moves GROUP BY bucket, active ORDER BY bucket, active"
+        )
+        + ")"
+    )
+
+
+class StatsDelta:
+    """
+    Accumulates bucket changes for rows written or deleted outside SQL, applied in one statement
+    """
+
+    def __init__(self):
+        self.changes = {}
+
+    def change(self, bucket, active, count, total):
+        key = (bucket, bool(active))
+        current_count, current_total = self.changes.get(key, (0, Decimal(0)))
+        self.changes[key] = (current_count + count, current_total + Decimal(total))
+
+    def move(self, price, active, sign):
+        # Unsaved models may still hold the price as assigned, e.g. a string
+        price = Decimal(str(price))
+        self.change(price_bucket(price), active, sign, sign * price)
+
+    def add(self, price, active):
+        self.move(price, active, 1)
+
+    def remove(self, price, active):
+        self.move(price, active, -1)
+
+    def apply(self):
+        changes = [(key, delta) for key, delta in sorted(self.changes.items()) if delta[0] or delta[1]]
+        self.changes = {}
+        if not changes:
+            return
+        placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(changes))
+        params = [value for (bucket, active), (count, total) in changes for value in (bucket, active, count, total)]
+        with connection.cursor() as cursor:
+            cursor.execute(increment_sql(f"VALUES {placeholders}"), params)
+
+
+def record_written(old, new):
+    """
+    Account for one product written through the ORM; old is (price, active) or None for an insert
+    """
+    delta = StatsDelta()
+    if old:
+        delta.remove(*old)
+    delta.add(*new)
+    delta.apply()
+
+
+def record_deleted(rows):
+    """
+    Account for deleted products given their (price, active) pairs
+    """
+    delta = StatsDelta()
+    for price, active in rows:
+        delta.remove(price, active)
+    delta.apply()
+
+
+def clear_stats():
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {STATS_TABLE}")
+
+
+def rebuild_stats():
+    """
+    Recompute the summary from the products table
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {STATS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {STATS_TABLE} (bucket, active, product_count, price_total) "
+                f"SELECT {bucket_sql('price')}, active, count(*), sum(price) FROM products "
+                f"GROUP BY {bucket_sql('price')}, active"
+            )
+
+
+def bucket_range(bucket):
+    low = PRICE_BUCKET_EDGES[bucket] if bucket >= 0 else None
+    high = PRICE_BUCKET_EDGES[bucket + 1] if bucket + 1 < len(PRICE_BUCKET_EDGES) else None
+    return low, high
+
+
+def decimal_string(value):
+    return None if value is None else f'{value:f}'
+
+
+def get_stats():
+    """
+    Catalog totals and price histogram from the summary table
+    Reads at most two rows per bucket plus the two ends of the price index, whatever the catalog size
+    """
+    from .models import Product, ProductStats
+
+    total = active = 0
+    price_total = Decimal(0)
+    histogram = {}
+    for row in ProductStats.objects.filter(product_count__gt=0):  # type: ignore[reportAttributeAccessIssue]
+        total += row.product_count
+        price_total += row.price_total
+        if row.active:
+            active += row.product_count
+        bucket = histogram.setdefault(row.bucket, {'count': 0, 'active': 0})
+        bucket['count'] += row.product_count
+        if row.active:
+            bucket['active'] += row.product_count
+
+    prices = Product.objects.order_by('price').values_list('price', flat=True)  # type: ignore[reportAttributeAccessIssue]
+    lowest = prices.first()
+    highest = prices.reverse().first()
+
+    average = (price_total / total).quantize(Decimal('0.01')) if total else None
+
+    return {
+        'total': total,
+        'active': active,
+        'inactive': total - active,
+        # Prices are strings, as in product responses
+        'price': {
+            'min': decimal_string(lowest),
+            'max': decimal_string(highest),
+            'avg': decimal_string(average),
+        },
+        'histogram': [
+            dict(zip(('min', 'max'), bucket_range(bucket)), **histogram[bucket])
+            for bucket in sorted(histogram)
+        ],
+    }
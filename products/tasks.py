@@ -0,0 +1,167 @@
+import os
+import time
+import json
+from celery import shared_task
+from django.conf import settings
+from django.db import connection, transaction
+from .models import Product, ProductDeleteJob, ProductBulkJob
+from .filters import ProductFilter
+from .search import get_search_backend
+from .cache import bump_catalog_version
+from .stats import clear_stats, record_deleted
+from .bulk import BulkApplier, items_path, results_path
+from webhooks.outbox import is_subscribed, record_product_events
+
+# Statements that empty the products table without visiting each row
+TRUNCATE_SQL = {
+    'postgresql': 'TRUNCATE TABLE products',
+    # SQLite has no TRUNCATE; an unqualified DELETE takes its truncate optimization
+    'sqlite': 'DELETE FROM products',
+}
+
+
+def can_truncate(filters):
+    """
+    Whole-table deletes can skip the row-by-row path when no other table references products
+    and no webhook needs a product_deleted event for each row
+    """
+    return (
+        not filters and not Product._meta.related_objects and connection.vendor in TRUNCATE_SQL
+        and not is_subscribed('product_deleted')
+    )
+
+
+def truncate_products(job):
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(TRUNCATE_SQL[connection.vendor])
+        get_search_backend().clear()
+        clear_stats()
+    job.deleted_rows = job.total_rows
+
+
+def delete_in_chunks(job, queryset):
+    """
+    Delete matching products in primary key order, one short transaction per chunk
+    Each chunk locks the rows it reads and deletes exactly those ids, so rows written into the
+    id range meanwhile are left alone and stats, index and events match what was deleted
+    """
+    chunk_size = settings.PRODUCT_DELETE_CHUNK_SIZE
+    backend = get_search_backend()
+    last_id = 0
+
+    while True:
+        with transaction.atomic():
+            rows = list(
+                queryset.filter(pk__gt=last_id).order_by('pk').select_for_update()
+                .values_list('pk', 'price', 'active', 'sku')[:chunk_size]
+            )
+            if not rows:
+                break
+            ids = [row[0] for row in rows]
+            deleted, _ = Product.objects.filter(pk__in=ids).delete()  # type: ignore[reportAttributeAccessIssue]
+            backend.remove_ids(ids)
+            record_deleted(row[1:3] for row in rows)
+            record_product_events({'product_deleted': [{'id': row[0], 'sku': row[3]} for row in rows]})
+        last_id = ids[-1]
+
+        job.deleted_rows += deleted
+        job.progress = min(99, job.deleted_rows * 100 // job.total_rows) if job.total_rows else 0
+        job.save()
+        # Readers stop seeing the deleted rows as each chunk commits
+        bump_catalog_version()
+
+
+@shared_task
+def delete_products(job_id):
+    """
+    Delete the products matched by a ProductDeleteJob
+    Unfiltered deletes truncate the table when nothing depends on its rows
+    """
+    job = None
+    start_time = time.time()
+
+    try:
+        job = ProductDeleteJob.objects.get(id=job_id)  # type: ignore[reportAttributeAccessIssue]
+        if job.status == 'completed':
+            return
+        job.status = 'processing'
+
+        queryset = ProductFilter(job.filters, queryset=Product.objects.all()).qs  # type: ignore[reportAttributeAccessIssue]
+        job.total_rows = job.deleted_rows + queryset.count()
+        job.method = 'truncate' if can_truncate(job.filters) else 'chunked'
+        job.save()
+
+        if job.method == 'truncate':
+            truncate_products(job)
+        else:
+            delete_in_chunks(job, queryset)
+
+        job.status = 'completed'
+        job.progress = 100
+        job.duration = time.time() - start_time
+        job.save()
+        bump_catalog_version()
+
+    except Exception as e:
+        if job:
+            job.status = 'failed'
+            job.error_message = str(e)
+            job.duration = time.time() - start_time
+            job.save()
+            # Chunks committed before the failure changed the catalog too
+            bump_catalog_version()
+        print(f"Fatal error in delete_products: {str(e)}")
+        raise e
+
+
+def save_bulk_counts(job, applier, processed):
+    job.processed_items = processed
+    job.progress = min(99, processed * 100 // job.total_items) if job.total_items else 0
+    for name, count in applier.counts.items():
+        setattr(job, name, count)
+    job.save()
+
+
+@shared_task
+def apply_bulk_job(job_id):
+    """
+    Apply the spooled items of a ProductBulkJob, writing one result line per item
+    Counters are saved after every batch so the status endpoint can report progress
+    """
+    job = None
+    start_time = time.time()
+
+    try:
+        job = ProductBulkJob.objects.get(id=job_id)  # type: ignore[reportAttributeAccessIssue]
+        if job.status == 'completed':
+            return
+        job.status = 'processing'
+        job.save()
+
+        applier = BulkApplier()
+        processed = 0
+        with open(items_path(job_id), 'r', encoding='utf-8') as items, \
+                open(results_path(job_id), 'w', encoding='utf-8') as results:
+            for result in applier.apply(line for line in items if line.strip()):
+                results.write(json.dumps(result) + '\n')
+                processed += 1
+                if processed % applier.batch_size == 0:
+                    results.flush()
+                    save_bulk_counts(job, applier, processed)
+
+        save_bulk_counts(job, applier, processed)
+        job.status = 'completed'
+        job.progress = 100
+        job.duration = time.time() - start_time
+        job.save()
+        os.remove(items_path(job_id))
+
+    except Exception as e:
+        if job:
+            job.status = 'failed'
+            job.error_message = str(e)
+            job.duration = time.time() - start_time
+            job.save()
+        print(f"Fatal error in apply_bulk_job: {str(e)}")
+        raise e
@@ -1,3 +1,541 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from file_processor import validation
+from file_processor.importers import OrmUpsertWriter
+from product_importer import redis_client
+from webhooks import subscriptions
+from webhooks.models import Webhook, WebhookEvent
+from .cache import ResponseCache, increment_catalog_version
+from . import bulk
+from .models import Product, ProductBulkJob, ProductDeleteJob, ProductStats
+from .serializers import ProductSerializer, ProductValuesSerializer
+from .search import FTS_TABLE, ContainsSearchBackend
+from .stats import get_stats, rebuild_stats
+from .tasks import apply_bulk_job, delete_products
 
-# Create your tests here.
+
+@override_settings(CELERY_BROKER_URL='memory://')
+class ProductTestCase(TestCase):
+    """
+    Products written through the model and the import writers, without Redis
+    """
+
+    def setUp(self):
+        # A client or subscription index left by an earlier test would outlive its settings and rows
+        redis_client._client = None
+        subscriptions._index.invalidate()
+
+    def create(self, sku, name='Product', price='1.00', **fields):
+        return Product.objects.create(sku=sku, name=name, price=Decimal(price), **fields)  # type: ignore[reportAttributeAccessIssue]
+
+    def import_rows(self, rows):
+        """
+        Write (sku, name, price) rows with the import's ORM writer
+        """
+        return OrmUpsertWriter().write([
+            {'sku': sku, 'name': name, 'description': '', 'price': Decimal(price), 'active': True}
+            for sku, name, price in rows
+        ])
+
+    def indexed_ids(self):
+        """
+        Product ids in the SQLite full-text index
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT rowid FROM {FTS_TABLE}")
+            return {row[0] for row in cursor.fetchall()}
+
+    def get_results(self, **params):
+        response = self.client.get('/api/products/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']  # type: ignore[reportAttributeAccessIssue]
+
+
+class SearchTests(ProductTestCase):
+    def search(self, query):
+        return [row['sku'] for row in self.get_results(search=query)]
+
+    def test_sku_matches_rank_above_name_matches(self):
+        self.create('LAMP-1', 'Desk')
+        self.create('DESK-2', 'Lamp')
+
+        self.assertEqual(self.search('lamp'), ['LAMP-1', 'DESK-2'])
+        self.assertEqual(self.search('desk'), ['DESK-2', 'LAMP-1'])
+
+    def test_every_word_must_match_as_a_prefix(self):
+        self.create('A1', 'Walnut desk lamp')
+        self.create('A2', 'Walnut chair')
+
+        self.assertEqual(self.search('wal lam'), ['A1'])
+        self.assertEqual(self.search('oak'), [])
+
+    def test_index_follows_save_and_delete(self):
+        product = self.create('A1', 'Walnut')
+        self.assertEqual(self.search('walnut'), ['A1'])
+
+        product.name = 'Maple'
+        product.save()
+        self.assertEqual(self.search('walnut'), [])
+        self.assertEqual(self.search('maple'), ['A1'])
+
+        product.delete()
+        self.assertEqual(self.search('maple'), [])
+        self.assertEqual(self.indexed_ids(), set())
+
+    def test_index_follows_import_batches(self):
+        # The batch spans several bound-parameter chunks
+        with mock.patch('products.search.SQLITE_CHUNK_SIZE', 250):
+            self.import_rows([(f'SKU-{i:04d}', f'Item {i}', '1.00') for i in range(600)])
+        self.assertEqual(self.search('sku 0599'), ['SKU-0599'])
+
+        self.import_rows([('SKU-0599', 'Renamed', '1.00')])
+        self.assertEqual(self.search('renamed'), ['SKU-0599'])
+        self.assertEqual(self.search('item 599'), [])
+        self.assertEqual(self.indexed_ids(), set(Product.objects.values_list('id', flat=True)))  # type: ignore[reportAttributeAccessIssue]
+
+    def test_index_follows_bulk_delete(self):
+        self.import_rows([('KEEP-1', 'Walnut', '1.00'), ('DROP-1', 'Walnut', '1.00'), ('DROP-2', 'Walnut', '1.00')])
+        job = ProductDeleteJob.objects.create(filters={'sku': 'DROP'})  # type: ignore[reportAttributeAccessIssue]
+
+        delete_products(job.id)
+
+        self.assertEqual(self.search('walnut'), ['KEEP-1'])
+        self.assertEqual(self.indexed_ids(), set(Product.objects.values_list('id', flat=True)))  # type: ignore[reportAttributeAccessIssue]
+
+    def test_contains_fallback_without_the_index(self):
+        self.create('A1', 'Walnut desk', description='Solid wood')
+        self.create('A2', 'Walnut chair')
+
+        with mock.patch('products.search.has_fts_table', return_value=False):
+            self.assertEqual(self.search('walnut wood'), ['A1'])
+            self.assertEqual(self.search('a2'), ['A2'])
+
+        rows = ContainsSearchBackend().search(Product.objects.all(), 'walnut')  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual(sorted(row.sku for row in rows), ['A1', 'A2'])
+        self.assertEqual({row.search_rank for row in rows}, {0.0})
+
+
+class KeysetPaginationTests(ProductTestCase):
+    ORDERINGS = ['sku', '-sku', 'name', '-name', 'price', '-price', 'created_at', '-created_at']
+
+    def setUp(self):
+        super().setUp()
+        # Few distinct names, prices and timestamps, so most keys tie and id decides
+        now = timezone.now()
+        Product.objects.bulk_create([  # type: ignore[reportAttributeAccessIssue]
+            Product(sku=f'SKU-{i:03d}', name=f'Name {i % 4}', price=Decimal(i % 3), created_at=now)
+            for i in range(47)
+        ])
+        for i, product in enumerate(Product.objects.order_by('id')):  # type: ignore[reportAttributeAccessIssue]
+            Product.objects.filter(id=product.id).update(created_at=now - timedelta(minutes=i % 5))  # type: ignore[reportAttributeAccessIssue]
+
+    def expected(self, ordering):
+        tie_breaker = '-id' if ordering.startswith('-') else 'id'
+        return list(Product.objects.order_by(ordering, tie_breaker).values_list('sku', flat=True))  # type: ignore[reportAttributeAccessIssue]
+
+    def page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()  # type: ignore[reportAttributeAccessIssue]
+        return [row['sku'] for row in data['results']], data['next'], data['previous']
+
+    def test_next_and_previous_cursors_walk_every_ordering(self):
+        for ordering in self.ORDERINGS:
+            with self.subTest(ordering=ordering):
+                skus, next_url, previous_url = self.page(f'/api/products/?pagination=cursor&ordering={ordering}')
+                self.assertIsNone(previous_url)
+                pages = [skus]
+                while next_url:
+                    skus, next_url, previous_url = self.page(next_url)
+                    pages.append(skus)
+                self.assertEqual([sku for page in pages for sku in page], self.expected(ordering))
+                self.assertEqual([len(page) for page in pages], [20, 20, 7])
+
+                # Back from the last page through the previous cursors
+                back = [pages[-1]]
+                while previous_url:
+                    skus, _, previous_url = self.page(previous_url)
+                    back.insert(0, skus)
+                self.assertEqual(back, pages)
+
+    def test_default_ordering_is_newest_first(self):
+        skus = [row['sku'] for row in self.get_results(pagination='cursor')]
+        self.assertEqual(skus, self.expected('-created_at')[:20])
+
+    def test_invalid_cursor_is_not_found(self):
+        for cursor in ('not-base64!', 'eyJwb3NpdGlvbiI6IFsxXX0='):
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/products/', {'cursor': cursor, 'ordering': 'price'})
+                self.assertEqual(response.status_code, 404)
+
+
+class ResponseCacheTests(ProductTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create('A1', 'Walnut')
+        self.cache = ResponseCache(100, 1024 * 1024)
+        patches = [
+            mock.patch('products.cache.response_cache', self.cache),
+            mock.patch('products.cache.get_catalog_version', return_value=1),
+        ]
+        self.version = patches[1].start()
+        patches[0].start()
+        for patch in patches:
+            self.addCleanup(patch.stop)
+
+    def test_matching_if_none_match_is_not_modified(self):
+        first = self.client.get('/api/products/')
+        self.assertEqual((first.status_code, first['X-Cache']), (200, 'MISS'))
+
+        second = self.client.get('/api/products/')
+        self.assertEqual((second['X-Cache'], second['ETag']), ('HIT', first['ETag']))
+        self.assertEqual(second.content, first.content)
+
+        conditional = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(conditional.status_code, 304)
+        self.assertEqual(self.cache.stats()['not_modified'], 1)
+
+    def test_query_string_order_does_not_split_entries(self):
+        self.client.get('/api/products/?ordering=sku&sku=a')
+        response = self.client.get('/api/products/?sku=a&ordering=sku')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_catalog_version_bump_invalidates(self):
+        etag = self.client.get('/api/products/')['ETag']
+
+        # Writes move the catalog version on once they commit
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.create('A2', 'Maple')
+        self.assertIn(increment_catalog_version, callbacks)
+
+        self.version.return_value = 2
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response['X-Cache']), (200, 'MISS'))
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['results']), 2)  # type: ignore[reportAttributeAccessIssue]
+
+    def test_without_a_catalog_version_nothing_is_cached(self):
+        self.version.return_value = None
+        response = self.client.get('/api/products/')
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_lru_evicts_by_entry_count(self):
+        cache = ResponseCache(2, 1000)
+        cache.set('a', b'1', 'application/json')
+        cache.set('b', b'2', 'application/json')
+        cache.get('a')
+        cache.set('c', b'3', 'application/json')
+
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_lru_evicts_by_bytes(self):
+        cache = ResponseCache(100, 10)
+        cache.set('a', b'xxxx', 'application/json')
+        cache.set('b', b'xxxx', 'application/json')
+        cache.set('c', b'xxxx', 'application/json')
+        # Larger than the whole cache, so never stored
+        cache.set('d', b'x' * 11, 'application/json')
+
+        self.assertEqual([key for key in ('a', 'b', 'c', 'd') if cache.get(key)], ['b', 'c'])
+        self.assertEqual(cache.stats()['bytes'], 8)
+
+
+class ExportTests(ProductTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create('A1', 'Walnut, "large"', price='12.50', description='Line one\nline two')
+        self.create('A2', 'Maple', price='3.00', active=False)
+        self.create('B1', 'Oak', price='7.25')
+
+    def export(self, **params):
+        response = self.client.get('/api/products/export/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)  # type: ignore[reportAttributeAccessIssue]
+
+    def test_csv_uses_the_import_layout(self):
+        response, body = self.export()
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('filename="products.csv"', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        self.assertEqual(list(rows[0]), ['sku', 'name', 'description', 'price'])
+        self.assertEqual(
+            [(row['sku'], row['name'], row['description'], row['price']) for row in rows],
+            [('A1', 'Walnut, "large"', 'Line one\nline two', '12.50'), ('A2', 'Maple', '', '3.00'), ('B1', 'Oak', '', '7.25')],
+        )
+
+    def test_jsonl_matches_the_product_serializer(self):
+        _, body = self.export(format='jsonl')
+
+        records = [json.loads(line) for line in body.decode().splitlines()]
+        expected = [
+            json.loads(JSONRenderer().render(ProductSerializer(product).data))
+            for product in Product.objects.order_by('pk')  # type: ignore[reportAttributeAccessIssue]
+        ]
+        self.assertEqual(records, expected)
+
+    def test_gzip_holds_the_same_export(self):
+        _, plain = self.export(format='jsonl')
+        # Small flushes, so the compressor is fed several chunks
+        with mock.patch('products.export.FLUSH_BYTES', 10):
+            response, compressed = self.export(format='jsonl', compress='gzip')
+
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('filename="products.jsonl.gz"', response['Content-Disposition'])
+        self.assertEqual(gzip.decompress(compressed), plain)
+
+    def test_list_filters_and_search_apply(self):
+        _, body = self.export(sku='a', active='true')
+        self.assertEqual([row['sku'] for row in csv.DictReader(io.StringIO(body.decode()))], ['A1'])
+
+        _, body = self.export(search='maple', format='jsonl')
+        self.assertEqual([json.loads(line)['sku'] for line in body.decode().splitlines()], ['A2'])
+
+    def test_unsupported_format_is_rejected(self):
+        response = self.client.get('/api/products/export/', {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(PRODUCT_DELETE_CHUNK_SIZE=2)
+class BulkDeleteTests(ProductTestCase):
+    def setUp(self):
+        super().setUp()
+        self.import_rows([('KEEP-1', 'Walnut', '5.00'), ('DROP-1', 'Maple', '1.00'), ('DROP-2', 'Maple', '2.00'),
+                          ('DROP-3', 'Maple', '3.00'), ('DROP-4', 'Maple', '4.00')])
+
+    def start(self, **body):
+        with mock.patch.object(delete_products, 'delay', side_effect=lambda *args: delete_products(*args)):
+            response = self.client.post('/api/products/bulk-delete/', dict(body, confirm=True), content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        return ProductDeleteJob.objects.get(id=response.json()['job']['id'])  # type: ignore[reportAttributeAccessIssue]
+
+    def test_unfiltered_delete_truncates(self):
+        job = self.start()
+
+        self.assertEqual((job.status, job.method, job.deleted_rows, job.progress), ('completed', 'truncate', 5, 100))
+        self.assertFalse(Product.objects.exists())  # type: ignore[reportAttributeAccessIssue]
+        self.assertFalse(ProductStats.objects.exists())  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual(self.indexed_ids(), set())
+
+    def test_filtered_delete_runs_in_chunks(self):
+        job = self.start(sku='drop')
+
+        self.assertEqual((job.status, job.method, job.total_rows, job.deleted_rows), ('completed', 'chunked', 4, 4))
+        self.assertEqual(list(Product.objects.values_list('sku', flat=True)), ['KEEP-1'])  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual((get_stats()['total'], get_stats()['price']['avg']), (1, '5.00'))
+
+    def test_delete_events_force_the_chunked_path(self):
+        Webhook.objects.create(url='http://hooks.example/deleted', event_type='product_deleted')  # type: ignore[reportAttributeAccessIssue]
+        subscriptions._index.invalidate()
+
+        job = self.start()
+
+        self.assertEqual((job.method, job.deleted_rows), ('chunked', 5))
+        deleted = [product['sku'] for event in WebhookEvent.objects.all() for product in event.payload['products']]  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual(sorted(deleted), ['DROP-1', 'DROP-2', 'DROP-3', 'DROP-4', 'KEEP-1'])
+
+    def test_invalid_requests_are_rejected(self):
+        cases = [
+            {'sku': 'drop'},
+            {'confirm': True, 'active': 'maybe'},
+        ]
+        for body in cases:
+            with self.subTest(body=body):
+                response = self.client.post('/api/products/bulk-delete/', body, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(ProductDeleteJob.objects.exists())  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual(Product.objects.count(), 5)  # type: ignore[reportAttributeAccessIssue]
+
+
+class BulkApiTests(ProductTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = self.settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.create('B1', 'Beta', price='2.00')
+        self.create('C1', 'Gamma', price='3.00')
+
+    def post(self, body, content_type='application/json', query=''):
+        with mock.patch.object(apply_bulk_job, 'delay', side_effect=lambda *args: apply_bulk_job(*args)):
+            return self.client.post(f'/api/products/bulk/{query}', body, content_type=content_type)
+
+    def test_items_are_applied_in_order_with_per_item_results(self):
+        response = self.post([
+            {'sku': 'a1', 'name': 'Alpha', 'price': 1.5},
+            {'sku': 'b1', 'name': 'Beta', 'price': '2'},
+            {'sku': 'c1', 'op': 'patch', 'price': '9.99'},
+            {'sku': 'd1', 'op': 'update', 'name': 'Delta', 'price': '1'},
+            {'sku': 'b1', 'op': 'create', 'name': 'Beta', 'price': '1'},
+            {'sku': 'e1', 'name': 'Epsilon', 'price': 'abc'},
+            42,
+            {'sku': 'f1', 'op': 'explode'},
+            {'sku': 'c1', 'op': 'deactivate'},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual(data['counts'], {'created': 1, 'updated': 2, 'unchanged': 1, 'failed': 5})
+        self.assertEqual(
+            [(result['index'], result['status'], result.get('error')) for result in data['results']],
+            [
+                (0, 'created', None), (1, 'unchanged', None), (2, 'updated', None),
+                (3, 'failed', bulk.NOT_FOUND), (4, 'failed', bulk.ALREADY_EXISTS),
+                (5, 'failed', validation.INVALID_PRICE), (6, 'failed', bulk.INVALID_ITEM),
+                (7, 'failed', bulk.UNKNOWN_OP), (8, 'updated', None),
+            ],
+        )
+        gamma = Product.objects.get(sku='C1')  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual((gamma.name, gamma.price, gamma.active), ('Gamma', Decimal('9.99'), False))
+        self.assertEqual(Product.objects.get(sku='A1').price, Decimal('1.50'))  # type: ignore[reportAttributeAccessIssue]
+        self.assertFalse(Product.objects.filter(sku__in=['D1', 'E1', 'F1']).exists())  # type: ignore[reportAttributeAccessIssue]
+
+    def test_ndjson_body(self):
+        body = '{"sku": "a1", "name": "Alpha", "price": "1"}\n\n{not json}\n{"sku": "b1", "op": "patch", "name": "Bravo"}\n'
+        response = self.post(body, content_type='application/x-ndjson')
+
+        data = response.json()  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual([result['status'] for result in data['results']], ['created', 'failed', 'updated'])
+        self.assertEqual(data['results'][1]['error'], bulk.INVALID_JSON)
+        self.assertEqual(Product.objects.get(sku='B1').name, 'Bravo')  # type: ignore[reportAttributeAccessIssue]
+
+    def test_body_must_be_a_list(self):
+        response = self.post({'sku': 'a1'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_async_job_writes_a_results_file(self):
+        response = self.post(
+            [{'sku': f'n{i}', 'name': f'New {i}', 'price': '1'} for i in range(3)] + [{'sku': 'b1', 'op': 'deactivate'}],
+            query='?async=true',
+        )
+
+        self.assertEqual(response.status_code, 202)
+        job = ProductBulkJob.objects.get(id=response.json()['job']['id'])  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual((job.status, job.total_items, job.processed_items), ('completed', 4, 4))
+        self.assertEqual((job.created, job.updated, job.unchanged, job.failed), (3, 1, 0, 0))
+
+        status_response = self.client.get(f'/api/products/bulk/{job.id}/')
+        self.assertEqual(status_response.json()['progress'], 100)  # type: ignore[reportAttributeAccessIssue]
+        results = self.client.get(f'/api/products/bulk/{job.id}/results/')
+        lines = [json.loads(line) for line in b''.join(results.streaming_content).splitlines()]  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual([(line['index'], line['status']) for line in lines], [(0, 'created'), (1, 'created'), (2, 'created'), (3, 'updated')])
+
+    @override_settings(PRODUCT_BULK_SYNC_ITEMS=2)
+    def test_large_bodies_become_a_job(self):
+        response = self.post([{'sku': f'n{i}', 'name': 'New', 'price': '1'} for i in range(3)])
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Product.objects.filter(sku__startswith='N').count(), 3)  # type: ignore[reportAttributeAccessIssue]
+
+
+class ValuesSerializerTests(ProductTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create('A1', 'Walnut', price='12.50', description='Solid wood')
+        self.create('A2', 'Maple', price='0.05', description=None, active=False)
+
+    def model_output(self):
+        return [ProductSerializer(product).data for product in Product.objects.order_by('pk')]  # type: ignore[reportAttributeAccessIssue]
+
+    def values_output(self):
+        serializer = ProductValuesSerializer()
+        return serializer.many(serializer.values(Product.objects.order_by('pk')))  # type: ignore[reportAttributeAccessIssue]
+
+    def test_same_output_as_the_model_serializer(self):
+        self.assertEqual(self.values_output(), self.model_output())
+
+    @override_settings(TIME_ZONE='Europe/Paris')
+    def test_same_output_in_another_timezone(self):
+        self.assertEqual(self.values_output(), self.model_output())
+
+    def test_api_responses_match_the_model_serializer(self):
+        rendered = [json.loads(JSONRenderer().render(data)) for data in self.model_output()]
+
+        self.assertEqual(self.get_results(ordering='sku'), rendered)
+        detail = self.client.get(f"/api/products/{rendered[1]['id']}/")
+        self.assertEqual(detail.json(), rendered[1])  # type: ignore[reportAttributeAccessIssue]
+
+    def test_search_rank_is_not_rendered(self):
+        [row] = self.get_results(search='walnut')
+        self.assertNotIn('search_rank', row)
+        self.assertEqual(set(row), set(ProductSerializer().fields))
+
+
+class StatsTests(ProductTestCase):
+    def summary(self):
+        return sorted(
+            ProductStats.objects.filter(product_count__gt=0).values_list('bucket', 'active', 'product_count', 'price_total')  # type: ignore[reportAttributeAccessIssue]
+        )
+
+    def assertSummaryCurrent(self):
+        """
+        The incrementally maintained summary equals one rebuilt from the products table
+        """
+        kept = self.summary()
+        rebuild_stats()
+        self.assertEqual(kept, self.summary())
+
+    def test_import_batches_move_products_between_buckets(self):
+        self.import_rows([('A1', 'Alpha', '0.50'), ('A2', 'Beta', '3.00'), ('A3', 'Gamma', '150.00')])
+        self.import_rows([('A1', 'Alpha', '7.00'), ('A2', 'Beta', '3.00'), ('A4', 'Delta', '1.00')])
+        OrmUpsertWriter().write([{'sku': 'A3', 'name': 'Gamma', 'description': '', 'price': Decimal('150.00'), 'active': False}])
+
+        self.assertSummaryCurrent()
+        stats = self.client.get('/api/products/stats/').json()  # type: ignore[reportAttributeAccessIssue]
+        self.assertEqual((stats['total'], stats['active'], stats['inactive']), (4, 3, 1))
+        self.assertEqual(stats['price'], {'min': '1.00', 'max': '150.00', 'avg': '40.25'})
+        self.assertEqual(
+            [(bucket['min'], bucket['max'], bucket['count'], bucket['active']) for bucket in stats['histogram']],
+            [(1, 2, 1, 1), (2, 5, 1, 1), (5, 10, 1, 1), (100, 200, 1, 0)],
+        )
+
+    def test_model_writes_and_deletes(self):
+        product = self.create('A1', price='3.00')
+        self.create('A2', price='20.00')
+        product.price = Decimal('60.00')
+        product.active = False
+        product.save()
+        self.assertSummaryCurrent()
+
+        product.delete()
+        self.assertSummaryCurrent()
+        self.assertEqual(get_stats()['total'], 1)
+
+    @override_settings(PRODUCT_DELETE_CHUNK_SIZE=1)
+    def test_bulk_delete(self):
+        self.import_rows([('KEEP-1', 'Walnut', '5.00'), ('DROP-1', 'Maple', '1.00'), ('DROP-2', 'Maple', '250.00')])
+        job = ProductDeleteJob.objects.create(filters={'sku': 'drop'})  # type: ignore[reportAttributeAccessIssue]
+
+        delete_products(job.id)
+
+        self.assertSummaryCurrent()
+        self.assertEqual(get_stats()['price'], {'min': '5.00', 'max': '5.00', 'avg': '5.00'})
+
+    def test_rebuild_repairs_drift(self):
+        self.import_rows([('A1', 'Alpha', '0.50'), ('A2', 'Beta', '3.00')])
+        expected = self.summary()
+        ProductStats.objects.update(product_count=0, price_total=0)  # type: ignore[reportAttributeAccessIssue]
+        Product.objects.filter(sku='A1').update(active=False)  # type: ignore[reportAttributeAccessIssue]
+
+        call_command('rebuild_product_stats', stdout=io.StringIO())
+
+        self.assertEqual(self.summary(), [(0, False, 1, Decimal('0.50'))] + expected[1:])
@@ -1,8 +1,15 @@
 from django.urls import path
-from .views import ProductListCreateView, ProductDetailView, bulk_delete_products
+from .views import ProductListCreateView, ProductDetailView, bulk_delete_products, bulk_delete_status, product_stats, product_cache_stats, export_products, bulk_products, bulk_job_status, bulk_job_results
 
 urlpatterns = [
     path('', ProductListCreateView.as_view(), name='product-list-create'),
     path('<int:pk>/', ProductDetailView.as_view(), name='product-detail'),
     path('bulk-delete/', bulk_delete_products, name='product-bulk-delete'),
-]
\ No newline at end of file
+    path('bulk-delete/<int:job_id>/', bulk_delete_status, name='product-bulk-delete-status'),
+    path('bulk/', bulk_products, name='product-bulk'),
+    path('bulk/<int:job_id>/', bulk_job_status, name='product-bulk-status'),
+    path('bulk/<int:job_id>/results/', bulk_job_results, name='product-bulk-results'),
+    path('export/', export_products, name='product-export'),
+    path('stats/', product_stats, name='product-stats'),
+    path('cache-stats/', product_cache_stats, name='product-cache-stats'),
+]
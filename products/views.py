@@ -1,14 +1,25 @@
-from django.shortcuts import render
+import os
+import json
+from itertools import chain, islice
+from django.shortcuts import render, get_object_or_404
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
+from rest_framework.reverse import reverse
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
-from .models import Product
-from .serializers import ProductSerializer
-from .filters import ProductFilter
+from .models import Product, ProductDeleteJob, ProductBulkJob
+from .serializers import ProductSerializer, ProductValuesSerializer, ProductDeleteJobSerializer, ProductBulkJobSerializer
+from .tasks import delete_products, apply_bulk_job
+from .bulk import BulkApplier, get_sync_limit, job_dir, items_path, results_path
+from .filters import ProductFilter, ProductSearchFilter, ProductOrderingFilter
+from .search import get_search_backend
+from .cache import CatalogCacheMixin, get_catalog_version, response_cache
+from .pagination import ProductPagination
+from .export import EXPORT_FORMATS, export_stream
+from .stats import get_stats
 
 def product_list_view(request):
     """
@@ -17,33 +28,191 @@ def product_list_view(request):
     return render(request, 'products/list.html')
 
 @method_decorator(csrf_exempt, name='dispatch')
-class ProductListCreateView(generics.ListCreateAPIView):
+class ProductListCreateView(CatalogCacheMixin, generics.ListCreateAPIView):
     queryset = Product.objects.all() # type: ignore[reportAttributeAccessIssue]
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, ProductOrderingFilter]
     filterset_class = ProductFilter
-    search_fields = ['sku', 'name', 'description']
     ordering_fields = ['sku', 'name', 'price', 'created_at']
     ordering = ['-created_at']
+    pagination_class = ProductPagination
+
+    def list(self, request, *args, **kwargs):
+        # Read path renders .values() rows; writes still go through ProductSerializer
+        serializer = ProductValuesSerializer()
+        queryset = serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.many(page))
+        return Response(serializer.many(queryset))
 
 @method_decorator(csrf_exempt, name='dispatch')
-class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProductDetailView(CatalogCacheMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all() # type: ignore[reportAttributeAccessIssue]
     serializer_class = ProductSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        serializer = ProductValuesSerializer()
+        row = get_object_or_404(serializer.values(self.get_queryset()), pk=kwargs['pk'])
+        return Response(serializer.to_representation(row))
+
 @api_view(['POST'])
 def bulk_delete_products(request):
     """
-    Delete all products with confirmation
+    Start a background delete of all products, or of those matching ProductFilter parameters,
+    with confirmation
     """
-    if request.data.get('confirm') == True:
-        count = Product.objects.count() # type: ignore[reportAttributeAccessIssue]
-        Product.objects.all().delete() # type: ignore[reportUnknownMemberType]
+    if request.data.get('confirm') != True:
         return Response({
-            'message': f'Successfully deleted {count} products',
-            'deleted_count': count
-        }, status=status.HTTP_200_OK)
-    else:
-        return Response({
-            'error': 'Confirmation required to delete all products'
-        }, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            'error': 'Confirmation required to delete products'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    filters = {name: request.data[name] for name in ProductFilter.base_filters if request.data.get(name) not in (None, '')}
+    filterset = ProductFilter(filters, queryset=Product.objects.none()) # type: ignore[reportAttributeAccessIssue]
+    if not filterset.is_valid():
+        return Response({'error': filterset.errors}, status=status.HTTP_400_BAD_REQUEST)
+    # Filters ignore values they cannot parse, which here would widen the delete to every product
+    ignored = [name for name in filters if filterset.form.cleaned_data.get(name) in (None, '')]
+    if ignored:
+        return Response({'error': {name: ['Invalid value'] for name in ignored}}, status=status.HTTP_400_BAD_REQUEST)
+    
+    job = ProductDeleteJob.objects.create(filters=filters) # type: ignore[reportAttributeAccessIssue]
+    delete_products.delay(job.id) # pyright: ignore[reportFunctionMemberAccess]
+    job.refresh_from_db()
+    return Response({
+        'message': 'Deleting products in the background',
+        'job': ProductDeleteJobSerializer(job).data
+    }, status=status.HTTP_202_ACCEPTED)
+
+@api_view(['GET'])
+def bulk_delete_status(request, job_id):
+    """
+    Get the status of a bulk delete job
+    """
+    try:
+        job = ProductDeleteJob.objects.get(id=job_id) # type: ignore[reportAttributeAccessIssue]
+        return Response(ProductDeleteJobSerializer(job).data)
+    except ProductDeleteJob.DoesNotExist: # type: ignore[reportAttributeAccessIssue]
+        return Response({'error': 'Delete job not found'}, status=status.HTTP_404_NOT_FOUND)
+
+@api_view(['GET'])
+def product_stats(request):
+    """
+    Catalog totals, active counts, price range and price histogram from the stats summary
+    """
+    return Response(get_stats())
+
+@api_view(['GET'])
+def product_cache_stats(request):
+    """
+    Hit/miss counters of this worker process's product response cache
+    """
+    return Response(dict(response_cache.stats(), catalog_version=get_catalog_version()))
+
+def export_products(request):
+    """
+    Stream the products matching the list filters as CSV (importer layout) or JSONL
+    ?format=csv|jsonl, ?compress=gzip for a .gz download compressed on the fly
+    Plain Django view so DRF does not treat ?format= as a renderer override
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': f"Unsupported format, use one of: {', '.join(EXPORT_FORMATS)}"}, status=400)
+    compress = request.GET.get('compress') == 'gzip'
+    
+    filterset = ProductFilter(request.GET, queryset=Product.objects.all()) # type: ignore[reportAttributeAccessIssue]
+    if not filterset.is_valid():
+        return JsonResponse({'error': filterset.errors}, status=400)
+    queryset = filterset.qs
+    query = request.GET.get('search', '').strip()
+    if query:
+        queryset = get_search_backend().search(queryset, query)
+    
+    _, content_type = EXPORT_FORMATS[export_format]
+    file_name = f'products.{export_format}'
+    if compress:
+        content_type = 'application/gzip'
+        file_name += '.gz'
+    response = StreamingHttpResponse(export_stream(queryset, export_format, compress), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+def bulk_items(request):
+    """
+    Items of a bulk request: a JSON array, or one JSON object per line for NDJSON bodies
+    NDJSON is read from the request stream line by line instead of being parsed as a whole
+    """
+    if request.content_type.split(';')[0].strip() == NDJSON_CONTENT_TYPE:
+        if request.stream is None:
+            return iter(())
+        return (line.decode('utf-8', errors='replace') for line in request.stream if line.strip())
+    if not isinstance(request.data, list):
+        raise ValueError('Expected a JSON array of products or an NDJSON body')
+    return iter(request.data)
+
+@api_view(['POST'])
+@csrf_exempt
+def bulk_products(request):
+    """
+    Create, update, patch or deactivate many products keyed by SKU
+    Up to PRODUCT_BULK_SYNC_ITEMS items are applied within the request and every result is returned;
+    larger bodies, or ?async=true, are spooled to a background job
+    """
+    try:
+        items = bulk_items(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    limit = get_sync_limit()
+    head = list(islice(items, limit + 1))
+    if len(head) <= limit and request.query_params.get('async') not in ('1', 'true'):
+        applier = BulkApplier()
+        results = list(applier.apply(head))
+        return Response({'counts': applier.counts, 'results': results})
+    
+    job = ProductBulkJob.objects.create() # type: ignore[reportAttributeAccessIssue]
+    os.makedirs(job_dir(job.id), exist_ok=True)
+    total = 0
+    with open(items_path(job.id), 'w', encoding='utf-8') as spool:
+        for item in chain(head, items):
+            spool.write((item.strip() if isinstance(item, str) else json.dumps(item)) + '\n')
+            total += 1
+    job.total_items = total
+    job.save()
+    
+    apply_bulk_job.delay(job.id) # pyright: ignore[reportFunctionMemberAccess]
+    job.refresh_from_db()
+    return Response({
+        'job': ProductBulkJobSerializer(job).data,
+        'status_url': reverse('product-bulk-status', args=[job.id], request=request),
+        'results_url': reverse('product-bulk-results', args=[job.id], request=request),
+    }, status=status.HTTP_202_ACCEPTED)
+
+@api_view(['GET'])
+def bulk_job_status(request, job_id):
+    """
+    Get the status and counts of a bulk job
+    """
+    try:
+        job = ProductBulkJob.objects.get(id=job_id) # type: ignore[reportAttributeAccessIssue]
+        return Response(ProductBulkJobSerializer(job).data)
+    except ProductBulkJob.DoesNotExist: # type: ignore[reportAttributeAccessIssue]
+        return Response({'error': 'Bulk job not found'}, status=status.HTTP_404_NOT_FOUND)
+
+@api_view(['GET'])
+def bulk_job_results(request, job_id):
+    """
+    Download the per-item results of a bulk job as NDJSON, as far as the job has got
+    """
+    path = results_path(job_id)
+    if not ProductBulkJob.objects.filter(id=job_id).exists() or not os.path.exists(path): # type: ignore[reportAttributeAccessIssue]
+        return Response({'error': 'Bulk job results not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    response = StreamingHttpResponse(open(path, 'rb'), content_type=NDJSON_CONTENT_TYPE)
+    response['Content-Disposition'] = f'attachment; filename="bulk-{job_id}-results.ndjson"'
+    return response
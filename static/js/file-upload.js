@@ -6,6 +6,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const processedRows = document.getElementById('processedRows');
     const totalRows = document.getElementById('totalRows');
     const errorMessage = document.getElementById('errorMessage');
+    const rejectsMessage = document.getElementById('rejectsMessage');
     const uploadDuration = document.getElementById('uploadDuration');
 
     // Variables for tracking progress
@@ -14,8 +15,6 @@ document.addEventListener('DOMContentLoaded', function() {
     let progressInterval = null;
     let startTime = null;
     let timerInterval = null;
-    let fakeProgressInterval = null;
-    let fakeProgressActive = false;
 
     if (uploadForm) {
         uploadForm.addEventListener('submit', function(e) {
@@ -23,6 +22,7 @@ document.addEventListener('DOMContentLoaded', function() {
             
             const fileInput = document.getElementById('csvFile');
             const file = fileInput.files[0];
+            const mode = document.getElementById('syncMode').checked ? 'sync' : 'upsert';
             
             if (!file) {
                 alert('Please select a file');
@@ -32,7 +32,6 @@ document.addEventListener('DOMContentLoaded', function() {
             // Reset progress tracking
             currentProgress = 0;
             targetProgress = 0;
-            fakeProgressActive = true;
             
             if (progressInterval) {
                 clearInterval(progressInterval);
@@ -45,54 +44,27 @@ document.addEventListener('DOMContentLoaded', function() {
                 timerInterval = null;
             }
             
-            // Clear any existing fake progress
-            if (fakeProgressInterval) {
-                clearInterval(fakeProgressInterval);
-                fakeProgressInterval = null;
-            }
-            
             startTime = new Date();
             startTimer();
-            startFakeProgress(); // Start simulating progress for upload phase
 
             // Show progress section
             progressSection.style.display = 'block';
+            rejectsMessage.style.display = 'none';
             renderProgress(0, 0, 0, 'Uploading file...', 0);
 
-            // Create FormData
-            const formData = new FormData();
-            formData.append('file', file);
-
-            // Upload file
-            fetch('/api/file-processor/upload/', {
-                method: 'POST',
-                body: formData
-            })
-            .then(response => {
-                // Check if response is OK
-                if (!response.ok) {
-                    return response.text().then(text => {
-                        throw new Error(`HTTP ${response.status}: ${text}`);
-                    });
-                }
-                return response.json();
-            })
+            // Upload file in resumable chunks
+            uploadInChunks(file, mode)
             .then(data => {
-                // Stop fake progress when real progress starts
-                stopFakeProgress();
-                
                 if (data.error) {
                     stopTimer();
                     showError(data.error);
                     return;
                 }
                 
-                // Start polling for progress
-                pollFileStatus(data.id);
+                // Follow progress as the server pushes it
+                watchFileStatus(data.id);
             })
             .catch(error => {
-                // Stop fake progress on error
-                stopFakeProgress();
                 stopTimer();
                 
                 // Try to parse error as JSON, fallback to text
@@ -105,28 +77,89 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
-    function startFakeProgress() {
-        // Simulate progress from 0% to 70% during upload phase
-        let fakeProgress = 0;
-        fakeProgressActive = true;
-        
-        fakeProgressInterval = setInterval(() => {
-            if (fakeProgressActive && fakeProgress < 70) {
-                fakeProgress += 0.5; // Increment by 0.5% every 100ms
-                renderProgress(fakeProgress, 0, 0, 'Uploading file...', 0);
-            } else if (fakeProgressActive) {
-                // Cap at 70% and wait for real progress
-                renderProgress(70, 0, 0, 'Processing file...', 0);
-            }
-        }, 100);
+    function parseResponse(response) {
+        // Check if response is OK
+        if (!response.ok) {
+            return response.text().then(text => {
+                throw new Error(`HTTP ${response.status}: ${text}`);
+            });
+        }
+        return response.json();
     }
 
-    function stopFakeProgress() {
-        fakeProgressActive = false;
-        if (fakeProgressInterval) {
-            clearInterval(fakeProgressInterval);
-            fakeProgressInterval = null;
+    function sessionKey(file, mode) {
+        // Identify a file across page reloads so an interrupted upload can resume
+        return `upload-session:${mode}:${file.name}:${file.size}:${file.lastModified}`;
+    }
+
+    function getUploadSession(file, mode) {
+        // Reuse an open session for the same file and mode, otherwise start a new one
+        const savedId = localStorage.getItem(sessionKey(file, mode));
+        const createSession = () => fetch('/api/file-processor/uploads/', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ file_name: file.name, file_size: file.size, mode: mode })
+        })
+        .then(parseResponse)
+        .then(session => {
+            localStorage.setItem(sessionKey(file, mode), session.id);
+            return session;
+        });
+
+        if (!savedId) {
+            return createSession();
         }
+        return fetch(`/api/file-processor/uploads/${savedId}/`)
+        .then(response => response.ok ? response.json() : null)
+        .then(session => (session && session.status === 'open') ? session : createSession());
+    }
+
+    function uploadChunk(session, file, index, attempt) {
+        // Send one chunk, retrying with a growing delay if it fails
+        const start = index * session.chunk_size;
+        const blob = file.slice(start, Math.min(start + session.chunk_size, file.size));
+        return fetch(`/api/file-processor/uploads/${session.id}/chunks/${index}/`, {
+            method: 'PUT',
+            headers: { 'Content-Type': 'application/octet-stream' },
+            body: blob
+        })
+        .then(parseResponse)
+        .catch(error => {
+            if (attempt >= 3) {
+                throw error;
+            }
+            return new Promise(resolve => setTimeout(resolve, 1000 * attempt))
+                .then(() => uploadChunk(session, file, index, attempt + 1));
+        });
+    }
+
+    function uploadInChunks(file, mode) {
+        return getUploadSession(file, mode).then(session => {
+            const received = new Set(session.received_chunks);
+            let sentChunks = received.size;
+            let chain = Promise.resolve();
+
+            for (let index = 0; index < session.total_chunks; index++) {
+                if (received.has(index)) {
+                    continue;
+                }
+                chain = chain
+                .then(() => uploadChunk(session, file, index, 1))
+                .then(() => {
+                    sentChunks++;
+                    const percentage = (sentChunks / session.total_chunks) * 100;
+                    renderProgress(percentage, 0, 0, 'Uploading file...', 0);
+                });
+            }
+
+            return chain
+            .then(() => fetch(`/api/file-processor/uploads/${session.id}/complete/`, { method: 'POST' }))
+            .then(parseResponse)
+            .then(data => {
+                localStorage.removeItem(sessionKey(file, mode));
+                return data;
+            });
+        });
     }
 
     function startTimer() {
@@ -148,44 +181,27 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
-    function pollFileStatus(uploadId) {
-        fetch(`/api/file-processor/status/${uploadId}/`)
+    function watchFileStatus(uploadId, etag) {
+        // Long-poll the status: the server answers as soon as the progress changes, or with
+        // 304 after a while; a Retry-After means it could not hold the request, so wait first
+        const headers = etag ? { 'If-None-Match': etag } : {};
+        fetch(`/api/file-processor/status/${uploadId}/?wait=20`, { headers, cache: 'no-store' })
         .then(response => {
-            if (!response.ok) {
+            if (!response.ok && response.status !== 304) {
                 throw new Error(`HTTP ${response.status}: ${response.statusText}`);
             }
-            return response.json();
-        })
-        .then(data => {
-            // Update progress with smooth animation
-            updateProgress(
-                data.progress, 
-                data.processed_rows, 
-                data.total_rows, 
-                data.status,
-                data.upload_duration || 0
-            );
-            
-            if (data.status === 'completed' || data.status === 'failed') {
-                // Stop timer and any ongoing progress animation
-                stopTimer();
-                if (progressInterval) {
-                    clearInterval(progressInterval);
-                    progressInterval = null;
-                }
-                
-                if (data.status === 'failed') {
-                    showError(data.error_message || 'Import failed');
-                } else {
-                    // Ensure we show 100% at completion
-                    renderProgress(100, data.processed_rows, data.total_rows, data.status, data.upload_duration || 0);
-                    statusText.textContent = 'Import Complete';
-                }
+            const nextEtag = response.headers.get('ETag') || etag;
+            const delay = (Number(response.headers.get('Retry-After')) || 0.25) * 1000;
+            const next = () => setTimeout(() => watchFileStatus(uploadId, nextEtag), delay);
+            if (response.status === 304) {
+                next();
                 return;
             }
-            
-            // Continue polling
-            setTimeout(() => pollFileStatus(uploadId), 500);
+            return response.json().then(data => {
+                if (!handleStatus(uploadId, data)) {
+                    next();
+                }
+            });
         })
         .catch(error => {
             // Stop timer and any ongoing progress animation on error
@@ -198,6 +214,38 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    function handleStatus(uploadId, data) {
+        // Render one status update; returns true once the import has finished
+        updateProgress(
+            data.progress, 
+            data.processed_rows, 
+            data.total_rows, 
+            data.status,
+            data.upload_duration || 0
+        );
+        
+        if (data.status !== 'completed' && data.status !== 'failed') {
+            return false;
+        }
+        
+        // Stop timer and any ongoing progress animation
+        stopTimer();
+        if (progressInterval) {
+            clearInterval(progressInterval);
+            progressInterval = null;
+        }
+        
+        if (data.status === 'failed') {
+            showError(data.error_message || 'Import failed');
+        } else {
+            // Ensure we show 100% at completion
+            renderProgress(100, data.processed_rows, data.total_rows, data.status, data.upload_duration || 0);
+            statusText.textContent = 'Import Complete';
+        }
+        showRejects(uploadId, data.rejected_rows, data.deactivated_rows);
+        return true;
+    }
+
     function updateProgress(percentage, processed, total, status, duration) {
         // Set the target progress
         targetProgress = percentage;
@@ -253,6 +301,24 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    function showRejects(uploadId, rejectedRows, deactivatedRows) {
+        // Link to the rows that failed validation, and report products retired by a sync
+        const messages = [];
+        if (rejectedRows) {
+            messages.push(`${rejectedRows.toLocaleString()} rows were rejected. ` +
+                `<a href="/api/file-processor/status/${uploadId}/rejects/">Download rejected rows</a>`);
+        }
+        if (deactivatedRows) {
+            messages.push(`${deactivatedRows.toLocaleString()} products missing from the file were deactivated.`);
+        }
+        if (!messages.length) {
+            rejectsMessage.style.display = 'none';
+            return;
+        }
+        rejectsMessage.innerHTML = messages.join('<br>');
+        rejectsMessage.style.display = 'block';
+    }
+
     function showError(message) {
         // Stop any ongoing progress animation
         if (progressInterval) {
@@ -260,9 +326,6 @@ document.addEventListener('DOMContentLoaded', function() {
             progressInterval = null;
         }
         
-        // Stop fake progress if running
-        stopFakeProgress();
-        
         // Stop timer
         stopTimer();
         
@@ -32,7 +32,8 @@ document.addEventListener('DOMContentLoaded', function() {
         const descriptionFilter = document.getElementById('descriptionFilter').value;
         const activeFilter = document.getElementById('activeFilter').value;
 
-        let url = '/api/products/?format=json';
+        // Cursor pagination keeps deep pages as fast as the first one
+        let url = '/api/products/?format=json&pagination=cursor';
         if (skuFilter) url += `&sku=${encodeURIComponent(skuFilter)}`;
         if (nameFilter) url += `&search=${encodeURIComponent(nameFilter)}`;
         if (descriptionFilter) url += `&description=${encodeURIComponent(descriptionFilter)}`;
@@ -351,12 +352,11 @@ document.addEventListener('DOMContentLoaded', function() {
             })
             .then(response => response.json())
             .then(data => {
-                if (data.message) {
-                    // Close modal and refresh product list
+                if (data.job) {
+                    // Close modal and follow the background delete
                     const modal = bootstrap.Modal.getInstance(document.getElementById('bulkDeleteModal'));
                     modal.hide();
-                    loadProducts();
-                    alert(data.message);
+                    watchDeleteJob(data.job);
                 } else {
                     alert('Error deleting products: ' + JSON.stringify(data));
                 }
@@ -366,4 +366,26 @@ document.addEventListener('DOMContentLoaded', function() {
             });
         }
     }
+
+    function watchDeleteJob(job) {
+        // Poll the delete job until it finishes, then refresh the product list
+        if (job.status === 'completed') {
+            loadProducts();
+            alert(`Successfully deleted ${job.deleted_rows} products`);
+            return;
+        }
+        if (job.status === 'failed') {
+            loadProducts();
+            alert('Error deleting products: ' + (job.error_message || 'Delete failed'));
+            return;
+        }
+        setTimeout(() => {
+            fetch(`/api/products/bulk-delete/${job.id}/`)
+            .then(response => response.json())
+            .then(watchDeleteJob)
+            .catch(error => {
+                alert('Error checking delete status: ' + error.message);
+            });
+        }, 1000);
+    }
 });
\ No newline at end of file
@@ -9,19 +9,25 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     function loadWebhooks() {
-        fetch('/api/webhooks/?format=json')
-        .then(response => response.json())
-        .then(data => {
+        Promise.all([
+            fetch('/api/webhooks/?format=json').then(response => response.json()),
+            // Delivery stats are optional; the list still renders without them
+            fetch('/api/webhooks/stats/').then(response => response.json()).catch(() => ({webhooks: {}}))
+        ])
+        .then(([data, stats]) => {
             const tableBody = document.getElementById('webhooksTableBody');
             tableBody.innerHTML = '';
 
             // Use data.results instead of data directly since it's paginated
             data.results.forEach(webhook => {
+                const webhookStats = stats.webhooks[webhook.id];
                 const row = document.createElement('tr');
                 row.innerHTML = `
                     <td>${webhook.url}</td>
                     <td>${webhook.event_type}</td>
                     <td>${webhook.is_active ? 'Active' : 'Inactive'}</td>
+                    <td>${formatSuccessRate(webhookStats, stats.window_hours)}</td>
+                    <td>${formatLatency(webhookStats)}</td>
                     <td>
                         <button class="btn btn-sm btn-outline-primary edit-btn" data-id="${webhook.id}">Edit</button>
                         <button class="btn btn-sm btn-outline-info test-btn" data-id="${webhook.id}">Test</button>
@@ -55,6 +61,22 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    function formatSuccessRate(webhookStats, windowHours) {
+        if (!webhookStats) {
+            return '<span class="text-muted">No deliveries</span>';
+        }
+        const rate = (webhookStats.success_rate * 100).toFixed(1);
+        return `${rate}% <small class="text-muted">(${webhookStats.succeeded}/${webhookStats.deliveries} in ${windowHours}h)</small>`;
+    }
+
+    function formatLatency(webhookStats) {
+        if (!webhookStats || webhookStats.latency.p50 === undefined) {
+            return '<span class="text-muted">-</span>';
+        }
+        const latency = webhookStats.latency;
+        return `${latency.p50} / ${latency.p95} / ${latency.p99} ms`;
+    }
+
     function saveWebhook() {
         const form = document.getElementById('addWebhookForm');
         const webhookId = form.getAttribute('data-edit-id');
@@ -166,15 +188,35 @@ document.addEventListener('DOMContentLoaded', function() {
             }
             return response.json();
         })
-        .then(data => {
-            if (data.status === 'success') {
+        .then(data => watchTestDelivery(data.status_url, testResult))
+        .catch(error => {
+            testResult.innerHTML = `
+                <div class="alert alert-danger">
+                    <h5>Test Results</h5>
+                    <p><strong>Status:</strong> Error</p>
+                    <p><strong>Error:</strong> ${error.message}</p>
+                </div>
+            `;
+        });
+    }
+
+    function watchTestDelivery(statusUrl, testResult) {
+        // The test is sent by a background worker; poll its delivery until it has an outcome
+        fetch(statusUrl)
+        .then(response => response.json())
+        .then(delivery => {
+            if (delivery.status === 'pending') {
+                setTimeout(() => watchTestDelivery(statusUrl, testResult), 1000);
+                return;
+            }
+            if (delivery.status === 'success') {
                 testResult.innerHTML = `
                     <div class="alert alert-success">
                         <h5>Test Results</h5>
                         <p><strong>Status:</strong> Success</p>
-                        <p><strong>Response Code:</strong> ${data.response_code}</p>
-                        <p><strong>Response Time:</strong> ${data.response_time}ms</p>
-                        <p><strong>Response Body:</strong> ${data.response_body || 'No response body'}</p>
+                        <p><strong>Response Code:</strong> ${delivery.status_code}</p>
+                        <p><strong>Response Time:</strong> ${delivery.response_time}ms</p>
+                        <p><strong>Response Body:</strong> ${delivery.response_body || 'No response body'}</p>
                     </div>
                 `;
             } else {
@@ -182,11 +224,12 @@ document.addEventListener('DOMContentLoaded', function() {
                     <div class="alert alert-danger">
                         <h5>Test Results</h5>
                         <p><strong>Status:</strong> Failed</p>
-                        <p><strong>Error:</strong> ${data.error}</p>
-                        <p><strong>Response Time:</strong> ${data.response_time}ms</p>
+                        <p><strong>Error:</strong> ${delivery.error_message || 'HTTP ' + delivery.status_code}</p>
+                        <p><strong>Response Time:</strong> ${delivery.response_time === null ? '-' : delivery.response_time + 'ms'}</p>
                     </div>
                 `;
             }
+            loadWebhooks();
         })
         .catch(error => {
             testResult.innerHTML = `
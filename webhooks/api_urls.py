@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import WebhookListView, WebhookDetailView, test_webhook
+from .views import WebhookListView, WebhookDetailView, test_webhook, webhook_delivery_status, webhook_stats
 
 urlpatterns = [
     path('', WebhookListView.as_view(), name='webhook-list-create'),
     path('<int:pk>/', WebhookDetailView.as_view(), name='webhook-detail'),
     path('<int:pk>/test/', test_webhook, name='webhook-test'),
+    path('deliveries/<int:delivery_id>/', webhook_delivery_status, name='webhook-delivery-status'),
+    path('stats/', webhook_stats, name='webhook-stats'),
 ]
\ No newline at end of file
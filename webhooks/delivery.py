@@ -0,0 +1,225 @@
+import json
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from django.conf import settings
+import requests
+from requests.adapters import HTTPAdapter
+
+# Characters of a subscriber's response kept with a delivery result
+RESPONSE_BODY_LIMIT = 200
+CIRCUIT_OPEN = 'circuit open'
+
+_lock = threading.Lock()
+_sessions = {}
+_breakers = {}
+_executor = None
+
+
+def get_timeout():
+    """
+    Seconds a subscriber has to answer one delivery
+    """
+    return getattr(settings, 'WEBHOOK_TIMEOUT', 10)
+
+
+def get_concurrency():
+    """
+    Deliveries in flight at once per process, and keep-alive connections kept per host
+    """
+    return getattr(settings, 'WEBHOOK_CONCURRENCY', 8)
+
+
+def get_max_attempts():
+    return getattr(settings, 'WEBHOOK_MAX_ATTEMPTS', 4)
+
+
+def endpoint_key(url):
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'.lower()
+
+
+def get_session(url):
+    """
+    Keep-alive session for the host of url, shared by every delivery thread of this process
+    """
+    key = endpoint_key(url)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=get_concurrency())
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[key] = session
+        return session
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=get_concurrency(), thread_name_prefix='webhook')
+        return _executor
+
+
+class CircuitBreaker:
+    """
+    Consecutive failure count of one webhook URL
+    Opens after WEBHOOK_BREAKER_THRESHOLD failures, so deliveries to it fail fast instead of
+    waiting out timeouts; after WEBHOOK_BREAKER_COOLDOWN seconds one trial delivery is let
+    through, which closes the breaker on success and reopens it on failure
+    """
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if not self.trial and time.monotonic() - self.opened_at >= self.cooldown:
+                self.trial = True
+                return True
+            return False
+
+    def record(self, success):
+        with self.lock:
+            self.trial = False
+            if success:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+def get_breaker(url):
+    with _lock:
+        breaker = _breakers.get(url)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                getattr(settings, 'WEBHOOK_BREAKER_THRESHOLD', 5),
+                getattr(settings, 'WEBHOOK_BREAKER_COOLDOWN', 60),
+            )
+            _breakers[url] = breaker
+        return breaker
+
+
+def build_payload(event_type, data):
+    return {
+        "event_type": event_type,
+        "timestamp": time.time(),
+        "data": data,
+    }
+
+
+def post(url, body):
+    """
+    One POST of a serialized payload over the host's pooled session
+    Returns the status code (None if no response), latency in ms, truncated body and error
+    """
+    start_time = time.time()
+    try:
+        response = get_session(url).post(
+            url, data=body, headers={'Content-Type': 'application/json'}, timeout=get_timeout()
+        )
+        return {
+            'status_code': response.status_code,
+            'response_time': round((time.time() - start_time) * 1000, 2),
+            'response_body': response.text[:RESPONSE_BODY_LIMIT],
+            'error': None,
+            'retry_after': response.headers.get('Retry-After'),
+        }
+    except requests.exceptions.RequestException as e:
+        return {
+            'status_code': None,
+            'response_time': round((time.time() - start_time) * 1000, 2),
+            'response_body': '',
+            'error': str(e),
+            'retry_after': None,
+        }
+
+
+def is_retryable(result):
+    """
+    Connection errors, timeouts, 429 and 5xx may succeed later; other 4xx answers will not
+    """
+    status_code = result['status_code']
+    return status_code is None or status_code == 429 or status_code >= 500
+
+
+def backoff(attempt, retry_after=None):
+    """
+    Full-jitter exponential backoff before retry number attempt, capped at WEBHOOK_RETRY_CAP
+    A numeric Retry-After from the subscriber is honoured up to the same cap
+    """
+    cap = getattr(settings, 'WEBHOOK_RETRY_CAP', 30)
+    delay = random.uniform(0, min(cap, getattr(settings, 'WEBHOOK_RETRY_BASE', 0.5) * 2 ** (attempt - 1)))
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, min(cap, int(retry_after)))
+    return delay
+
+
+def send(webhook, event_type, body):
+    """
+    Deliver one serialized payload to a webhook, retrying with backoff while its breaker allows
+    """
+    breaker = get_breaker(webhook.url)
+    result = {'status_code': None, 'response_time': None, 'response_body': '', 'error': CIRCUIT_OPEN}
+    attempts = 0
+
+    while breaker.allow():
+        attempts += 1
+        result = post(webhook.url, body)
+        retryable = is_retryable(result)
+        # A definite 4xx answer still shows the endpoint is up
+        breaker.record(not retryable)
+        if not retryable or attempts >= get_max_attempts():
+            break
+        time.sleep(backoff(attempts, result['retry_after']))
+
+    result.pop('retry_after', None)
+    status_code = result['status_code']
+    return dict(
+        result,
+        webhook_id=webhook.id,
+        event_type=event_type,
+        attempts=attempts,
+        success=status_code is not None and 200 <= status_code < 300,
+    )
+
+
+def send_in_order(webhook, items):
+    return [dict(send(webhook, event_type, body), payload=index) for index, event_type, body in items]
+
+
+def deliver_all(payloads):
+    """
+    Deliver (event_type, data, webhooks) payloads and return one result per webhook and payload,
+    with the position of its payload in payloads
+    Each payload is serialized once for all its subscribers. Webhooks are served concurrently on
+    the bounded delivery pool, each receiving its payloads in order on one thread, so a slow or
+    dead endpoint holds a single thread and its open breaker fails the rest of its queue fast
+    """
+    queues = {}
+    for index, (event_type, data, webhooks) in enumerate(payloads):
+        body = json.dumps(build_payload(event_type, data))
+        for webhook in webhooks:
+            queues.setdefault(webhook.id, (webhook, []))[1].append((index, event_type, body))
+
+    executor = get_executor()
+    futures = [executor.submit(send_in_order, webhook, items) for webhook, items in queues.values()]
+    return [result for future in futures for result in future.result()]
@@ -0,0 +1,106 @@
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+import requests
+from webhooks.models import Webhook
+from webhooks.delivery import build_payload, deliver_all, get_breaker
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Local subscriber: /ok answers 200 after the server's latency, /hang never answers in time
+    """
+    protocol_version = 'HTTP/1.1'
+    # Buffer the response so headers and body leave in one segment, as a real server would send them
+    wbufsize = -1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path.startswith('/hang'):
+            time.sleep(self.server.hang_seconds)  # type: ignore[attr-defined]
+        else:
+            time.sleep(self.server.latency)  # type: ignore[attr-defined]
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # The client gives up on /hang before it answers
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Compare serial one-shot webhook POSTs against the pooled concurrent delivery engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=8)
+        parser.add_argument('--payloads', type=int, default=50)
+        parser.add_argument('--latency-ms', type=float, default=20)
+        parser.add_argument('--concurrency', type=int, default=8)
+
+    def handle(self, *args, **options):
+        server = StandInServer(('127.0.0.1', 0), StandInHandler)
+        server.latency = options['latency_ms'] / 1000  # type: ignore[attr-defined]
+        server.hang_seconds = 2  # type: ignore[attr-defined]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_address[1]}'
+
+        try:
+            with override_settings(
+                WEBHOOK_CONCURRENCY=options['concurrency'], WEBHOOK_TIMEOUT=0.5,
+                WEBHOOK_RETRY_BASE=0.05, WEBHOOK_MAX_ATTEMPTS=3,
+            ):
+                healthy = [Webhook(id=i + 1, url=f'{base_url}/ok/{i}') for i in range(options['subscribers'])]
+                payloads = [
+                    ('product_updated', {'count': 1, 'products': [{'sku': f'BENCH-{i}'}]}, healthy)
+                    for i in range(options['payloads'])
+                ]
+                deliveries = len(payloads) * len(healthy)
+
+                start = time.perf_counter()
+                self.send_serial(payloads)
+                self.report('serial requests.post', deliveries, time.perf_counter() - start)
+
+                start = time.perf_counter()
+                results = deliver_all(payloads)
+                self.report('pooled concurrent', deliveries, time.perf_counter() - start, results)
+
+                # The same load with one subscriber that never answers within the timeout
+                dead = Webhook(id=0, url=f'{base_url}/hang')
+                with_dead = [(event_type, data, [dead] + webhooks) for event_type, data, webhooks in payloads]
+                start = time.perf_counter()
+                results = deliver_all(with_dead)
+                elapsed = time.perf_counter() - start
+                self.report('pooled with dead', deliveries, elapsed, [r for r in results if r['webhook_id']])
+                dead_results = [r for r in results if not r['webhook_id']]
+                self.stdout.write(
+                    f'  dead endpoint: {sum(r["attempts"] for r in dead_results)} attempts for '
+                    f'{len(dead_results)} payloads, breaker {"open" if get_breaker(dead.url).is_open else "closed"}'
+                )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def send_serial(self, payloads):
+        """
+        The previous delivery: one POST at a time, each on a fresh connection
+        """
+        for event_type, data, webhooks in payloads:
+            for webhook in webhooks:
+                requests.post(webhook.url, json=build_payload(event_type, data), timeout=10)
+
+    def report(self, name, deliveries, elapsed, results=None):
+        line = f'{name:<22} {deliveries} deliveries in {elapsed:.2f}s ({deliveries / elapsed:,.0f}/s)'
+        if results is not None:
+            line += f', {sum(1 for r in results if r["success"])} succeeded'
+        self.stdout.write(line)
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0002_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('product_created', 'Product Created'), ('product_updated', 'Product Updated'), ('product_deleted', 'Product Deleted'), ('bulk_import_started', 'Bulk Import Started'), ('bulk_import_completed', 'Bulk Import Completed'), ('bulk_import_failed', 'Bulk Import Failed')], max_length=50)),
+                ('is_test', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('success', 'Success'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('status_code', models.IntegerField(blank=True, null=True)),
+                ('response_time', models.FloatField(blank=True, null=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('response_body', models.TextField(blank=True, default='')),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('webhook', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='webhooks.webhook')),
+            ],
+            options={
+                'db_table': 'webhook_deliveries',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['webhook', 'created_at'], name='webhook_deliveries_hook_idx'), models.Index(fields=['created_at'], name='webhook_deliveries_created_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from typing import TYPE_CHECKING
 
@@ -27,4 +28,76 @@ class Webhook(models.Model):
         db_table = 'webhooks'
         
     def __str__(self):
-        return f"{self.event_type} -> {self.url}"
\ No newline at end of file
+        return f"{self.event_type} -> {self.url}"
+    
+    def save(self, *args, **kwargs):
+        from .subscriptions import invalidate_subscriptions
+        super().save(*args, **kwargs)
+        invalidate_subscriptions()
+    
+    def delete(self, *args, **kwargs):
+        from .subscriptions import invalidate_subscriptions
+        result = super().delete(*args, **kwargs)
+        invalidate_subscriptions()
+        return result
+
+class WebhookEvent(models.Model):
+    """
+    Outbox of events waiting for the relay, written in the transaction of the change they describe
+    Product events hold a list of changed products, at most WEBHOOK_BATCH_SIZE per row
+    A row stays until every subscriber has received it; claimed_at marks the relay pass sending it
+    """
+    if TYPE_CHECKING:
+        objects: 'Manager'  # type: ignore[reportAttributeAccessIssue]
+    
+    event_type = models.CharField(max_length=50, choices=Webhook.WEBHOOK_EVENTS)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    claimed_at = models.DateTimeField(null=True, blank=True)  # Set while a relay delivers the row, and after it failed
+    delivered_to = models.JSONField(default=list, blank=True)  # Ids of the webhooks that already received it
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'webhook_outbox'
+        ordering = ['id']
+        
+    def __str__(self):
+        return f"{self.event_type} #{self.pk}"
+
+
+class WebhookDelivery(models.Model):
+    """
+    One payload sent to one webhook, with the outcome and latency of its last attempt
+    Rows older than WEBHOOK_DELIVERY_RETENTION_DAYS are pruned by a scheduled task
+    """
+    if TYPE_CHECKING:
+        objects: 'Manager'  # type: ignore[reportAttributeAccessIssue]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('success', 'Success'),
+        ('failed', 'Failed'),
+    ]
+    
+    webhook = models.ForeignKey(Webhook, on_delete=models.CASCADE, related_name='deliveries')
+    event_type = models.CharField(max_length=50, choices=Webhook.WEBHOOK_EVENTS)
+    is_test = models.BooleanField(default=False)  # type: ignore[reportArgumentType]
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    status_code = models.IntegerField(null=True, blank=True)
+    response_time = models.FloatField(null=True, blank=True)  # Milliseconds; None if no request was sent
+    attempts = models.IntegerField(default=0)  # type: ignore[reportArgumentType]
+    response_body = models.TextField(blank=True, default='')  # Truncated
+    error_message = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'webhook_deliveries'
+        ordering = ['-created_at']
+        indexes = [
+            # Per-webhook stats read a recent window; pruning walks the oldest rows
+            models.Index(fields=['webhook', 'created_at'], name='webhook_deliveries_hook_idx'),
+            models.Index(fields=['created_at'], name='webhook_deliveries_created_idx'),
+        ]
+        
+    def __str__(self):
+        return f"{self.event_type} -> webhook {self.webhook_id} ({self.status})"  # type: ignore[reportAttributeAccessIssue]
@@ -0,0 +1,140 @@
+from decimal import Decimal
+from django.conf import settings
+from django.db import connection, transaction
+import redis
+from product_importer.redis_client import get_redis, mark_unavailable
+from .models import WebhookEvent
+from .subscriptions import subscribed_events
+
+# Product fields carried by product_created and product_updated events
+PRODUCT_EVENT_FIELDS = ['sku', 'name', 'description', 'price', 'active']
+
+# Set while a relay task is queued, so a burst of commits enqueues one relay instead of one each
+RELAY_SCHEDULED_KEY = 'webhooks:relay_scheduled'
+RELAY_SCHEDULED_TTL = 60
+
+
+def get_batch_size():
+    """
+    Largest number of product changes sent in one webhook POST
+    """
+    return getattr(settings, 'WEBHOOK_BATCH_SIZE', 500)
+
+
+def is_subscribed(event_type):
+    return event_type in subscribed_events()
+
+
+def product_data(row):
+    """
+    Event representation of a product row or model, with the price as a string as in API responses
+    """
+    data = {name: row[name] if isinstance(row, dict) else getattr(row, name) for name in PRODUCT_EVENT_FIELDS}
+    data['price'] = str(Decimal(str(data['price'])).quantize(Decimal('0.01')))
+    data['description'] = data['description'] or ''
+    return data
+
+
+def record_event(event_type, data):
+    """
+    Append one event to the outbox in the current transaction if any webhook subscribes to it
+    data may be a callable, only called to build the payload when there is a subscriber
+    """
+    if not is_subscribed(event_type):
+        return
+    WebhookEvent.objects.create(event_type=event_type, payload=data() if callable(data) else data)
+    schedule_relay()
+
+
+def record_product_events(changes, serialize=None):
+    """
+    Append product events in the current transaction, split into rows of WEBHOOK_BATCH_SIZE products
+    changes maps an event type to its products; unsubscribed types are dropped before serialize
+    (e.g. product_data) turns the products into event dicts, so they cost nothing to produce
+    """
+    subscribed = subscribed_events()
+    changes = {
+        event_type: [serialize(product) for product in products] if serialize else products
+        for event_type, products in changes.items()
+        if products and event_type in subscribed
+    }
+    batch_size = get_batch_size()
+    events = [
+        WebhookEvent(event_type=event_type, payload={'products': products[start:start + batch_size]})
+        for event_type, products in changes.items()
+        for start in range(0, len(products), batch_size)
+    ]
+    if events:
+        WebhookEvent.objects.bulk_create(events)
+        schedule_relay()
+
+
+def product_events_cte_sql(upserted):
+    """
+    PostgreSQL CTE that appends product_created/product_updated events for the rows returned by
+    an upsert, in the same statement, WEBHOOK_BATCH_SIZE products per outbox row
+    upserted must return sku, name, description, price, active and inserted
+    Returns '' when neither event has subscribers, so imports nobody listens to pay nothing
+    """
+    subscribed = subscribed_events()
+    conditions = [
+        condition
+        for event_type, condition in (('product_created', 'inserted'), ('product_updated', 'NOT inserted'))
+        if event_type in subscribed
+    ]
+    if not conditions:
+        return ''
+    where = f"WHERE {conditions[0]} " if len(conditions) == 1 else ''
+    table = connection.ops.quote_name(WebhookEvent._meta.db_table)
+    schedule_relay()
+    return (
+        f"events AS ("
+        f"INSERT INTO {table} (event_type, payload, delivered_to, created_at) "
+        f"SELECT CASE WHEN inserted THEN 'product_created' ELSE 'product_updated' END, "
+        f"jsonb_build_object('products', jsonb_agg(jsonb_build_object("
+        f"'sku', sku, 'name', name, 'description', coalesce(description, ''), "
+        f"'price', price::text, 'active', active) ORDER BY sku)), '[]'::jsonb, now() "
+        f"FROM (SELECT u.*, (row_number() OVER (PARTITION BY inserted ORDER BY sku) - 1) / {int(get_batch_size())} AS part "
+        f"FROM {upserted} u {where}) changes "
+        f"GROUP BY inserted, part ORDER BY inserted DESC, part"
+        f")"
+    )
+
+
+def schedule_relay():
+    """
+    Queue the relay once the current transaction commits
+    """
+    transaction.on_commit(enqueue_relay)
+
+
+def enqueue_relay():
+    from .tasks import relay_webhook_events
+
+    client = get_redis()
+    if client is not None:
+        try:
+            if not client.set(RELAY_SCHEDULED_KEY, 1, nx=True, ex=RELAY_SCHEDULED_TTL):
+                # A queued relay has not started yet and will pick these events up
+                return
+        except redis.RedisError as e:
+            mark_unavailable(e)
+    try:
+        relay_webhook_events.delay()  # pyright: ignore[reportFunctionMemberAccess]
+    except Exception as e:
+        # The change is committed either way; its events wait in the outbox for the next relay
+        relay_started()
+        print(f"Failed to queue webhook relay: {str(e)}")
+
+
+def relay_started():
+    """
+    Let commits from here on queue another relay, as this one may finish before they land
+    """
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.delete(RELAY_SCHEDULED_KEY)
+    except redis.RedisError as e:
+        mark_unavailable(e)
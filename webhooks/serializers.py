@@ -1,8 +1,13 @@
 from rest_framework import serializers
-from .models import Webhook
+from .models import Webhook, WebhookDelivery
 
 class WebhookSerializer(serializers.ModelSerializer):
     class Meta:
         model = Webhook
         fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at')
\ No newline at end of file
+        read_only_fields = ('created_at', 'updated_at')
+
+class WebhookDeliverySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WebhookDelivery
+        fields = '__all__'
@@ -0,0 +1,108 @@
+import time
+import threading
+from django.conf import settings
+from django.db import transaction
+import redis
+from product_importer.redis_client import get_redis, mark_unavailable
+
+SUBSCRIPTIONS_VERSION_KEY = 'webhooks:subscriptions:version'
+
+
+def get_check_seconds():
+    """
+    Longest a process serves its subscription index before checking it is current
+    """
+    return getattr(settings, 'WEBHOOK_INDEX_TTL', 5)
+
+
+def get_subscriptions_version():
+    """
+    Shared version of the webhook table, or None when Redis is unavailable
+    """
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        return client.get(SUBSCRIPTIONS_VERSION_KEY) or b'0'
+    except redis.RedisError as e:
+        mark_unavailable(e)
+        return None
+
+
+def increment_subscriptions_version():
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.incr(SUBSCRIPTIONS_VERSION_KEY)
+    except redis.RedisError as e:
+        mark_unavailable(e)
+
+
+class SubscriptionIndex:
+    """
+    In-process map of each event type to its active webhooks
+    The shared version is checked at most every WEBHOOK_INDEX_TTL seconds and the index reloaded
+    when it has moved, so webhook changes reach every web and worker process within that delay;
+    without Redis the index is simply reloaded that often
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.webhooks = None
+        self.version = None
+        self.checked_at = 0
+
+    def current(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.webhooks is not None and now - self.checked_at < get_check_seconds():
+                return self.webhooks
+            # Read the version before the rows, so a change committed in between reloads next time
+            version = get_subscriptions_version()
+            if self.webhooks is None or version is None or version != self.version:
+                self.webhooks = self.load()
+                self.version = version
+            self.checked_at = now
+            return self.webhooks
+
+    def load(self):
+        from .models import Webhook
+
+        webhooks = {}
+        for webhook in Webhook.objects.filter(is_active=True).order_by('id'):
+            webhooks.setdefault(webhook.event_type, []).append(webhook)
+        return webhooks
+
+    def invalidate(self):
+        with self.lock:
+            self.webhooks = None
+
+
+_index = SubscriptionIndex()
+
+
+def subscribers(event_type):
+    """
+    Active webhooks subscribed to event_type
+    """
+    return _index.current().get(event_type, [])
+
+
+def subscribed_events():
+    """
+    Event types at least one active webhook listens to
+    """
+    return set(_index.current())
+
+
+def invalidate_subscriptions():
+    """
+    Drop this process's index now and every other process's within WEBHOOK_INDEX_TTL, once the
+    current transaction commits
+    """
+    def invalidate():
+        _index.invalidate()
+        increment_subscriptions_version()
+
+    transaction.on_commit(invalidate)
@@ -0,0 +1,183 @@
+import json
+from datetime import timedelta
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import WebhookEvent, WebhookDelivery
+from .outbox import get_batch_size, relay_started
+from .subscriptions import subscribers
+from .delivery import build_payload, deliver_all, post
+
+TEST_MESSAGE = "This is a test webhook"
+# Delivery log rows deleted per statement by the prune task
+PRUNE_CHUNK_SIZE = 5000
+
+
+def get_relay_batch_size():
+    """
+    Outbox rows claimed per relay transaction
+    """
+    return getattr(settings, 'WEBHOOK_RELAY_BATCH', 100)
+
+
+def get_claim_seconds():
+    """
+    Age after which a claimed outbox row is claimed again: a failed delivery is retried, or the
+    row of a relay that died is picked up
+    """
+    return getattr(settings, 'WEBHOOK_RELAY_CLAIM_SECONDS', 300)
+
+
+def get_retention_days():
+    """
+    Age after which delivery log rows are pruned
+    """
+    return getattr(settings, 'WEBHOOK_DELIVERY_RETENTION_DAYS', 7)
+
+
+def log_fields(result):
+    """
+    WebhookDelivery fields for a delivery result from the engine
+    """
+    return {
+        'status': 'success' if result['success'] else 'failed',
+        'status_code': result['status_code'],
+        'response_time': result['response_time'],
+        'attempts': result['attempts'],
+        'response_body': result['response_body'],
+        'error_message': result['error'],
+    }
+
+
+def coalesce(events, batch_size):
+    """
+    Merge consecutive product events of one type into (event_type, data, events) payloads of up
+    to batch_size products; other events pass through on their own, so order is kept
+    Only events already delivered to the same webhooks are merged, so a retried payload goes to
+    exactly the subscribers still missing it
+    """
+    event_type, products, group = None, [], []
+    for event in events:
+        items = event.payload.get('products')
+        if (
+            items is None or event.event_type != event_type or len(products) + len(items) > batch_size
+            or event.delivered_to != group[0].delivered_to
+        ):
+            if group:
+                yield event_type, {'count': len(products), 'products': products}, group
+            event_type, products, group = event.event_type, [], []
+        if items is None:
+            yield event.event_type, event.payload, [event]
+            event_type = None
+        else:
+            products.extend(items)
+            group.append(event)
+    if group:
+        yield event_type, {'count': len(products), 'products': products}, group
+
+
+def claim_events():
+    """
+    Claim the next outbox rows that no relay holds and commit, so no lock is held while delivering
+    Rows are picked with SKIP LOCKED on PostgreSQL, so concurrent relays claim different rows
+    """
+    expired = timezone.now() - timedelta(seconds=get_claim_seconds())
+    with transaction.atomic():
+        events = list(
+            WebhookEvent.objects.filter(Q(claimed_at__isnull=True) | Q(claimed_at__lt=expired))
+            .select_for_update(skip_locked=True).order_by('id')[:get_relay_batch_size()]
+        )
+        WebhookEvent.objects.filter(id__in=[event.id for event in events]).update(claimed_at=timezone.now())
+    return events
+
+
+@shared_task
+def relay_webhook_events():
+    """
+    Drain the webhook outbox in id order, delivering each event to the active webhooks subscribed to it
+    Rows are claimed in a short transaction and delivered outside it. A row is deleted once every
+    subscriber has received it; after a failure or an open circuit it keeps its claim and the
+    webhooks it did reach, and a relay after WEBHOOK_RELAY_CLAIM_SECONDS retries the others
+    Delivery is at least once: a pass that outlives its claim may overlap with the retry
+    """
+    relay_started()
+    batch_size = get_batch_size()
+    delivered = failed = 0
+
+    while True:
+        events = claim_events()
+        if not events:
+            break
+        batches = list(coalesce(events, batch_size))
+        payloads = [
+            (event_type, data, [webhook for webhook in subscribers(event_type) if webhook.id not in group[0].delivered_to])
+            for event_type, data, group in batches
+        ]
+        results = deliver_all(payloads)
+        WebhookDelivery.objects.bulk_create([
+            WebhookDelivery(webhook_id=result['webhook_id'], event_type=result['event_type'], **log_fields(result))
+            for result in results
+        ])
+        reached, missed = {}, set()
+        for result in results:
+            if result['success']:
+                delivered += 1
+                reached.setdefault(result['payload'], []).append(result['webhook_id'])
+            else:
+                failed += 1
+                missed.add(result['payload'])
+                print(
+                    f"Webhook {result['webhook_id']} delivery of {result['event_type']} failed after "
+                    f"{result['attempts']} attempts: {result['error'] or result['status_code']}"
+                )
+
+        done = []
+        for index, (_, _, group) in enumerate(batches):
+            if index not in missed:
+                done.extend(event.id for event in group)
+            elif reached.get(index):
+                WebhookEvent.objects.filter(id__in=[event.id for event in group]).update(
+                    delivered_to=group[0].delivered_to + reached[index]
+                )
+        WebhookEvent.objects.filter(id__in=done).delete()
+
+    if delivered or failed:
+        print(f"Relayed webhook payloads: {delivered} delivered, {failed} failed")
+
+
+@shared_task
+def send_test_webhook(delivery_id):
+    """
+    Send the sample payload of a test delivery once and record the outcome
+    Tests skip retries and the circuit breaker, so they always reach the endpoint
+    """
+    delivery = WebhookDelivery.objects.select_related('webhook').get(id=delivery_id)
+    body = json.dumps(build_payload(delivery.event_type, {"message": TEST_MESSAGE}))
+    result = post(delivery.webhook.url, body)
+    status_code = result['status_code']
+    fields = log_fields(dict(result, attempts=1, success=status_code is not None and 200 <= status_code < 300))
+    for name, value in fields.items():
+        setattr(delivery, name, value)
+    delivery.save()
+
+
+@shared_task
+def prune_webhook_deliveries():
+    """
+    Delete delivery log rows older than WEBHOOK_DELIVERY_RETENTION_DAYS in short pk-ordered chunks
+    """
+    cutoff = timezone.now() - timedelta(days=get_retention_days())
+    expired = WebhookDelivery.objects.filter(created_at__lt=cutoff)
+    deleted = 0
+
+    while True:
+        ids = list(expired.order_by('pk').values_list('pk', flat=True)[:PRUNE_CHUNK_SIZE])
+        if not ids:
+            break
+        count, _ = expired.filter(pk__lte=ids[-1]).delete()
+        deleted += count
+
+    if deleted:
+        print(f"Pruned {deleted} webhook deliveries older than {cutoff}")
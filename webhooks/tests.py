@@ -1,3 +1,364 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from product_importer import redis_client
+from . import delivery, subscriptions
+from .models import Webhook, WebhookEvent, WebhookDelivery
+from .stats import get_delivery_stats
+from .tasks import TEST_MESSAGE, prune_webhook_deliveries, relay_webhook_events, send_test_webhook
 
-# Create your tests here.
+
+@override_settings(CELERY_BROKER_URL='memory://')
+class WebhookTestCase(TestCase):
+    """
+    Webhooks and outbox rows in the test database, without Redis
+    """
+
+    def setUp(self):
+        redis_client._client = None
+        subscriptions._index.invalidate()
+
+    def product_event(self, *skus, event_type='product_updated'):
+        return WebhookEvent.objects.create(
+            event_type=event_type,
+            payload={'products': [{'sku': sku} for sku in skus]},
+        )
+
+
+def fake_deliver_all(payloads):
+    """
+    Delivery engine stand-in: every webhook whose URL mentions "down" fails
+    """
+    return [
+        {
+            'payload': index, 'webhook_id': webhook.id, 'event_type': event_type, 'attempts': 1,
+            'success': 'down' not in webhook.url, 'status_code': 200 if 'down' not in webhook.url else 503,
+            'response_time': 1.0, 'response_body': '', 'error': None,
+        }
+        for index, (event_type, data, webhooks) in enumerate(payloads)
+        for webhook in webhooks
+    ]
+
+
+class RelayTests(WebhookTestCase):
+    def setUp(self):
+        super().setUp()
+        self.up = Webhook.objects.create(url='http://up.example/hook', event_type='product_updated')
+
+    def relay(self):
+        with mock.patch('webhooks.tasks.deliver_all', side_effect=fake_deliver_all) as deliver_all:
+            relay_webhook_events()
+        return deliver_all
+
+    def test_delivered_events_are_deleted(self):
+        self.product_event('A')
+        self.product_event('B')
+
+        deliver_all = self.relay()
+
+        payloads = deliver_all.call_args.args[0]
+        self.assertEqual([(event_type, data['count']) for event_type, data, _ in payloads], [('product_updated', 2)])
+        self.assertFalse(WebhookEvent.objects.exists())
+        self.assertEqual(WebhookDelivery.objects.filter(status='success').count(), 1)
+
+    def test_failed_event_is_kept_for_the_webhooks_it_missed(self):
+        down = Webhook.objects.create(url='http://down.example/hook', event_type='product_updated')
+        event = self.product_event('A')
+
+        self.relay()
+
+        event.refresh_from_db()
+        self.assertIsNotNone(event.claimed_at)
+        self.assertEqual(event.delivered_to, [self.up.id])
+        # The claim holds it back from the next pass until it expires
+        self.assertFalse(self.relay().called)
+
+        WebhookEvent.objects.filter(id=event.id).update(claimed_at=timezone.now() - timedelta(hours=1))
+        deliver_all = self.relay()
+        _, _, webhooks = deliver_all.call_args.args[0][0]
+        self.assertEqual([webhook.id for webhook in webhooks], [down.id])
+        self.assertTrue(WebhookEvent.objects.filter(id=event.id).exists())
+
+        down.url = 'http://back.example/hook'
+        with self.captureOnCommitCallbacks(execute=True):
+            down.save()
+        WebhookEvent.objects.filter(id=event.id).update(claimed_at=timezone.now() - timedelta(hours=1))
+        self.relay()
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_events_missed_by_different_webhooks_are_not_merged(self):
+        retried = self.product_event('A')
+        WebhookEvent.objects.filter(id=retried.id).update(delivered_to=[self.up.id])
+        self.product_event('B')
+
+        payloads = self.relay().call_args.args[0]
+
+        self.assertEqual([len(webhooks) for _, _, webhooks in payloads], [0, 1])
+        self.assertFalse(WebhookEvent.objects.exists())
+
+
+class SubscriberServer(ThreadingHTTPServer):
+    """
+    Local subscriber endpoint answering each POST from a per-path script of (status, delay) steps,
+    the last step repeating; records the paths hit and the most requests it served at once
+    """
+    daemon_threads = True
+
+    def __init__(self, scripts):
+        super().__init__(('127.0.0.1', 0), SubscriberHandler)
+        self.scripts = scripts
+        self.hits = []
+        self.active = self.max_active = 0
+        self.lock = threading.Lock()
+
+    def url(self, path):
+        return f'http://127.0.0.1:{self.server_address[1]}{path}'
+
+    def handle_error(self, request, client_address):
+        # Clients that gave up on a slow answer close the socket under the handler
+        pass
+
+
+class SubscriberHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers['Content-Length']))
+        with server.lock:
+            steps = server.scripts[self.path]
+            step = steps[min(server.hits.count(self.path), len(steps) - 1)]
+            server.hits.append(self.path)
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        status_code, delay = step
+        time.sleep(delay)
+        with server.lock:
+            server.active -= 1
+        self.send_response(status_code)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@override_settings(WEBHOOK_RETRY_BASE=0, WEBHOOK_MAX_ATTEMPTS=3, WEBHOOK_TIMEOUT=2)
+class DeliveryEngineTests(WebhookTestCase):
+    def setUp(self):
+        super().setUp()
+        # Breakers outlive a test in the module, and the ports of earlier servers may be reused
+        delivery._breakers.clear()
+
+    def serve(self, scripts):
+        server = SubscriberServer(scripts)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def webhook(self, server, path):
+        return Webhook.objects.create(url=server.url(path), event_type='product_updated')
+
+    def test_webhooks_are_served_in_parallel(self):
+        paths = [f'/hook-{i}' for i in range(4)]
+        server = self.serve({path: [(200, 0.3)] for path in paths})
+        webhooks = [self.webhook(server, path) for path in paths]
+
+        results = delivery.deliver_all([('product_updated', {'count': 0, 'products': []}, webhooks)])
+
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertGreater(server.max_active, 1)
+
+    def test_server_errors_are_retried(self):
+        server = self.serve({'/flaky': [(503, 0), (502, 0), (200, 0)]})
+        webhook = self.webhook(server, '/flaky')
+
+        [result] = delivery.deliver_all([('product_updated', {}, [webhook])])
+
+        self.assertTrue(result['success'])
+        self.assertEqual((result['attempts'], result['status_code']), (3, 200))
+
+    @override_settings(WEBHOOK_TIMEOUT=0.2)
+    def test_timeouts_are_retried(self):
+        server = self.serve({'/slow': [(200, 1), (200, 0)]})
+        webhook = self.webhook(server, '/slow')
+
+        [result] = delivery.deliver_all([('product_updated', {}, [webhook])])
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['attempts'], 2)
+
+    def test_client_errors_are_not_retried(self):
+        server = self.serve({'/gone': [(410, 0)]})
+        webhook = self.webhook(server, '/gone')
+
+        [result] = delivery.deliver_all([('product_updated', {}, [webhook])])
+
+        self.assertFalse(result['success'])
+        self.assertEqual(server.hits, ['/gone'])
+
+    @override_settings(WEBHOOK_MAX_ATTEMPTS=1, WEBHOOK_BREAKER_THRESHOLD=2)
+    def test_broken_endpoint_only_opens_its_own_breaker(self):
+        server = self.serve({'/broken': [(500, 0)], '/healthy': [(200, 0)]})
+        broken = self.webhook(server, '/broken')
+        healthy = self.webhook(server, '/healthy')
+
+        results = delivery.deliver_all([('product_updated', {}, [broken, healthy])] * 4)
+
+        broken_results = [result for result in results if result['webhook_id'] == broken.id]
+        self.assertEqual([result['attempts'] for result in broken_results], [1, 1, 0, 0])
+        self.assertEqual(broken_results[-1]['error'], delivery.CIRCUIT_OPEN)
+        self.assertEqual(server.hits.count('/broken'), 2)
+        self.assertTrue(all(result['success'] for result in results if result['webhook_id'] == healthy.id))
+        self.assertTrue(delivery.get_breaker(broken.url).is_open)
+        self.assertFalse(delivery.get_breaker(healthy.url).is_open)
+
+
+class DeliveryLogTests(WebhookTestCase):
+    def setUp(self):
+        super().setUp()
+        self.webhook = Webhook.objects.create(url='http://up.example/hook', event_type='product_updated')
+
+    def log(self, count, status='success', response_time=1.0, age=None):
+        deliveries = WebhookDelivery.objects.bulk_create([
+            WebhookDelivery(webhook=self.webhook, event_type='product_updated', status=status, response_time=response_time)
+            for _ in range(count)
+        ])
+        if age is not None:
+            WebhookDelivery.objects.filter(id__in=[delivery.id for delivery in deliveries]).update(
+                created_at=timezone.now() - age,
+            )
+        return deliveries
+
+    def test_percentiles_come_from_the_latency_histogram(self):
+        for ms in range(1, 101):
+            self.log(1, status='failed' if ms % 10 == 0 else 'success', response_time=ms)
+        # Neither pending deliveries nor ones older than the window count
+        self.log(5, status='pending', response_time=None)
+        self.log(5, response_time=5000, age=timedelta(hours=25))
+
+        response = self.client.get('/api/webhooks/stats/')
+
+        self.assertEqual(response.status_code, 200)
+        stats = response.json()['webhooks'][str(self.webhook.id)]
+        self.assertEqual((stats['deliveries'], stats['succeeded'], stats['success_rate']), (100, 90, 0.9))
+        self.assertEqual(stats['slowest'], 100)
+        # Within a bucket, each 25% wider than the last, of the exact value
+        for name, exact in (('p50', 50), ('p95', 95), ('p99', 99)):
+            self.assertAlmostEqual(stats['latency'][name], exact, delta=exact * 0.25, msg=name)
+        self.assertLessEqual(stats['latency']['p50'], stats['latency']['p95'])
+        self.assertLessEqual(stats['latency']['p95'], stats['latency']['p99'])
+
+    def test_percentiles_never_exceed_the_slowest_delivery(self):
+        self.log(3, response_time=7.0)
+
+        stats = get_delivery_stats()[self.webhook.id]
+
+        # 7ms falls in the bucket 5.96-7.45ms, whose upper part is cut off at the slowest delivery
+        self.assertEqual((stats['latency']['p95'], stats['latency']['p99']), (7.0, 7.0))
+        self.assertTrue(5.96 <= stats['latency']['p50'] <= 7.0)
+
+    def test_undelivered_requests_have_no_latency(self):
+        self.log(2, status='failed', response_time=None)
+
+        stats = get_delivery_stats()[self.webhook.id]
+
+        self.assertEqual((stats['deliveries'], stats['success_rate'], stats['slowest'], stats['latency']), (2, 0, None, {}))
+
+    @override_settings(WEBHOOK_DELIVERY_RETENTION_DAYS=7)
+    def test_prune_deletes_only_expired_deliveries(self):
+        expired = self.log(5, age=timedelta(days=8))
+        kept = self.log(3, age=timedelta(days=6)) + self.log(2)
+
+        with mock.patch('webhooks.tasks.PRUNE_CHUNK_SIZE', 2):
+            prune_webhook_deliveries()
+
+        remaining = set(WebhookDelivery.objects.values_list('id', flat=True))
+        self.assertEqual(remaining, {delivery.id for delivery in kept})
+        self.assertFalse(remaining & {delivery.id for delivery in expired})
+
+    def test_test_endpoint_queues_and_records_the_delivery(self):
+        with mock.patch.object(send_test_webhook, 'delay') as queued:
+            response = self.client.post(f'/api/webhooks/{self.webhook.id}/test/')
+
+        self.assertEqual(response.status_code, 202)
+        delivery_id = response.json()['delivery_id']
+        queued.assert_called_once_with(delivery_id)
+        self.assertEqual(self.client.get(response.json()['status_url']).json()['status'], 'pending')
+
+        result = {'status_code': 204, 'response_time': 12.5, 'response_body': '', 'error': None, 'retry_after': None}
+        with mock.patch('webhooks.tasks.post', return_value=result) as post:
+            send_test_webhook(delivery_id)
+
+        self.assertEqual(json.loads(post.call_args.args[1])['data'], {'message': TEST_MESSAGE})
+        delivery = self.client.get(response.json()['status_url']).json()
+        self.assertEqual((delivery['status'], delivery['status_code'], delivery['attempts']), ('success', 204, 1))
+
+
+class SubscriptionIndexTests(WebhookTestCase):
+    def urls(self, event_type='product_updated'):
+        return [webhook.url for webhook in subscriptions.subscribers(event_type)]
+
+    def test_index_is_served_from_memory(self):
+        Webhook.objects.create(url='http://a.example/hook', event_type='product_updated')
+        self.assertEqual(self.urls(), ['http://a.example/hook'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.urls(), ['http://a.example/hook'])
+            self.assertEqual(subscriptions.subscribed_events(), {'product_updated'})
+
+    def test_webhook_changes_reach_the_index_once_committed(self):
+        self.assertEqual(self.urls(), [])
+
+        with mock.patch('webhooks.subscriptions.increment_subscriptions_version') as increment:
+            with self.captureOnCommitCallbacks(execute=True):
+                webhook = Webhook.objects.create(url='http://a.example/hook', event_type='product_updated')
+                self.assertEqual(self.urls(), [])
+            self.assertEqual(self.urls(), ['http://a.example/hook'])
+            self.assertEqual(increment.call_count, 1)
+
+            webhook.is_active = False
+            with self.captureOnCommitCallbacks(execute=True):
+                webhook.save()
+            self.assertEqual(self.urls(), [])
+
+            webhook.is_active = True
+            with self.captureOnCommitCallbacks(execute=True):
+                webhook.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                webhook.delete()
+            self.assertEqual(self.urls(), [])
+            self.assertEqual(increment.call_count, 4)
+
+    def test_rolled_back_change_keeps_the_index(self):
+        self.assertEqual(self.urls(), [])
+
+        with self.captureOnCommitCallbacks(execute=False):
+            Webhook.objects.create(url='http://a.example/hook', event_type='product_updated')
+
+        self.assertEqual(self.urls(), [])
+
+    @override_settings(WEBHOOK_INDEX_TTL=0)
+    def test_index_reloads_when_another_process_moves_the_version(self):
+        with mock.patch('webhooks.subscriptions.get_subscriptions_version', return_value=b'1') as version:
+            self.assertEqual(self.urls(), [])
+            # Written by another process: only the shared version tells this one
+            Webhook.objects.bulk_create([Webhook(url='http://a.example/hook', event_type='product_updated')])
+            with self.assertNumQueries(0):
+                self.assertEqual(self.urls(), [])
+
+            version.return_value = b'2'
+            self.assertEqual(self.urls(), ['http://a.example/hook'])
+
+    @override_settings(WEBHOOK_INDEX_TTL=60)
+    def test_version_is_checked_at_most_every_ttl(self):
+        with mock.patch('webhooks.subscriptions.get_subscriptions_version', return_value=b'1') as version:
+            self.urls()
+            version.return_value = b'2'
+            self.urls()
+
+        self.assertEqual(version.call_count, 1)
@@ -1,15 +1,16 @@
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework import generics
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from .models import Webhook
-from .serializers import WebhookSerializer
+from .models import Webhook, WebhookDelivery
+from .serializers import WebhookSerializer, WebhookDeliverySerializer
+from .stats import get_delivery_stats, get_window_hours
+from .tasks import send_test_webhook
 from typing import TYPE_CHECKING
-import requests
-import time
 
 if TYPE_CHECKING:
     from django.db.models import QuerySet
@@ -41,39 +42,48 @@ class WebhookDetailView(generics.RetrieveUpdateDestroyAPIView):
 @permission_classes([])
 def test_webhook(request, pk):
     """
-    Test a webhook by sending a sample payload
+    Queue a sample payload to a webhook and return its delivery id right away
+    The outcome is recorded on the delivery, polled at webhook-delivery-status
     """
     try:
         webhook = Webhook.objects.get(id=pk)  # pyright: ignore[reportAttributeAccessIssue]
-        
-        # Create a sample payload
-        payload = {
-            "event_type": webhook.event_type,
-            "timestamp": time.time(),
-            "data": {
-                "message": "This is a test webhook"
-            }
-        }
-        
-        # Send the request and measure response time
-        start_time = time.time()
-        try:
-            response = requests.post(webhook.url, json=payload, timeout=10)
-            response_time = (time.time() - start_time) * 1000  # Convert to milliseconds
-            
-            return Response({
-                "status": "success",
-                "response_code": response.status_code,
-                "response_time": round(response_time, 2),
-                "response_body": response.text[:200]  # Limit response body length
-            })
-        except requests.exceptions.RequestException as e:
-            response_time = (time.time() - start_time) * 1000
-            return Response({
-                "status": "error",
-                "error": str(e),
-                "response_time": round(response_time, 2)
-            })
-            
     except Webhook.DoesNotExist:  # pyright: ignore[reportAttributeAccessIssue]
-        return Response({"error": "Webhook not found"}, status=404)
\ No newline at end of file
+        return Response({"error": "Webhook not found"}, status=404)
+    
+    delivery = WebhookDelivery.objects.create(webhook=webhook, event_type=webhook.event_type, is_test=True)
+    try:
+        send_test_webhook.delay(delivery.id)  # pyright: ignore[reportFunctionMemberAccess]
+    except Exception as e:
+        print(f"Failed to queue test webhook: {e}")
+        delivery.status = 'failed'
+        delivery.error_message = f'Failed to queue test: {str(e)}'
+        delivery.save(update_fields=['status', 'error_message', 'updated_at'])
+        return Response({"error": delivery.error_message}, status=500)
+    
+    return Response({
+        "delivery_id": delivery.id,
+        "status": "pending",
+        "status_url": reverse('webhook-delivery-status', args=[delivery.id]),
+    }, status=202)
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([])
+def webhook_delivery_status(request, delivery_id):
+    """
+    Outcome of one delivery: status, response code, latency, attempts and truncated response body
+    """
+    delivery = get_object_or_404(WebhookDelivery, id=delivery_id)
+    return Response(WebhookDeliverySerializer(delivery).data)
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([])
+def webhook_stats(request):
+    """
+    Success rate and p50/p95/p99 latency of each webhook over the stats window
+    """
+    return Response({
+        "window_hours": get_window_hours(),
+        "webhooks": get_delivery_stats(),
+    })